@@ -0,0 +1,111 @@
+import contextlib
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+SERVICE_STARTUP_TIMEOUT = 60
+
+# minimal configuration letting the daemon modules import without a real deployment config
+DEFAULT_ENV: dict[str, str] = {
+    "LANGUAGE_MESSAGE": "en",
+    "MONGODB__URI": "mongodb://127.0.0.1:27017",
+    "MONGODB__DB_NAME": "workbench-benchmark",
+    "MONGODB__LOCAL_STORE": "false",
+    "ROBONOMICS__ENABLE_DATALOG": "false",
+    "ROBONOMICS__ACCOUNT_SEED": "//Alice",
+    "ROBONOMICS__SUBSTRATE_NODE_URI": "ws://127.0.0.1:9944",
+    "IPFS_GATEWAY__ENABLE": "false",
+    "IPFS_GATEWAY__IPFS_SERVER_URI": "http://127.0.0.1:8082",
+    "PRINTER__ENABLE": "false",
+    "PRINTER__PAPER_ASPECT_RATIO": "40:25",
+    "PRINTER__PRINT_BARCODE": "false",
+    "PRINTER__PRINT_QR": "false",
+    "PRINTER__PRINT_QR_ONLY_FOR_COMPOSITE": "false",
+    "PRINTER__PRINT_SECURITY_TAG": "false",
+    "PRINTER__SECURITY_TAG_ADD_TIMESTAMP": "false",
+    "WORKBENCH__NUMBER": "1",
+    "WORKBENCH__LOGIN": "true",
+    "WORKBENCH__DUMMY_EMPLOYEE": "000 000 Operator 000",
+    "BUSINESS_LOGIC__START_URI": "http://127.0.0.1:8083/start",
+    "BUSINESS_LOGIC__MANUAL_INPUT_URI": "http://127.0.0.1:8083/manual-input",
+    "BUSINESS_LOGIC__STOP_URI": "http://127.0.0.1:8083/stop",
+}
+
+
+def benchmark_env(**overrides: str) -> dict[str, str]:
+    """get process environment with the benchmark defaults applied (real environment values take precedence)"""
+    return {**DEFAULT_ENV, **os.environ, **overrides}
+
+
+def apply_benchmark_env(**overrides: str) -> None:
+    """apply benchmark environment to the current process. Must be called before any daemon module is imported."""
+    os.environ.update(benchmark_env(**overrides))
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+
+
+def run_python(code: str, env: dict[str, str]) -> str:
+    """run a python snippet in a fresh interpreter from the repository root and return its stdout"""
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return result.stdout.strip()
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """get median, p99 and mean of the samples"""
+    ordered = sorted(samples)
+    return {
+        "median": statistics.median(ordered),
+        "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        "mean": statistics.fmean(ordered),
+    }
+
+
+def free_port() -> int:
+    """get a free local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def wait_for_port(port: int, timeout: float = SERVICE_STARTUP_TIMEOUT) -> None:
+    """wait until something listens on the local port"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.05)
+    raise TimeoutError(f"Nothing is listening on port {port} after {timeout}s")
+
+
+@contextlib.contextmanager
+def mongodb_stand_in(uri: str | None) -> Iterator[str]:
+    """yield the URI of the given MongoDB or of a throwaway mongod started in a temporary directory"""
+    if uri is not None:
+        yield uri
+        return
+
+    mongod = shutil.which("mongod")
+    if mongod is None:
+        raise SystemExit("mongod is not on PATH, provide a running MongoDB with --mongodb-uri")
+
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix="workbench-benchmark-mongod-") as dbpath:
+        command = [mongod, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"]
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(port)
+            yield f"mongodb://127.0.0.1:{port}"
+        finally:
+            process.terminate()
+            process.wait()
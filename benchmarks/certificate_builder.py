@@ -0,0 +1,149 @@
+"""
+Benchmark unit certificate construction on synthetic composite units.
+
+Synthetic component trees are built in memory, so no database is needed. Two tree shapes are
+measured for every size: a wide one (all components attached to the root) and a deep one
+(every unit has a few components). For reference, the former recursive algorithm that
+recomputed subtree assembly time at every level is measured on the same trees, as well as
+the pure Python and libyaml YAML emitters. The "cached" column is the same build with all
+the (frozen) components' certificate fragments already cached.
+
+Usage: python -m benchmarks.certificate_builder [--sizes 100 500 1000] [--repeat 5]
+"""
+import argparse
+import datetime as dt
+import io
+import time
+from collections.abc import Callable
+from typing import Any
+
+from benchmarks._env import apply_benchmark_env, summarize
+
+apply_benchmark_env()
+
+import yaml  # noqa: E402
+
+from src.database.models import ProductionSchema, ProductionSchemaStage  # noqa: E402
+from src.feecc_workbench import certificate_generator as cg  # noqa: E402
+from src.feecc_workbench._label_generation import Barcode  # noqa: E402
+from src.feecc_workbench.translation import translation  # noqa: E402
+from src.feecc_workbench.utils import TIMESTAMP_FORMAT  # noqa: E402
+from src.prod_stage.ProductionStage import ProductionStage  # noqa: E402
+from src.unit.unit_utils import Unit, UnitStatus  # noqa: E402
+
+STAGES_PER_UNIT = 3
+SCHEMA = ProductionSchema(
+    schema_name="Benchmark unit",
+    schema_stages=[ProductionSchemaStage(name=f"Stage {i}") for i in range(STAGES_PER_UNIT)],
+)
+
+
+def _make_unit(number: int, components_ids: list[str]) -> Unit:
+    uuid = f"{number:032x}"
+    start = dt.datetime(2022, 1, 1) + dt.timedelta(minutes=number)
+    stages = [
+        ProductionStage(
+            name=f"Stage {i}",
+            parent_unit_uuid=uuid,
+            number=i,
+            employee_name="e9b69b302f72d82ca47964196536aab3f36e367910aff06d2be30888f9ad4234",
+            session_start_time=(start + dt.timedelta(minutes=10 * i)).strftime(TIMESTAMP_FORMAT),
+            session_end_time=(start + dt.timedelta(minutes=10 * i + 7)).strftime(TIMESTAMP_FORMAT),
+            stage_data={"ipfs_cid": "Qm" + "x" * 44, "weight": "1.5"},
+            completed=True,
+        )
+        for i in range(STAGES_PER_UNIT)
+    ]
+    return Unit(
+        uuid=uuid,
+        schema=SCHEMA,
+        barcode=Barcode(unit_code=f"{number:012d}"),
+        status=UnitStatus.built,
+        operation_stages=stages,
+        components_ids=components_ids,
+    )
+
+
+def build_tree(size: int, branching: int | None) -> tuple[Unit, dict[str, Unit]]:
+    """build a synthetic tree of `size` components. `branching=None` attaches all of them to the root."""
+    tree: dict[str, Unit] = {}
+    children: dict[int, list[int]] = {n: [] for n in range(size + 1)}
+    for n in range(1, size + 1):
+        children[0 if branching is None else (n - 1) // branching].append(n)
+
+    def make(n: int) -> Unit:
+        unit = _make_unit(n, [make(c).uuid for c in children[n]])
+        tree[unit.uuid] = unit
+        return unit
+
+    return make(0), tree
+
+
+def legacy_certificate_dict(unit: Unit, tree: dict[str, Unit]) -> dict[str, Any]:
+    """the former algorithm: subtree time is recomputed at every level of the tree"""
+
+    def total_time(u: Unit) -> dt.timedelta:
+        return cg._get_own_assembly_time(u) + sum(
+            (total_time(tree[c]) for c in u.components_ids), start=dt.timedelta(0)
+        )
+
+    certificate: dict[str, Any] = {
+        translation("UnitID"): unit.uuid,
+        translation("UnitName"): unit.schema.schema_name,
+        translation("UnitTotalAssemblyTime"): str(cg._get_own_assembly_time(unit)),
+        translation("UnitBiography"): [cg._construct_stage_dict(stage) for stage in unit.operation_stages],
+    }
+    if unit.components_ids:
+        certificate[translation("UnitComponents")] = [legacy_certificate_dict(tree[c], tree) for c in unit.components_ids]
+        certificate[translation("UnitTotalAssemblyTimeComponents")] = str(total_time(unit))
+    return certificate
+
+
+def timed(func: Callable[[], Any], repeat: int) -> dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 1000], help="component counts")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per measurement")
+    args = parser.parse_args()
+
+    print(f"YAML emitter in use: {cg.YamlDumper.__name__}")
+    print(
+        f"{'shape':>6} {'units':>6} | {'legacy':>10} {'single-pass':>12} {'cached':>10}"
+        f" | {'yaml (py)':>10} {'yaml (C)':>10}"
+    )
+
+    for size in args.sizes:
+        for shape, branching in (("wide", None), ("deep", 2)):
+            root, tree = build_tree(size, branching)
+            builder = cg._CertificateBuilder(tree, use_cache=False)
+            certificate, _ = builder.build(root)
+            legacy = timed(lambda: legacy_certificate_dict(root, tree), args.repeat)
+            single_pass = timed(lambda: cg._CertificateBuilder(tree, use_cache=False).build(root), args.repeat)
+            for uuid, fragment in builder.new_fragments.items():
+                tree[uuid].certificate_fragment = fragment
+            cached = timed(lambda: cg._CertificateBuilder(tree).build(root), args.repeat)
+            dumps = {}
+            for name, dumper in (("py", yaml.Dumper), ("c", cg.YamlDumper)):
+                dumps[name] = timed(
+                    lambda d=dumper: yaml.dump(  # type: ignore[misc]
+                        certificate, io.StringIO(), Dumper=d, allow_unicode=True, sort_keys=False
+                    ),
+                    args.repeat,
+                )
+            print(
+                f"{shape:>6} {size + 1:>6} | {legacy['median'] * 1000:>8.1f}ms {single_pass['median'] * 1000:>10.1f}ms"
+                f" {cached['median'] * 1000:>8.1f}ms"
+                f" | {dumps['py']['median'] * 1000:>8.1f}ms {dumps['c']['median'] * 1000:>8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
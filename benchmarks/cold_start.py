@@ -0,0 +1,178 @@
+"""
+Measure the daemon cold start: import cost and time until it serves the kiosk.
+
+Three numbers are measured, every sample in a fresh interpreter:
+
+- `python -X importtime` cost of `src.app`, with the heaviest packages and the watched heavy
+  dependencies (Pillow, qrcode, python-barcode, robonomicsinterface, passlib, pycups) that
+  ended up being imported eagerly
+- time from the server process spawn to the first 200 response from `/workbench/status`
+- time from the server process spawn to the first SSE frame from `/workbench/status/stream`
+
+The server is started with uvicorn the same way the container does. It talks to a throwaway
+`mongod` started in a temporary directory (needs `mongod` on PATH) unless --mongodb-uri is given.
+With --imports-only no server is started.
+
+Every run is appended to benchmarks/results/cold_start.jsonl along with the git revision and
+compared to the previous record, so new heavy imports get noticed before they ship.
+
+Usage: python -m benchmarks.cold_start [--runs 5] [--imports-only] [--mongodb-uri URI] [--no-record]
+"""
+import argparse
+import contextlib
+import datetime as dt
+import json
+import platform
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any
+
+import httpx
+
+from benchmarks._env import REPO_ROOT, benchmark_env, free_port, mongodb_stand_in, summarize
+
+RESULTS_FILE = REPO_ROOT / "benchmarks" / "results" / "cold_start.jsonl"
+WATCHED_IMPORTS = ("PIL", "qrcode", "barcode", "robonomicsinterface", "passlib", "cups")
+HEAVIEST_CNT = 10
+STARTUP_TIMEOUT = 60
+POLL_INTERVAL = 0.01
+
+
+def parse_importtime(stderr: str) -> tuple[float, dict[str, float]]:
+    """get the total import time and the self time of every top-level package, both in seconds"""
+    total = 0.0
+    packages: dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1e6
+        if not name.startswith("  "):  # top-level entries, their cumulative times add up to the total
+            total += int(cumulative_us) / 1e6
+    return total, dict(packages)
+
+
+def measure_imports(runs: int) -> tuple[list[float], dict[str, float]]:
+    """importtime samples of the app module and the per package self times of the median sample"""
+    samples: list[tuple[float, dict[str, float]]] = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import src.app"],
+            cwd=REPO_ROOT,
+            env=benchmark_env(),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(parse_importtime(result.stderr))
+    samples.sort(key=lambda sample: sample[0])
+    return [total for total, _ in samples], samples[len(samples) // 2][1]
+
+
+def _first_ok(client: httpx.Client, url: str, deadline: float) -> None:
+    while time.monotonic() < deadline:
+        with contextlib.suppress(httpx.TransportError):
+            if client.get(url).status_code == 200:
+                return
+        time.sleep(POLL_INTERVAL)
+    raise TimeoutError(f"{url} did not respond with 200 in {STARTUP_TIMEOUT}s")
+
+
+def _first_sse_frame(client: httpx.Client, url: str) -> None:
+    with client.stream("GET", url) as response:
+        for line in response.iter_lines():
+            if line.startswith("data:"):
+                return
+
+
+def measure_server_start(mongodb_uri: str) -> tuple[float, float]:
+    """spawn the server and get the time to the first status response and to the first SSE frame"""
+    port = free_port()
+    env = benchmark_env(MONGODB__URI=mongodb_uri)
+    command = [sys.executable, "-m", "uvicorn", "src.app:app", "--host", "127.0.0.1", "--port", str(port)]
+    base_url = f"http://127.0.0.1:{port}"
+
+    spawned_at = time.perf_counter()
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(timeout=STARTUP_TIMEOUT) as client:
+            _first_ok(client, f"{base_url}/workbench/status", time.monotonic() + STARTUP_TIMEOUT)
+            status_at = time.perf_counter()
+            _first_sse_frame(client, f"{base_url}/workbench/status/stream")
+            sse_at = time.perf_counter()
+    finally:
+        process.terminate()
+        process.wait()
+
+    return status_at - spawned_at, sse_at - spawned_at
+
+
+def _git_revision() -> str:
+    result = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def _previous_record() -> dict[str, Any] | None:
+    if not RESULTS_FILE.exists():
+        return None
+    lines = RESULTS_FILE.read_text().splitlines()
+    return json.loads(lines[-1]) if lines else None
+
+
+def _report(record: dict[str, Any], previous: dict[str, Any] | None) -> None:
+    for metric in ("import_seconds", "first_status_seconds", "first_sse_seconds"):
+        if metric not in record:
+            continue
+        line = f"{metric:>22}: " + ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in record[metric].items())
+        if previous is not None and metric in previous:
+            before = previous[metric]["median"]
+            line += f" (median {(record[metric]['median'] - before) / before:+.0%} vs {previous['revision']})"
+        print(line)
+
+    print("heaviest packages (self import time):")
+    for package, seconds in record["heaviest_packages"].items():
+        is_new = previous is not None and package not in previous["heaviest_packages"]
+        print(f"  {package:>24}: {seconds * 1000:>7.1f}ms" + ("  NEW" if is_new else ""))
+
+    if record["eager_watched_imports"]:
+        print(f"watched heavy dependencies imported at startup: {', '.join(record['eager_watched_imports'])}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh interpreter samples per metric")
+    parser.add_argument("--imports-only", action="store_true", help="only measure the import time")
+    parser.add_argument("--mongodb-uri", help="use this MongoDB instead of a throwaway local mongod")
+    parser.add_argument("--no-record", action="store_true", help=f"do not append the results to {RESULTS_FILE.name}")
+    args = parser.parse_args()
+
+    import_samples, packages = measure_imports(args.runs)
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:HEAVIEST_CNT]
+    record: dict[str, Any] = {
+        "timestamp": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "runs": args.runs,
+        "import_seconds": summarize(import_samples),
+        "heaviest_packages": {package: round(seconds, 4) for package, seconds in heaviest},
+        "eager_watched_imports": [package for package in WATCHED_IMPORTS if package in packages],
+    }
+
+    if not args.imports_only:
+        with mongodb_stand_in(args.mongodb_uri) as mongodb_uri:
+            status_samples, sse_samples = zip(*(measure_server_start(mongodb_uri) for _ in range(args.runs)))
+        record["first_status_seconds"] = summarize(list(status_samples))
+        record["first_sse_seconds"] = summarize(list(sse_samples))
+
+    _report(record, _previous_record())
+
+    if not args.no_record:
+        RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with RESULTS_FILE.open("a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
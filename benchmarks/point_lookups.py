@@ -0,0 +1,97 @@
+"""
+Benchmark unit point lookups on a large unit collection.
+
+Needs a running MongoDB (MONGODB__URI, the benchmark database by default). A synthetic
+collection of --units unit documents is generated once and reused on the later runs.
+Three setups are measured with random uuid lookups:
+
+- no index, find_one sorted by `_id` (the original state, sampled with fewer lookups)
+- (uuid, _id desc) compound index, find_one sorted by `_id`
+- unique uuid index, plain find_one (the current state)
+
+Usage: python -m benchmarks.point_lookups [--units 1000000] [--lookups 2000]
+"""
+import argparse
+import os
+import random
+import time
+from typing import Any
+
+from benchmarks._env import apply_benchmark_env, summarize
+
+apply_benchmark_env()
+
+from pymongo import ASCENDING, DESCENDING, MongoClient  # noqa: E402
+from pymongo.collection import Collection  # noqa: E402
+
+COLLECTION = "unitDataLookupBenchmark"
+INSERT_BATCH = 10_000
+UNINDEXED_LOOKUPS = 20  # every one is a full collection scan
+
+
+def _make_unit(number: int) -> dict[str, Any]:
+    return {
+        "uuid": f"{number:032x}",
+        "internal_id": f"{number:013d}",
+        "status": "built",
+        "schema_id": "2d31e86160d74c6cb6ce83bf249bc853",
+        "components_ids": [],
+        "operation_stages": [{"name": "Stage", "completed": True}],
+    }
+
+
+def populate(collection: Collection, units: int) -> None:
+    if collection.estimated_document_count() == units:
+        return
+    collection.drop()
+    print(f"Generating {units} units...")
+    for start in range(0, units, INSERT_BATCH):
+        collection.insert_many([_make_unit(n) for n in range(start, min(start + INSERT_BATCH, units))], ordered=False)
+
+
+def measure(collection: Collection, uuids: list[str], sort: bool) -> dict[str, float]:
+    kwargs: dict[str, Any] = {"sort": {"_id": -1}} if sort else {}
+    samples = []
+    for uuid in uuids:
+        t0 = time.perf_counter()
+        assert collection.find_one({"uuid": uuid}, **kwargs) is not None
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--units", type=int, default=1_000_000, help="unit collection size")
+    parser.add_argument("--lookups", type=int, default=2000, help="lookups per indexed setup")
+    args = parser.parse_args()
+
+    client: MongoClient = MongoClient(os.environ["MONGODB__URI"])
+    collection = client[os.environ["MONGODB__DB_NAME"]][COLLECTION]
+    populate(collection, args.units)
+    collection.drop_indexes()
+
+    uuids = [f"{random.randrange(args.units):032x}" for _ in range(args.lookups)]
+    results: dict[str, dict[str, float]] = {}
+
+    results["no index, sorted"] = measure(collection, uuids[:UNINDEXED_LOOKUPS], sort=True)
+
+    collection.create_index([("uuid", ASCENDING), ("_id", DESCENDING)])
+    results["compound index, sorted"] = measure(collection, uuids, sort=True)
+    collection.drop_indexes()
+
+    collection.create_index("uuid", unique=True)
+    results["unique index, plain"] = measure(collection, uuids, sort=False)
+
+    print(f"{args.units} units")
+    print(f"{'setup':>24} | {'median':>10} {'p99':>10} {'mean':>10}")
+    for setup, stats in results.items():
+        print(
+            f"{setup:>24} | {stats['median'] * 1000:>8.3f}ms {stats['p99'] * 1000:>8.3f}ms"
+            f" {stats['mean'] * 1000:>8.3f}ms"
+        )
+
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Drive full unit production cycles through the daemon and measure its throughput.
+
+The FastAPI app runs in-process (with its lifespan) and every external service it talks to is
+replaced with a local stand-in:
+
+- business logic start, manual input and stop URIs and the IPFS gateway: a threaded HTTP server
+  with an optional artificial latency (--service-latency-ms)
+- CUPS: a fake `cups` module accepting every print job
+- Robonomics datalog: a fake client recording the posted Merkle roots
+- MongoDB: a throwaway mongod (needs `mongod` on PATH) or the one given with --mongodb-uri.
+  A dedicated database is used and dropped after the run.
+
+Every cycle creates a unit, scans its barcode onto the workbench, runs all of its production
+stages, finalizes the passport (with the QR code printed and the CID queued for the datalog)
+and removes the unit. Latency of every endpoint and sustained cycles per second are reported.
+
+Usage: python -m benchmarks.production_cycle [--cycles 200] [--stages 1] [--service-latency-ms 0]
+                                             [--local-store] [--mongodb-uri URI]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import defaultdict
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from benchmarks._env import REPO_ROOT, apply_benchmark_env, free_port, mongodb_stand_in, summarize
+
+BENCHMARK_DB = "workbench-cycle-benchmark"
+EMPLOYEE_CARD = "0008368511"
+SCHEMA_ID = "cycle-benchmark-schema"
+DATALOG_WINDOW_SECONDS = "1"
+
+
+class _FakeServiceHandler(BaseHTTPRequestHandler):
+    """business logic and IPFS gateway stand-in"""
+
+    latency: float = 0.0
+    published_cnt: int = 0
+
+    def _respond(self, body: dict[str, Any]) -> None:
+        time.sleep(self.latency)
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _fake_cid(self) -> dict[str, str]:
+        type(self).published_cnt += 1
+        cid = f"Qm{type(self).published_cnt:044d}"
+        return {"ipfs_cid": cid, "ipfs_link": f"https://gateway.ipfs.io/ipfs/{cid}"}
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path == "/stop":
+            self._respond(self._fake_cid())
+        else:
+            self.send_error(404)
+
+    def do_POST(self) -> None:  # noqa: N802
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path in ("/start", "/manual-input"):
+            self._respond({"status_code": 200, "detail": "started"})
+        elif self.path.startswith("/publish-to-ipfs/"):
+            self._respond({"status": 200, **self._fake_cid()})
+        else:
+            self.send_error(404)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+
+@contextlib.contextmanager
+def fake_services(latency: float) -> Iterator[str]:
+    """serve the business logic and IPFS gateway stand-in and yield its base URL"""
+    _FakeServiceHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), _FakeServiceHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+
+
+def install_fake_cups() -> list[str]:
+    """make `import cups` load a fake accepting every job. Returns the list the printed files are appended to."""
+    printed: list[str] = []
+
+    class Connection:
+        def getPrinters(self) -> dict[str, dict[str, str]]:  # noqa: N802
+            return {"benchmark-printer": {}}
+
+        def printFile(self, printer: str, filename: str, title: str, options: dict[str, str]) -> int:  # noqa: N802
+            printed.append(filename)
+            return len(printed)
+
+    cups = types.ModuleType("cups")
+    cups.setUser = lambda user: None  # type: ignore[attr-defined]
+    cups.Connection = Connection  # type: ignore[attr-defined]
+    sys.modules["cups"] = cups
+    return printed
+
+
+class FakeDatalogClient:
+    """Robonomics datalog client stand-in"""
+
+    def __init__(self) -> None:
+        self.records: list[str] = []
+        self.account = types.SimpleNamespace(get_address=lambda: "4Gz...benchmark")
+
+    async def record(self, data: str) -> str:
+        self.records.append(data)
+        return f"0x{len(self.records):064x}"
+
+    def get_index(self, address: str) -> dict[str, int]:
+        return {"start": 0, "end": len(self.records)}
+
+
+def configure(mongodb_uri: str, services_url: str, local_store_path: str | None, work_dir: str, log_level: str) -> None:
+    """apply the benchmark configuration. Must be called before the app is imported."""
+    apply_benchmark_env(
+        LOGGING__LEVEL=log_level,
+        LOGGING__FILE_PATH=f"{work_dir}/workbench.log",
+        LOGGING__EVENTS_PATH=f"{work_dir}/production-events.log",
+        MONGODB__URI=mongodb_uri,
+        MONGODB__DB_NAME=BENCHMARK_DB,
+        MONGODB__LOCAL_STORE="true" if local_store_path else "false",
+        MONGODB__LOCAL_STORE_PATH=local_store_path or "",
+        ROBONOMICS__ENABLE_DATALOG="true",
+        ROBONOMICS__BATCH_WINDOW_SECONDS=DATALOG_WINDOW_SECONDS,
+        IPFS_GATEWAY__ENABLE="true",
+        IPFS_GATEWAY__IPFS_SERVER_URI=services_url,
+        PRINTER__ENABLE="true",
+        PRINTER__PRINT_BARCODE="true",
+        PRINTER__PRINT_QR="true",
+        # the seal tag font is resolved relative to the working directory the daemon does not run from
+        PRINTER__PRINT_SECURITY_TAG="false",
+        BUSINESS_LOGIC__START_URI=f"{services_url}/start",
+        BUSINESS_LOGIC__MANUAL_INPUT_URI=f"{services_url}/manual-input",
+        BUSINESS_LOGIC__STOP_URI=f"{services_url}/stop",
+    )
+
+
+def seed(mongodb_uri: str, stages: int) -> None:
+    from pymongo import MongoClient
+
+    client: MongoClient = MongoClient(mongodb_uri)
+    client.drop_database(BENCHMARK_DB)
+    db = client[BENCHMARK_DB]
+    db["employeeData"].insert_one({"rfid_card_id": EMPLOYEE_CARD, "name": "Bench Operator", "position": "Assembler"})
+    db["productionSchemas"].insert_one(
+        {
+            "schema_id": SCHEMA_ID,
+            "schema_name": "Cycle benchmark unit",
+            "schema_stages": [{"name": f"Stage {i}"} for i in range(stages)],
+        }
+    )
+    client.close()
+
+
+def drop(mongodb_uri: str) -> None:
+    from pymongo import MongoClient
+
+    client: MongoClient = MongoClient(mongodb_uri)
+    client.drop_database(BENCHMARK_DB)
+    client.close()
+
+
+class CycleDriver:
+    """runs production cycles through the app recording per endpoint latency"""
+
+    def __init__(self, client: Any, stages: int) -> None:
+        self._client = client
+        self._stages = stages
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.failures: dict[str, int] = defaultdict(int)
+
+    async def _call(self, step: str, method: str, url: str, **kwargs: Any) -> dict[str, Any]:
+        started = time.perf_counter()
+        response = await self._client.request(method, url, **kwargs)
+        self.latencies[step].append(time.perf_counter() - started)
+        if response.status_code != 200:
+            self.failures[step] += 1
+            raise RuntimeError(f"{step} failed with {response.status_code}: {response.text}")
+        return dict(response.json())
+
+    async def log_in(self) -> None:
+        await self._call("log-in", "POST", "/employee/log-in", json={"employee_rfid_card_no": EMPLOYEE_CARD})
+
+    async def cycle(self) -> bool:
+        """run one unit through its whole lifecycle. Returns whether it completed."""
+        try:
+            internal_id = (await self._call("create", "POST", f"/unit/new/{SCHEMA_ID}"))["unit_internal_id"]
+            event = {"string": internal_id, "name": "barcode_reader"}
+            await self._call("scan", "POST", "/workbench/handle-barcode-event", json=event)
+            for _ in range(self._stages):
+                details = {"workbench_details": {"additional_info": {}}}
+                await self._call("start", "POST", "/workbench/start-operation", json=details)
+                await self._call("end", "POST", "/workbench/end-operation", json={"stage_data": {}})
+            await self._call("finalize", "POST", "/unit/upload")
+            await self._call("remove", "POST", "/workbench/remove-unit")
+            return True
+        except RuntimeError as e:
+            print(f"cycle aborted: {e}", file=sys.stderr)
+            with contextlib.suppress(RuntimeError):
+                await self._call("remove", "POST", "/workbench/remove-unit")
+            return False
+
+
+async def drive(app: Any, args: argparse.Namespace) -> tuple[CycleDriver, int, float]:
+    """run the app lifespan and the cycles against it. Returns the driver, completed cycles count and run time."""
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    client = httpx.AsyncClient(transport=transport, base_url="http://benchmark")
+    async with app.router.lifespan_context(app), client:
+        driver = CycleDriver(client, args.stages)
+        await driver.log_in()
+
+        for _ in range(args.warmup):
+            await driver.cycle()
+        driver.latencies.clear()
+        driver.failures.clear()
+
+        started = time.perf_counter()
+        completed = 0
+        for _ in range(args.cycles):
+            completed += await driver.cycle()
+        return driver, completed, time.perf_counter() - started
+
+
+def run(args: argparse.Namespace, mongodb_uri: str, services_url: str, work_dir: str) -> None:
+    local_store_path = f"{work_dir}/workbench.sqlite3" if args.local_store else None
+    configure(mongodb_uri, services_url, local_store_path, work_dir, args.log_level)
+    printed = install_fake_cups()
+    seed(mongodb_uri, args.stages)
+
+    from src.app import app
+    from src.feecc_workbench.robonomics import datalog_connection
+
+    datalog = FakeDatalogClient()
+    datalog_connection._connect = lambda: datalog  # type: ignore[method-assign]
+    Path(REPO_ROOT / "output" / "qr_codes").mkdir(parents=True, exist_ok=True)
+
+    driver, completed, elapsed = asyncio.run(drive(app, args))
+
+    print(f"{completed}/{args.cycles} cycles of {args.stages} stage(s) in {elapsed:.2f}s")
+    print(f"throughput: {completed / elapsed:.1f} cycles/s")
+    print(f"{'endpoint':>10} | {'p50':>10} {'p99':>10} {'mean':>10} | {'calls':>6} {'failed':>6}")
+    for step, samples in driver.latencies.items():
+        stats = summarize(samples)
+        print(
+            f"{step:>10} | {stats['median'] * 1000:>8.2f}ms {stats['p99'] * 1000:>8.2f}ms"
+            f" {stats['mean'] * 1000:>8.2f}ms | {len(samples):>6} {driver.failures[step]:>6}"
+        )
+    print(f"print jobs: {len(printed)}, datalog posts: {len(datalog.records)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=200, help="number of measured unit lifecycles")
+    parser.add_argument("--warmup", type=int, default=5, help="number of unmeasured cycles run first")
+    parser.add_argument("--stages", type=int, default=1, help="production stages per unit")
+    parser.add_argument("--service-latency-ms", type=float, default=0, help="latency of the fake external services")
+    parser.add_argument("--local-store", action="store_true", help="run with the local SQLite store enabled")
+    parser.add_argument("--mongodb-uri", help="use this MongoDB instead of a throwaway local mongod")
+    parser.add_argument("--log-level", default="ERROR", help="daemon log level, logs go to stdout")
+    args = parser.parse_args()
+
+    with (
+        mongodb_stand_in(args.mongodb_uri) as mongodb_uri,
+        fake_services(args.service_latency_ms / 1000) as services_url,
+        tempfile.TemporaryDirectory(prefix="workbench-cycle-benchmark-") as work_dir,
+    ):
+        try:
+            run(args, mongodb_uri, services_url, work_dir)
+        finally:
+            drop(mongodb_uri)
+
+
+if __name__ == "__main__":
+    main()
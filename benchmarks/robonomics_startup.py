@@ -0,0 +1,53 @@
+"""
+Measure the startup cost of the Robonomics integration with datalog enabled.
+
+Every sample imports the datalog module in a fresh interpreter, which is what the daemon
+pays on every restart. With --connect the time of the first connection to the node
+(now paid on the first datalog post instead of the startup) is measured as well.
+
+Usage: python -m benchmarks.robonomics_startup [--runs 10] [--connect]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks._env import apply_benchmark_env, benchmark_env, run_python, summarize
+
+IMPORT_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import src.feecc_workbench.robonomics
+print(time.perf_counter() - t0)
+"""
+
+
+def measure_import(runs: int) -> list[float]:
+    env = benchmark_env(ROBONOMICS__ENABLE_DATALOG="true")
+    return [float(run_python(IMPORT_SNIPPET, env).splitlines()[-1]) for _ in range(runs)]
+
+
+def measure_first_connection() -> float:
+    apply_benchmark_env(ROBONOMICS__ENABLE_DATALOG="true")
+    from src.feecc_workbench.robonomics import datalog_connection
+
+    t0 = time.perf_counter()
+    asyncio.run(datalog_connection.get_client())
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="number of fresh interpreter imports to measure")
+    parser.add_argument("--connect", action="store_true", help="also measure the first connection to the node")
+    args = parser.parse_args()
+
+    stats = summarize(measure_import(args.runs))
+    print(f"robonomics module import with datalog enabled ({args.runs} runs):")
+    print("  " + ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in stats.items()))
+
+    if args.connect:
+        print(f"first datalog client connection: {measure_first_connection() * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
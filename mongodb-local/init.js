@@ -7,31 +7,7 @@ db.createCollection("productionSchemas");
 db.createCollection("productionStagesData");
 db.createCollection("unitData");
 
-// Generate indexes for quicker access
-db.employeeData.createIndex(
-    {
-        rfid_card_id: "text"
-    }
-);
-db.productionSchemas.createIndex(
-    {
-        schema_id: "text",
-        parent_schema_id: 1
-    }
-);
-db.productionStagesData.createIndex(
-    {
-        id: 1,
-        parent_unit_uuid: "text"
-    }
-);
-db.unitData.createIndex(
-    {
-        internal_id: "text",
-        uuid: 1,
-        status: 1
-    }
-);
+// Indexes are created by the daemon on startup (see src/database/indexes.py)
 
 db.employeeData.insertOne(
     {
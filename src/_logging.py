@@ -2,32 +2,123 @@ import logging
 import sys
 from typing import Any
 
+import ecs_logging
+from loguru import logger
 
-# set up logging configurations
-BASE_LOGGING_CONFIG = {
-    "colorize": True,
-    "backtrace": False,
-    "diagnose": True,
-    "catch": True,
-}
-
-# logging settings for the console logs
-CONSOLE_LOGGING_CONFIG = {
-    **BASE_LOGGING_CONFIG,  # type: ignore
-    "level": "DEBUG",
-    "sink": sys.stdout,
-}
-
-# logging settings for the log file
-FILE_LOGGING_CONFIG = {
-    **BASE_LOGGING_CONFIG,  # type: ignore
-    "level": "DEBUG",
-    "sink": "workbench.log",
-    "rotation": "10 MB",
-    "compression": "zip",
-}
-# Set up handlers list
-HANDLERS: list[dict[str, Any]] = [FILE_LOGGING_CONFIG, CONSOLE_LOGGING_CONFIG]
+from src.config import Logging
+
+ECS_EXTRA_KEY = "_ecs_json"
+
+
+def _is_production_event(record: dict[str, Any]) -> bool:
+    return "production_event" in record["extra"]
+
+
+class _LevelFilter:
+    """Drops production events and the records below the level configured for their module"""
+
+    def __init__(self, level: str, module_levels: dict[str, str]) -> None:
+        self.default = logger.level(level.upper()).no
+        # the longest prefix is the most specific one
+        self._module_levels = sorted(
+            ((module, logger.level(module_level.upper()).no) for module, module_level in module_levels.items()),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+        self._cache: dict[str, int] = {}
+
+    @property
+    def min_level(self) -> int:
+        return min([self.default, *(level for _, level in self._module_levels)])
+
+    def _level(self, name: str) -> int:
+        if name not in self._cache:
+            matching = (
+                level for module, level in self._module_levels if name == module or name.startswith(f"{module}.")
+            )
+            self._cache[name] = next(matching, self.default)
+        return self._cache[name]
+
+    def __call__(self, record: dict[str, Any]) -> bool:
+        return not _is_production_event(record) and record["level"].no >= self._level(record["name"] or "")
+
+
+_ecs_formatter = ecs_logging.StdlibFormatter()
+
+
+def _ecs_format(record: dict[str, Any]) -> str:
+    """render the record as an ECS JSON line using the stdlib formatter of ecs-logging"""
+    exception = record["exception"]
+    stdlib_record = logging.LogRecord(
+        name=record["name"] or "",
+        level=record["level"].no,
+        pathname=record["file"].path,
+        lineno=record["line"],
+        msg=record["message"],
+        args=(),
+        exc_info=(exception.type, exception.value, exception.traceback) if exception else None,
+        func=record["function"],
+    )
+    stdlib_record.levelname = record["level"].name
+    stdlib_record.created = record["time"].timestamp()
+    stdlib_record.msecs = record["time"].microsecond // 1000
+    stdlib_record.thread, stdlib_record.threadName = record["thread"].id, record["thread"].name
+    stdlib_record.process, stdlib_record.processName = record["process"].id, record["process"].name
+    stdlib_record.__dict__.update(record["extra"])
+    record["extra"][ECS_EXTRA_KEY] = _ecs_formatter.format(stdlib_record)
+    return f"{{extra[{ECS_EXTRA_KEY}]}}\n"
+
+
+def _truncating_patcher(max_length: int) -> Any:
+    def patch(record: dict[str, Any]) -> None:
+        message = record["message"]
+        if len(message) > max_length and not _is_production_event(record):
+            record["message"] = f"{message[:max_length]}... [{len(message) - max_length} more characters]"
+
+    return patch
+
+
+def logging_handlers(settings: Logging) -> list[dict[str, Any]]:
+    """loguru handlers for the logging settings: console, log file and the production event log"""
+    level_filter = _LevelFilter(settings.level, settings.module_levels)
+    base_config: dict[str, Any] = {
+        "level": level_filter.min_level,  # lets loguru skip the records no sink accepts before formatting them
+        "filter": level_filter,
+        "backtrace": False,
+        "diagnose": settings.diagnose,
+        "catch": True,
+        "enqueue": settings.enqueue,
+    }
+
+    # logging settings for the console logs
+    console_config = {**base_config, "sink": sys.stdout, "colorize": True}
+
+    # logging settings for the log file, rotated and compressed by the writer thread when enqueued
+    file_config = {**base_config, "sink": settings.file_path, "rotation": "10 MB", "compression": "zip"}
+    if settings.ecs_json:
+        file_config["format"] = _ecs_format
+
+    # per unit production events, one JSON object per line
+    event_log_config = {
+        "level": "INFO",
+        "sink": settings.events_path,
+        "format": "{message}",
+        "filter": _is_production_event,
+        "rotation": "10 MB",
+        "compression": "zip",
+        "catch": True,
+        "enqueue": settings.enqueue,
+    }
+
+    return [file_config, console_config, event_log_config]
+
+
+def configure_logging(settings: Logging) -> None:
+    """replace the loguru handlers with the ones for the logging settings"""
+    logger.configure(
+        handlers=logging_handlers(settings),
+        patcher=_truncating_patcher(settings.max_message_length),  # type: ignore[arg-type]
+    )
 
 
 # disable Uvicorn's access logs for specified endpoints
@@ -1,46 +1,105 @@
-import os
+import time
+
+IMPORT_STARTED_AT = time.perf_counter()
+
+import asyncio  # noqa: E402
+import os  # noqa: E402
+from contextlib import asynccontextmanager  # noqa: E402
 
-import uvicorn
 from aioprometheus.asgi.middleware import MetricsMiddleware
 from aioprometheus.asgi.starlette import metrics
-from fastapi import FastAPI, status
+from fastapi import Depends, FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
+from pymongo.errors import ConnectionFailure
+from aioprometheus.collectors import Gauge
 from sse_starlette import EventSourceResponse
-from contextlib import asynccontextmanager
 
-from src.routers import employee_router, unit_router, workbench_router
+from src.config import CONFIG, Logging, get_settings
+from src.routers import admin_router, employee_router, unit_router, workbench_router
 from src.database.database import BaseMongoDbWrapper
-from src._logging import HANDLERS
+from src.database.indexes import ensure_indexes
+from src.database.sync import local_store_sync
+from src._logging import configure_logging
 from src.feecc_workbench.Messenger import MessageLevels, message_generator, messenger
 from src.database.models import GenericResponse
+from src.dependencies import get_workbench, workbench_number_path
+from src.feecc_workbench.loop_watchdog import loop_watchdog
+from src.feecc_workbench.metrics import metrics as production_metrics
+from src.feecc_workbench.profiler import install_task_age_tracking
+from src.feecc_workbench.robonomics import datalog_batcher
 from src.feecc_workbench.utils import check_service_connectivity
-from src.feecc_workbench.WorkBench import Workbench
+from src.feecc_workbench.WorkBench import Workbenches, _WorkBench
+from src.unit.unit_wrapper import UnitWrapper
+
+# apply the default logging configuration until the settings are read
+configure_logging(Logging())
+
+
+cold_start = Gauge("app_cold_start_seconds", "Time spent on the daemon startup phases")
+
 
-# apply logging configuration
-logger.configure(handlers=HANDLERS)
+async def _init_database() -> None:
+    await asyncio.to_thread(BaseMongoDbWrapper.connect)
+    try:
+        await asyncio.to_thread(ensure_indexes)
+    except ConnectionFailure as e:
+        logger.warning(f"MongoDB is unreachable, indexes will be ensured on the next start: {e}")
 
 
 # create lifespan function for startup and shutdown events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    check_service_connectivity()
+    init_started_at = time.perf_counter()
+    install_task_age_tracking(asyncio.get_running_loop())
+    get_settings()  # fail fast on a bad configuration
+    configure_logging(CONFIG.logging)
+    if CONFIG.loop_watchdog.enable:
+        loop_watchdog.start()
+    production_metrics.initialize()
     app_version = os.getenv("VERSION", "Unknown")
     logger.info(f"Runtime app version: {app_version}")
 
+    # independent initialization steps run concurrently, blocking ones in threads
+    await asyncio.gather(check_service_connectivity(), _init_database(), Workbenches.initialize())
+
+    if CONFIG.mongodb.local_store:
+        local_store_sync.start()
+
+    if CONFIG.robonomics.enable_datalog:
+        await asyncio.to_thread(datalog_batcher.reconcile)
+        datalog_batcher.start()
+
+    ready_at = time.perf_counter()
+    phases = {"imports": init_started_at - IMPORT_STARTED_AT, "initialization": ready_at - init_started_at}
+    for phase, seconds in phases.items():
+        cold_start.set({"phase": phase}, seconds)
+    logger.info(
+        f"Startup complete in {ready_at - IMPORT_STARTED_AT:.2f}s "
+        f"(imports {phases['imports']:.2f}s, initialization {phases['initialization']:.2f}s)"
+    )
+
     yield
 
-    await Workbench.shutdown()
+    await Workbenches.shutdown()
+    await datalog_batcher.shutdown()
+    UnitWrapper.flush()
+    await local_store_sync.shutdown()
+    await loop_watchdog.shutdown()
     BaseMongoDbWrapper.close_connection()
+    await logger.complete()
 
 
 # create app
 app = FastAPI(title="Feecc Workbench daemon", lifespan=lifespan)
 
-# include routers
-app.include_router(employee_router)
-app.include_router(unit_router)
-app.include_router(workbench_router)
+# include routers. Workbench routes address the default workbench or the one in the X-Workbench-Number header
+# and are also served under the prefix addressing the hosted workbenches by path.
+BENCH_PREFIX = "/benches/{workbench_number}"
+for router in (employee_router, unit_router, workbench_router):
+    app.include_router(router)
+    app.include_router(router, prefix=BENCH_PREFIX, dependencies=[Depends(workbench_number_path)])
+app.include_router(admin_router)
 
 # set up CORS
 app.add_middleware(
@@ -57,18 +116,24 @@ app.add_route("/metrics", metrics)
 
 
 @app.get("/notifications", tags=["notifications"])
-async def stream_notifications() -> EventSourceResponse:
-    """Stream backend emitted notifications into an SSE stream"""
-    stream = message_generator()
+@app.get(f"{BENCH_PREFIX}/notifications", tags=["notifications"], dependencies=[Depends(workbench_number_path)])
+async def stream_notifications(workbench: _WorkBench = Depends(get_workbench)) -> EventSourceResponse:  # noqa: B008
+    """Stream backend emitted notifications of the workbench into an SSE stream"""
+    stream = message_generator(workbench.number)
     return EventSourceResponse(stream)
 
 
 @app.post("/notifications", tags=["notifications"])
-async def emit_notification(level: MessageLevels, message: str) -> GenericResponse:
-    """Emit notification into an SSE stream"""
+@app.post(f"{BENCH_PREFIX}/notifications", tags=["notifications"], dependencies=[Depends(workbench_number_path)])
+async def emit_notification(
+    level: MessageLevels, message: str, workbench: _WorkBench = Depends(get_workbench)  # noqa: B008
+) -> GenericResponse:
+    """Emit notification into the SSE stream of the workbench"""
     await messenger.emit_message(level, message)
     return GenericResponse(status_code=status.HTTP_200_OK, detail="Notification emitted")
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("app:app", port=5000)
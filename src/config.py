@@ -1,3 +1,6 @@
+import functools
+from typing import Any, Literal, cast
+
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -5,12 +8,23 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class MongoDB(BaseModel):
     uri: str
     db_name: str
+    write_behind_window_seconds: float = 0.5
+    write_behind_max_documents: int = 100
+    server_selection_timeout_ms: int = 3000
+    slow_query_ms: float = 200.0
+    local_store: bool = False
+    local_store_path: str = "local-store/workbench.sqlite3"
+    local_store_sync_interval_seconds: float = 5.0
+    local_store_mirror_refresh_seconds: float = 300.0
+    local_store_unit_max_age_seconds: float = 7 * 24 * 3600
 
 
 class RobonomicsNetwork(BaseModel):
     enable_datalog: bool
     account_seed: str
     substrate_node_uri: str
+    batch_max_size: int = 50
+    batch_window_seconds: float = 60.0
 
 
 class IPFSGateway(BaseModel):
@@ -29,9 +43,14 @@ class Printer(BaseModel):
 
 
 class Workbench(BaseModel):
-    number: int
+    number: int  # the default workbench, addressed by the requests which do not specify one
+    hosted_numbers: list[int] = []  # other workbenches hosted by the same daemon
     login: bool
     dummy_employee: str
+    hid_events_record_path: str | None = None
+    hid_debounce_ms: float = 300.0
+    # every state transition is saved here to resume from after a crash or a restart, empty disables
+    snapshot_dir: str | None = "local-store/snapshots"
 
 
 class BusinessLogic(BaseModel):
@@ -40,6 +59,37 @@ class BusinessLogic(BaseModel):
     stop_uri: str
 
 
+class Logging(BaseModel):
+    level: str = "DEBUG"
+    module_levels: dict[str, str] = {}  # e.g. {"src.database": "INFO"}, the longest matching module prefix wins
+    ecs_json: bool = False  # write the log file as ECS JSON lines
+    enqueue: bool = True  # sinks are written by a background thread, off the request path
+    diagnose: bool = False  # show variable values in tracebacks, slow and may leak data
+    max_message_length: int = 2000
+    file_path: str = "workbench.log"
+    events_path: str = "production-events.log"
+
+
+class LoopWatchdog(BaseModel):
+    enable: bool = True
+    interval_ms: float = 100.0
+    block_threshold_ms: float = 250.0
+
+
+class StateStore(BaseModel):
+    # where the authoritative workbench state is kept: "memory" for a single process, "sqlite" for several
+    # worker processes on one host, "mongodb" for processes on any host
+    backend: Literal["memory", "sqlite", "mongodb"] = "memory"
+    sqlite_path: str = "local-store/workbench-state.sqlite3"
+    poll_interval_ms: float = 200.0  # how often the changes made by the other processes are looked for
+    claim_seconds: float = 30.0  # a transition claim of a process which has died expires after this time
+
+
+class Admin(BaseModel):
+    token: str | None = None  # admin endpoints are disabled unless set
+    profile_max_seconds: float = 60.0
+
+
 class _Settings(BaseSettings):
     model_config = SettingsConfigDict(env_nested_delimiter="__")
 
@@ -51,6 +101,23 @@ class _Settings(BaseSettings):
     printer: Printer
     workbench: Workbench
     business_logic: BusinessLogic
+    admin: Admin = Admin()
+    logging: Logging = Logging()
+    loop_watchdog: LoopWatchdog = LoopWatchdog()
+    state_store: StateStore = StateStore()
+
+
+@functools.cache
+def get_settings() -> _Settings:
+    """read and validate the settings. Happens once, on the first access."""
+    return _Settings()
+
+
+class _LazySettings:
+    """Reads the settings from the environment on the first attribute access, so imports need no configuration"""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_settings(), name)
 
 
-CONFIG = _Settings()
+CONFIG = cast(_Settings, _LazySettings())
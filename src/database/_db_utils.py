@@ -1,20 +1,12 @@
-import sys
-
 from loguru import logger
 from pymongo import MongoClient
 
 
-def _get_database_client(mongo_connection_uri: str) -> MongoClient:
-    """Get MongoDB connection url"""
+def _get_database_client(mongo_connection_uri: str, server_selection_timeout_ms: int) -> MongoClient:
+    """Get MongoDB client. The connection itself is established lazily, so an unreachable server is not fatal."""
     try:
-        db_client: MongoClient = MongoClient(mongo_connection_uri)
-        return db_client
-
+        return MongoClient(mongo_connection_uri, serverSelectionTimeoutMS=server_selection_timeout_ms)
     except Exception as e:
-        message = (
-            f"Failed to establish database connection: {e}. "
-            f"Is the provided URI correct? {mongo_connection_uri=} Exiting."
-        )
+        message = f"Failed to create the database client: {e}. Is the provided URI correct? {mongo_connection_uri=}"
         logger.critical(message)
-        sys.exit(1)
-
+        raise
@@ -1,60 +1,505 @@
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from typing import Any
 
+import pymongo
 from loguru import logger
 from pymongo import MongoClient
 from pymongo.database import Database
+from pymongo.errors import ConnectionFailure, DuplicateKeyError, PyMongoError
 from pymongo.results import BulkWriteResult
 
 from src.database._db_utils import _get_database_client
+from src.database.instrumentation import instrumented, observe, served_locally
+from src.database.local_store import LocalStore, NotServable, matches, project
 from src.config import CONFIG
 from src.feecc_workbench.Types import Document
 
+# small, rarely changing collections fully mirrored into the local store for offline reads
+MIRRORED_COLLECTIONS = ("employeeData", "productionSchemas")
+# mirrored collections read locally first. The employees are read from MongoDB while it is reachable,
+# so a revoked employee (or a changed password) does not keep authenticating until the mirror is refreshed.
+MIRROR_FIRST_COLLECTIONS = ("productionSchemas",)
+# collections whose recently used documents are kept locally (by the key field) for offline reads
+CACHED_COLLECTIONS = {"unitData": "uuid"}
+# projections which keep the documents whole, so the results can be cached
+CACHEABLE_PROJECTIONS = (None, {"_id": 0})
+JOURNAL_REPLAY_BATCH = 100
+# attempts to replay a journaled write rewritten by the conflict resolver of its collection
+CONFLICT_RESOLUTION_ATTEMPTS = 5
+
+
+def _describe_request(request: Any) -> dict[str, Any]:
+    """make a journal-friendly description of a bulk write request"""
+    return {
+        "type": type(request).__name__,
+        "filter": getattr(request, "_filter", None),
+        "doc": getattr(request, "_doc", None),
+        "upsert": getattr(request, "_upsert", None),
+    }
+
+
+def _restore_request(description: dict[str, Any]) -> Any:
+    request_type = getattr(pymongo, description["type"])
+    if description["type"] == "InsertOne":
+        return request_type(description["doc"])
+    if description["type"] in ("DeleteOne", "DeleteMany"):
+        return request_type(description["filter"])
+    return request_type(description["filter"], description["doc"], upsert=bool(description["upsert"]))
+
+
+class JournalConflictResolver(ABC):
+    """
+    Resolves the journaled writes of a collection which MongoDB rejects on replay for a duplicate key.
+    Such writes were made offline, when the conflict could not be noticed.
+    """
+
+    @abstractmethod
+    def resolve(
+        self, operation: str, payload: dict[str, Any], error: DuplicateKeyError
+    ) -> tuple[dict[str, Any], str] | None:
+        """the write to replay instead along with a warning for the operators, None to reject the write"""
+
+    def rewrite(self, operation: str, payload: dict[str, Any]) -> dict[str, Any]:
+        """adjust a later journaled write to the earlier resolutions"""
+        return payload
+
 
 class _BaseMongoDbWrapper:
-    """handles interactions with MongoDB database"""
+    """
+    handles interactions with MongoDB database
+
+    Writes go through the local store journal whenever MongoDB is unreachable (or earlier writes are still
+    waiting to be replayed), so the bench keeps working offline. Mirrored collections are read locally first.
+    """
 
-    @logger.catch
     def __init__(self) -> None:
-        logger.info("Trying to connect to MongoDB")
+        # the client and the local store are created on startup or on the first use, not on import
+        self._client: MongoClient | None = None
+        self._db: Database | None = None
+        self._local_store: LocalStore | None = None
+        self._offline = False
+        # whether the journal holds writes yet to be replayed, kept in memory to spare a count on every read
+        self._journal_pending = False
+        self._journal_lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._conflict_resolvers: dict[str, JournalConflictResolver] = {}
+        self._replay_warnings: list[str] = []
+
+    def connect(self) -> None:
+        """Create the MongoDB client and open the local store if it is enabled"""
+        with self._connect_lock:
+            if self._client is not None:
+                return
+
+            logger.info("Trying to connect to MongoDB")
+            client = _get_database_client(CONFIG.mongodb.uri, CONFIG.mongodb.server_selection_timeout_ms)
+            self._db = client[CONFIG.mongodb.db_name]
+            if CONFIG.mongodb.local_store:
+                self._local_store = LocalStore(CONFIG.mongodb.local_store_path)
+                self._journal_pending = self._local_store.journal_size() > 0
+            self._client = client
+            logger.info("MongoDB client created")
 
-        self._client: MongoClient = _get_database_client(CONFIG.mongodb.uri)
-        self._database: Database = self._client[CONFIG.mongodb.db_name]
+    @property
+    def _database(self) -> Database:
+        if self._db is None:
+            self.connect()
+        assert self._db is not None
+        return self._db
 
-        logger.info("Successfully connected to MongoDB")
+    @property
+    def _local(self) -> LocalStore | None:
+        if self._client is None:
+            self.connect()
+        return self._local_store
+
+    @property
+    def offline(self) -> bool:
+        return self._offline
 
     def close_connection(self) -> None:
+        if self._client is None:
+            return
         self._client.close()
+        if self._local_store is not None:
+            self._local_store.close()
         logger.info("MongoDB connection closed")
 
-    def create_index(self, collection: str, index_name: str) -> None:
-        self._database[collection].create_index(index_name)
+    def _go_offline(self, error: Exception) -> None:
+        if not self._offline:
+            logger.warning(f"MongoDB is unreachable, working offline: {error}")
+        self._offline = self._local is not None
 
-    def insert(self, collection: str, entity: dict[str, Any]) -> None:
-        """Inserts the entity in the specified collection."""
-        self._database[collection].insert_one(entity)
+    def ping(self) -> bool:
+        try:
+            self._database.client.admin.command("ping")
+            return True
+        except ConnectionFailure:
+            return False
+
+    def create_index(self, collection: str, keys: str | list[tuple[str, int]], **kwargs: Any) -> str:
+        """Creates the index if it does not exist yet and returns its name."""
+        return self._database[collection].create_index(keys, **kwargs)
 
+    def index_information(self, collection: str) -> dict[str, Any]:
+        """Returns all the indexes of the collection keyed by their names."""
+        return self._database[collection].index_information()
+
+    def drop_index(self, collection: str, index_name: str) -> None:
+        self._database[collection].drop_index(index_name)
+
+    def explain(self, collection: str, filters: dict[str, Any], **kwargs: Any) -> Document:
+        """Returns the query plan explanation for the find query."""
+        return self._database[collection].find(filter=filters, **kwargs).explain()
+
+    # reads
+
+    def _is_mirrored(self, collection: str) -> bool:
+        if self._local is None or collection not in MIRROR_FIRST_COLLECTIONS:
+            return False
+        return self._local.has_collection(collection)
+
+    def _has_journaled_writes(self, collection: str) -> bool:
+        """journaled writes are only reflected in the local copy of the cached collections till they are replayed"""
+        return self._local is not None and collection in CACHED_COLLECTIONS and self._journal_pending
+
+    def _find_locally(self, collection: str, filters: dict[str, Any], **kwargs: Any) -> list[Document] | None:
+        """find the documents in the local store. Returns None if the query cannot be served locally."""
+        if self._local is None or set(kwargs) - {"projection"}:
+            return None
+        try:
+            documents = self._local.find(collection, filters)
+        except NotServable:
+            return None
+        return [project(document, kwargs.get("projection")) for document in documents]
+
+    def _with_journaled_writes(
+        self, collection: str, documents: list[Document], filters: dict[str, Any], **kwargs: Any
+    ) -> list[Document]:
+        """
+        serve the documents with the journaled writes MongoDB has not seen yet in their local version.
+        Queries the local store cannot serve (e.g. sorted or partially projected ones) are returned as they are.
+        """
+        key_field = CACHED_COLLECTIONS[collection]
+        local = self._find_locally(collection, filters, **kwargs)
+        if local is None or kwargs.get("projection") not in CACHEABLE_PROJECTIONS:
+            return documents
+        assert self._local is not None
+        keys = [document[key_field] for document in documents if key_field in document]
+        stored = {d[key_field]: d for d in self._local.find(collection, {key_field: {"$in": keys}})}
+
+        result = []
+        for document in documents:
+            local_version = stored.get(document.get(key_field))
+            if local_version is None:
+                result.append(document)
+            elif matches(local_version, filters):  # a journaled update may have taken it out of the result
+                result.append(project(local_version, kwargs.get("projection")))
+        result.extend(document for document in local if document.get(key_field) not in stored)
+        return result
+
+    def _cache(self, collection: str, documents: list[Document], projection: dict[str, Any] | None) -> None:
+        """keep the documents of the cached collections locally for offline reads"""
+        key_field = CACHED_COLLECTIONS.get(collection)
+        if self._local is None or key_field is None or projection not in CACHEABLE_PROJECTIONS:
+            return
+        for document in documents:
+            if key_field in document:
+                self._local.put(collection, str(document[key_field]), document)
+
+    def _offline_error(self, collection: str) -> ConnectionFailure:
+        return ConnectionFailure(f"MongoDB is offline and the {collection} query cannot be served locally")
+
+    @instrumented("find")
     def find(self, collection: str, filters: dict[str, Any] = {}, **kwargs) -> list[Document]:
         """Returns the list of all items if filter is not specified. Otherwise returns the whole collection."""
-        return list(self._database[collection].find(filter=filters, **kwargs))
+        if self._offline or self._is_mirrored(collection):
+            if (local := self._find_locally(collection, filters, **kwargs)) is not None:
+                served_locally()
+                return local
+            if self._offline:
+                raise self._offline_error(collection)
+
+        try:
+            documents = list(self._database[collection].find(filter=filters, **kwargs))
+        except ConnectionFailure as e:
+            self._go_offline(e)
+            if (local := self._find_locally(collection, filters, **kwargs)) is not None:
+                served_locally()
+                return local
+            raise
 
+        if self._has_journaled_writes(collection):
+            # caching the MongoDB versions would overwrite the journaled ones
+            return self._with_journaled_writes(collection, documents, filters, **kwargs)
+        self._cache(collection, documents, kwargs.get("projection"))
+        return documents
+
+    @instrumented("find_iter")
+    def find_iter(self, collection: str, filters: dict[str, Any], **kwargs) -> Iterator[Document]:
+        """
+        Returns a cursor streaming the matched documents instead of loading them all at once.
+        Offline the documents are read locally. A connection lost mid-stream is raised to the caller.
+        """
+        if self._offline:
+            if (local := self._find_locally(collection, filters, **kwargs)) is not None:
+                served_locally()
+                return iter(local)
+            raise self._offline_error(collection)
+        return self._database[collection].find(filter=filters, **kwargs)
+
+    @instrumented("count")
+    def count(self, collection: str, filters: dict[str, Any]) -> int:
+        """Returns the number of documents matching the filter. Offline only the local documents are counted."""
+        if not self._offline:
+            try:
+                return self._database[collection].count_documents(filters)
+            except ConnectionFailure as e:
+                self._go_offline(e)
+                if not self._offline:
+                    raise
+        if (local := self._find_locally(collection, filters)) is not None:
+            served_locally()
+            return len(local)
+        raise self._offline_error(collection)
+
+    @instrumented("find_one")
     def find_one(self, collection: str, filters: dict[str, Any], **kwargs) -> dict[str, Any] | None:
-        return self._database[collection].find_one(filter=filters, sort={"_id": -1}, **kwargs)
+        """Returns the document matching the filter. Lookup fields are unique, so there is at most one."""
+        if self._offline or self._is_mirrored(collection) or self._has_journaled_writes(collection):
+            local = self._find_locally(collection, filters, **kwargs)
+            if local:
+                served_locally()
+                return local[0]
+            # a local miss is only final when there is nowhere else to look
+            if self._offline:
+                if local is None:
+                    raise self._offline_error(collection)
+                served_locally()
+                return None
+
+        try:
+            document = self._database[collection].find_one(filter=filters, **kwargs)
+        except ConnectionFailure as e:
+            self._go_offline(e)
+            if (local := self._find_locally(collection, filters, **kwargs)) is not None:
+                served_locally()
+                return local[0] if local else None
+            raise
 
-    def update(self, collection: str, update: dict[str, Any], filters: dict[str, Any]) -> None:
+        if document is not None:
+            self._cache(collection, [document], kwargs.get("projection"))
+        return document
+
+    @instrumented("aggregate")
+    def aggregate(self, collection: str, pipeline: list[dict[str, Any]]) -> list[Document]:
+        """Perform the aggregation and return matched Documents. Pipelines cannot be served locally."""
+        if self._offline:
+            raise self._offline_error(collection)
+        try:
+            return list(self._database[collection].aggregate(pipeline))
+        except ConnectionFailure as e:
+            self._go_offline(e)
+            raise
+
+    # writes
+
+    def _apply_locally(self, collection: str, operation: str, payload: dict[str, Any]) -> None:
+        """keep the local copy of the cached and mirrored collections in line with the write"""
+        if self._local is None:
+            return
+        key_field = CACHED_COLLECTIONS.get(collection)
+        if key_field is None and collection not in MIRRORED_COLLECTIONS:
+            return
+
+        requests = payload["requests"] if operation == "bulk_write" else [payload]
+        try:
+            for request in requests:
+                if request["type"] == "InsertOne" and key_field and key_field in request["doc"]:
+                    self._local.put(collection, str(request["doc"][key_field]), dict(request["doc"]))
+                elif request["type"] in ("UpdateOne", "UpdateMany") and "$set" in request["doc"]:
+                    self._local.update(collection, request["filter"], request["doc"]["$set"])
+                elif request["type"] == "ReplaceOne":
+                    self._local.update(collection, request["filter"], request["doc"])
+                elif request["type"] in ("DeleteOne", "DeleteMany"):
+                    self._local.delete(collection, request["filter"])
+        except NotServable:
+            pass  # the local copy is refreshed from MongoDB later on
+
+    def _execute(self, collection: str, operation: str, payload: dict[str, Any]) -> Any:
+        target = self._database[collection]
+        if operation == "bulk_write":
+            return target.bulk_write([_restore_request(request) for request in payload["requests"]])
+        if operation == "insert":
+            return target.insert_one(payload["doc"])
+        if operation == "update":
+            return target.update_one(payload["filter"], payload["doc"], upsert=payload["upsert"])
+        return target.delete_one(payload["filter"])
+
+    def _write(self, collection: str, operation: str, payload: dict[str, Any]) -> Any:
+        """perform the write or journal it to be replayed once MongoDB is reachable again"""
+        requests = payload["requests"] if operation == "bulk_write" else [payload]
+        filters = requests[0].get("filter") if requests else None
+        with observe(collection, operation, filters) as observation:
+            observation.add(request.get("doc") or request.get("filter") or {} for request in requests)
+            return self._write_through_journal(collection, operation, payload)
+
+    def _journal(self, collection: str, operation: str, payload: dict[str, Any]) -> None:
+        """append the write to the journal, the journal lock must be held"""
+        assert self._local is not None
+        self._local.journal_append(collection, operation, payload)
+        self._journal_pending = True
+
+    def _write_through_journal(self, collection: str, operation: str, payload: dict[str, Any]) -> Any:
+        """
+        The local copy only follows the writes MongoDB has accepted or the journaled ones,
+        so a write MongoDB rejects (e.g. a duplicate key) never shows up in the local reads.
+        """
+        if self._local is None:
+            return self._execute(collection, operation, payload)
+
+        # writes are journaled while the earlier ones are pending, so the order is kept
+        with self._journal_lock:
+            journaled = self._offline or self._journal_pending
+            if journaled:
+                self._journal(collection, operation, payload)
+        if journaled:
+            served_locally()
+            self._apply_locally(collection, operation, payload)
+            return None
+
+        try:
+            result = self._execute(collection, operation, payload)
+        except ConnectionFailure as e:
+            self._go_offline(e)
+            with self._journal_lock:
+                self._journal(collection, operation, payload)
+            served_locally()
+            self._apply_locally(collection, operation, payload)
+            return None
+        self._apply_locally(collection, operation, payload)
+        return result
+
+    def insert(self, collection: str, entity: dict[str, Any]) -> None:
+        """Inserts the entity in the specified collection."""
+        self._write(collection, "insert", {"type": "InsertOne", "doc": entity})
+
+    def update(self, collection: str, update: dict[str, Any], filters: dict[str, Any], upsert: bool = False) -> None:
         """Updates the specified document's fields."""
-        self._database[collection].find_one_and_update(filter=filters, update=update, sort={"_id": -1})
+        self._write(collection, "update", {"type": "UpdateOne", "filter": filters, "doc": update, "upsert": upsert})
 
     def delete(self, collection: str, filters: dict[str, Any]) -> None:
         """Deletes filtered results and returns it's number."""
-        self._database[collection].delete_one(filter=filters)
+        self._write(collection, "delete", {"type": "DeleteOne", "filter": filters})
 
-    def bulk_write(self, collection: str, items: list[Any]) -> BulkWriteResult:
-        """Inserts or updates multiple documents at once."""
-        return self._database[collection].bulk_write(items)
+    def bulk_write(self, collection: str, items: list[Any]) -> BulkWriteResult | None:
+        """Inserts or updates multiple documents at once. Returns None if the write has been journaled."""
+        return self._write(collection, "bulk_write", {"requests": [_describe_request(item) for item in items]})
 
-    def aggregate(self, collection: str, pipeline: list[dict[str, Any]]) -> list[Document]:
-        """Perform the aggregation and return matched Documents."""
-        return list(self._database[collection].aggregate(pipeline))
+    # conditional writes are never journaled, the caller needs the answer of MongoDB
+
+    @instrumented("insert_unique")
+    def insert_unique(self, collection: str, entity: dict[str, Any]) -> bool:
+        """Inserts the entity unless it violates a unique index. Returns False if it does."""
+        try:
+            self._database[collection].insert_one(dict(entity))
+        except DuplicateKeyError:
+            return False
+        return True
+
+    @instrumented("update_matching")
+    def update_matching(self, collection: str, update: dict[str, Any], filters: dict[str, Any]) -> bool:
+        """Updates the document matching the filters. Returns False if there is none."""
+        return self._database[collection].update_one(filters, update).matched_count > 0
+
+    # local store synchronization
+
+    def register_conflict_resolver(self, collection: str, resolver: JournalConflictResolver) -> None:
+        self._conflict_resolvers[collection] = resolver
+
+    def pop_replay_warnings(self) -> list[str]:
+        """get the warnings about the journaled writes resolved on replay since the last call"""
+        with self._journal_lock:
+            warnings, self._replay_warnings = self._replay_warnings, []
+        return warnings
+
+    def _replay(self, collection: str, operation: str, payload: dict[str, Any]) -> None:
+        """replay a journaled write, resolving a duplicate key conflict if the collection has a resolver"""
+        resolver = self._conflict_resolvers.get(collection)
+        if resolver is None:
+            self._execute(collection, operation, payload)
+            return
+
+        payload = resolver.rewrite(operation, payload)
+        for attempt in range(1, CONFLICT_RESOLUTION_ATTEMPTS + 1):
+            try:
+                self._execute(collection, operation, payload)
+                return
+            except DuplicateKeyError as e:
+                resolution = resolver.resolve(operation, payload, e)
+                if resolution is None or attempt == CONFLICT_RESOLUTION_ATTEMPTS:
+                    raise
+                resolved, warning = resolution
+                logger.warning(warning)
+                with self._journal_lock:
+                    self._replay_warnings.append(warning)
+                self._apply_resolution_locally(collection, payload, resolved)
+                payload = resolved
+
+    def _apply_resolution_locally(self, collection: str, payload: dict[str, Any], resolved: dict[str, Any]) -> None:
+        """carry the fields changed by the resolution of a journaled insert over to the local copy"""
+        key_field = CACHED_COLLECTIONS.get(collection)
+        document, resolved_document = payload.get("doc") or {}, resolved.get("doc") or {}
+        if key_field is None or payload.get("type") != "InsertOne" or key_field not in document:
+            return
+        changed = {k: v for k, v in resolved_document.items() if document.get(k) != v}
+        update = {"type": "UpdateOne", "filter": {key_field: document[key_field]}, "doc": {"$set": changed}}
+        self._apply_locally(collection, "update", update)
+
+    def replay_journal(self) -> int:
+        """Replay the journaled writes to MongoDB in order. Returns the number of replayed writes."""
+        if self._local is None:
+            return 0
+
+        replayed_cnt = 0
+
+        while True:
+            with self._journal_lock:
+                entries = self._local.journal_head(JOURNAL_REPLAY_BATCH)
+                if not entries:
+                    if self._offline:
+                        logger.info("MongoDB is reachable again, working online")
+                    self._offline = False
+                    self._journal_pending = False
+                    return replayed_cnt
+
+            for entry in entries:
+                try:
+                    self._replay(entry.collection, entry.operation, entry.payload)
+                except ConnectionFailure as e:
+                    self._go_offline(e)
+                    return replayed_cnt
+                except PyMongoError as e:
+                    logger.error(f"Journaled {entry.operation} on {entry.collection} rejected by MongoDB: {e}")
+                    self._local.journal_reject(entry.seq, str(e))
+                    continue
+                self._local.journal_remove(entry.seq)
+                replayed_cnt += 1
+
+    def refresh_mirrors(self, max_unit_age_seconds: float) -> None:
+        """Reload the mirrored collections and drop the cached documents which were not used for a while"""
+        if self._local is None or self._offline:
+            return
+
+        for collection in MIRRORED_COLLECTIONS:
+            documents = self._database[collection].find()
+            self._local.replace_collection(collection, {str(document["_id"]): document for document in documents})
+
+        if not self._journal_pending:
+            for collection in CACHED_COLLECTIONS:
+                self._local.prune(collection, max_unit_age_seconds)
 
 
 BaseMongoDbWrapper = _BaseMongoDbWrapper()
@@ -0,0 +1,95 @@
+from dataclasses import dataclass, field
+from typing import Any
+
+from loguru import logger
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from src.database.database import BaseMongoDbWrapper
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """An index the daemon queries rely on"""
+
+    collection: str
+    keys: list[tuple[str, int]]
+    options: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        return "_".join(f"{key}_{direction}" for key, direction in self.keys)
+
+
+# point lookup fields are unique, so lookups are plain index-served find_one calls.
+# Employees may log in by username only, hence the card id uniqueness applies to non-empty ids only.
+INDEXES: list[IndexSpec] = [
+    IndexSpec("unitData", [("uuid", ASCENDING)], {"unique": True}),
+    IndexSpec("unitData", [("internal_id", ASCENDING)], {"unique": True}),
+    IndexSpec("unitData", [("status", ASCENDING), ("creation_time", ASCENDING)]),
+    IndexSpec("unitData", [("status", ASCENDING), ("txn_hash", ASCENDING)]),
+    IndexSpec(
+        "employeeData",
+        [("rfid_card_id", ASCENDING)],
+        {"unique": True, "partialFilterExpression": {"rfid_card_id": {"$gt": ""}}},
+    ),
+    IndexSpec("employeeData", [("username", ASCENDING)]),
+    IndexSpec("productionSchemas", [("schema_id", ASCENDING)], {"unique": True}),
+    IndexSpec("datalogQueue", [("cid", ASCENDING)], {"unique": True}),
+    IndexSpec("datalogQueue", [("status", ASCENDING), ("next_attempt_at", ASCENDING), ("created_at", ASCENDING)]),
+    IndexSpec("workbenchState", [("workbench", ASCENDING)], {"unique": True}),
+]
+
+# indexes superseded by the ones above
+RETIRED_INDEXES: list[IndexSpec] = [
+    IndexSpec("unitData", [("uuid", ASCENDING), ("_id", DESCENDING)]),
+    IndexSpec("unitData", [("internal_id", ASCENDING), ("_id", DESCENDING)]),
+    IndexSpec("employeeData", [("rfid_card_id", ASCENDING), ("_id", DESCENDING)]),
+    IndexSpec("employeeData", [("username", ASCENDING), ("_id", DESCENDING)]),
+    IndexSpec("productionSchemas", [("schema_id", ASCENDING), ("_id", DESCENDING)]),
+]
+
+# collections the former mongodb-local/init.js created text indexes on, including the ones the daemon no longer queries
+TEXT_INDEXED_COLLECTIONS = ("employeeData", "productionSchemas", "productionStagesData", "unitData")
+
+
+def _drop_text_indexes(collection: str) -> None:
+    """text indexes cannot serve equality lookups and only slow down writes"""
+    for name, info in BaseMongoDbWrapper.index_information(collection).items():
+        if any(direction == "text" for _, direction in info["key"]):
+            BaseMongoDbWrapper.drop_index(collection, name)
+            logger.warning(f"Dropped text index {name} of the {collection} collection")
+
+
+def _drop_retired_indexes(collection: str) -> None:
+    existing = BaseMongoDbWrapper.index_information(collection)
+    for spec in RETIRED_INDEXES:
+        if spec.collection == collection and spec.name in existing:
+            BaseMongoDbWrapper.drop_index(collection, spec.name)
+            logger.info(f"Dropped retired index {spec.name} of the {collection} collection")
+
+
+def ensure_indexes() -> None:
+    """Create all the declared indexes which do not exist yet"""
+    for collection in {spec.collection for spec in INDEXES} | set(TEXT_INDEXED_COLLECTIONS):
+        _drop_text_indexes(collection)
+
+    failed_cnt = 0
+
+    for spec in INDEXES:
+        try:
+            BaseMongoDbWrapper.create_index(spec.collection, spec.keys, name=spec.name, **spec.options)
+        except OperationFailure as e:
+            # most likely there are duplicates violating the unique constraint
+            failed_cnt += 1
+            logger.error(
+                f"Failed to create index {spec.name} of the {spec.collection} collection: {e}. "
+                "Merge the duplicate documents with 'python -m src.tools.merge_duplicates --apply'"
+            )
+
+    # retired indexes are only dropped once their replacements are in place
+    if not failed_cnt:
+        for collection in {spec.collection for spec in RETIRED_INDEXES}:
+            _drop_retired_indexes(collection)
+
+    logger.info(f"{len(INDEXES) - failed_cnt}/{len(INDEXES)} MongoDB indexes ensured")
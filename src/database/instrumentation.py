@@ -0,0 +1,156 @@
+import functools
+import inspect
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+import bson
+from aioprometheus.collectors import Counter, Histogram
+from loguru import logger
+
+from src.config import CONFIG
+from src.feecc_workbench.Types import Document
+
+query_duration = Histogram(
+    "db_query_duration_seconds",
+    "Database operation duration",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, float("inf")),
+)
+query_documents = Counter("db_query_documents_total", "Documents returned or written by database operations")
+query_bytes = Counter("db_query_bytes_total", "BSON bytes returned or written by database operations")
+
+F = TypeVar("F", bound=Callable[..., Any])
+# encoding every streamed document to measure it costs more CPU than the query, so only every Nth one is measured
+STREAM_SIZE_SAMPLING = 100
+
+
+def filter_shape(filters: Any) -> Any:
+    """strip the values off the filter, leaving the fields and operators only"""
+    if isinstance(filters, dict):
+        return {key: filter_shape(value) for key, value in filters.items()}
+    if isinstance(filters, list):
+        return [filter_shape(value) for value in filters[:1]]
+    return f"<{type(filters).__name__}>"
+
+
+def bson_size(document: Document) -> int:
+    try:
+        return len(bson.encode(document))
+    except Exception:
+        return 0
+
+
+@dataclass
+class Observation:
+    documents: int = 0
+    bytes: int = 0
+    backend: str = "mongo"  # or "local" for the operations served by the local store
+
+    def add(self, documents: Iterable[Document]) -> None:
+        for document in documents:
+            self.documents += 1
+            self.bytes += bson_size(document)
+
+
+# the observation of the operation in progress, for the DB wrapper to tell which backend has served it
+_current: ContextVar[Observation | None] = ContextVar("current_observation", default=None)
+
+
+def served_locally() -> None:
+    """mark the operation in progress as served by the local store rather than MongoDB"""
+    if (observation := _current.get()) is not None:
+        observation.backend = "local"
+
+
+def _record(collection: str, operation: str, filters: Any, elapsed: float, observation: Observation) -> None:
+    labels = {"collection": collection, "operation": operation, "backend": observation.backend}
+    query_duration.observe(labels, elapsed)
+    query_documents.add(labels, observation.documents)
+    query_bytes.add(labels, observation.bytes)
+
+    if elapsed * 1000 >= CONFIG.mongodb.slow_query_ms:
+        logger.warning(
+            f"Slow {operation} on {collection} ({observation.backend}): {elapsed * 1000:.1f}ms, "
+            f"{observation.documents} documents, filter {filter_shape(filters)}"
+        )
+
+
+@contextmanager
+def observe(collection: str, operation: str, filters: Any = None) -> Iterator[Observation]:
+    """time the database operation and account the documents it returned or wrote"""
+    observation = Observation()
+    token = _current.set(observation)
+    started = time.perf_counter()
+    try:
+        yield observation
+    finally:
+        elapsed = time.perf_counter() - started
+        _current.reset(token)
+        _record(collection, operation, filters, elapsed, observation)
+
+
+def _stream(
+    cursor: Iterable[Document], collection: str, operation: str, filters: Any, observation: Observation | None = None
+) -> Iterator[Document]:
+    """
+    Account a streamed read. Only the time spent fetching from the cursor is measured, not the time the caller
+    spends on the documents in between. The byte count is extrapolated from a sample of the documents.
+    """
+    observation = observation or Observation()
+    elapsed = 0.0
+    sampled = sampled_bytes = 0
+    documents = iter(cursor)
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                document = next(documents)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - started
+            if observation.documents % STREAM_SIZE_SAMPLING == 0:
+                sampled += 1
+                sampled_bytes += bson_size(document)
+            observation.documents += 1
+            yield document
+    finally:
+        if sampled:
+            observation.bytes = sampled_bytes * observation.documents // sampled
+        _record(collection, operation, filters, elapsed, observation)
+
+
+def instrumented(operation: str) -> Callable[[F], F]:
+    """instrument a read method of the DB wrapper. The filter is taken from its `filters` or `pipeline` argument."""
+
+    def decorator(method: F) -> F:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self: Any, collection: str, *args: Any, **kwargs: Any) -> Any:
+            arguments = signature.bind_partial(self, collection, *args, **kwargs).arguments
+            filters = arguments.get("filters", arguments.get("pipeline"))
+
+            if operation == "find_iter":
+                observation = Observation()
+                token = _current.set(observation)
+                try:
+                    cursor = method(self, collection, *args, **kwargs)
+                finally:
+                    _current.reset(token)
+                return _stream(cursor, collection, operation, filters, observation)
+
+            with observe(collection, operation, filters) as observation:
+                result = method(self, collection, *args, **kwargs)
+                if isinstance(result, list):
+                    observation.add(result)
+                elif isinstance(result, dict):
+                    observation.add((result,))
+            return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
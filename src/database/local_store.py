@@ -0,0 +1,214 @@
+import pathlib
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from bson import json_util
+
+from src.database.write_buffer import apply_set
+from src.feecc_workbench.Types import Document
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    key TEXT NOT NULL,
+    body TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (collection, key)
+);
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    error TEXT
+);
+"""
+
+
+@dataclass
+class JournalEntry:
+    seq: int
+    collection: str
+    operation: str
+    payload: dict[str, Any]
+
+
+class NotServable(Exception):  # noqa: N818
+    """The query uses features the local store cannot evaluate"""
+
+
+def _get_field(document: Document, path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def matches(document: Document, filters: dict[str, Any]) -> bool:
+    """evaluate equality and `$in` filters against the document"""
+    for path, condition in filters.items():
+        value = _get_field(document, path)
+        if isinstance(condition, dict):
+            if set(condition) != {"$in"}:
+                raise NotServable(f"Unsupported filter {condition}")
+            if value not in condition["$in"]:
+                return False
+        elif path.startswith("$"):
+            raise NotServable(f"Unsupported filter operator {path}")
+        elif value != condition:
+            return False
+    return True
+
+
+def project(document: Document, projection: dict[str, Any] | None) -> Document:
+    """apply a top level inclusion or exclusion projection to the document"""
+    if not projection:
+        return document
+    included = {k for k, v in projection.items() if v and k != "_id"}
+    if included:
+        result = {k: document[k] for k in included if k in document}
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+        return result
+    return {k: v for k, v in document.items() if k not in projection}
+
+
+def _prefilter(filters: dict[str, Any]) -> tuple[str, tuple[Any, ...]]:
+    """SQL condition narrowing the candidates down by the first plain string equality of the filter"""
+    for path, condition in filters.items():
+        if isinstance(condition, str) and re.fullmatch(r"[A-Za-z0-9_.]+", path):
+            return " AND json_extract(body, ?) = ?", (f"$.{path}", condition)
+    return "", ()
+
+
+class LocalStore:
+    """
+    Embedded SQLite (WAL) store. It keeps the working set of the bench (mirrored collections
+    and recently used documents) and a journal of the writes yet to be replayed to MongoDB.
+    """
+
+    def __init__(self, path: str) -> None:
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")  # durable across process crashes in WAL mode
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    # documents
+
+    def has_collection(self, collection: str) -> bool:
+        with self._lock:
+            query = "SELECT 1 FROM documents WHERE collection = ? LIMIT 1"
+            return self._connection.execute(query, (collection,)).fetchone() is not None
+
+    def find(self, collection: str, filters: dict[str, Any]) -> list[Document]:
+        """find the locally stored documents matching the filter. Raises NotServable for complex filters."""
+        condition, params = _prefilter(filters)
+        with self._lock:
+            query = "SELECT body FROM documents WHERE collection = ?" + condition
+            rows = self._connection.execute(query, (collection, *params)).fetchall()
+        documents = (json_util.loads(body) for (body,) in rows)
+        return [document for document in documents if matches(document, filters)]
+
+    def put(self, collection: str, key: str, document: Document) -> None:
+        with self._transaction() as connection:
+            self._put(connection, collection, key, document)
+
+    @staticmethod
+    def _put(connection: sqlite3.Connection, collection: str, key: str, document: Document) -> None:
+        connection.execute(
+            "INSERT OR REPLACE INTO documents (collection, key, body, updated_at) VALUES (?, ?, ?, ?)",
+            (collection, key, json_util.dumps(document), time.time()),
+        )
+
+    def replace_collection(self, collection: str, documents: dict[str, Document]) -> None:
+        """replace all the locally stored documents of the collection"""
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM documents WHERE collection = ?", (collection,))
+            for key, document in documents.items():
+                self._put(connection, collection, key, document)
+
+    def update(self, collection: str, filters: dict[str, Any], fields: dict[str, Any]) -> None:
+        """apply a `$set` to the locally stored documents matching the filter"""
+        condition, params = _prefilter(filters)
+        with self._transaction() as connection:
+            query = "SELECT key, body FROM documents WHERE collection = ?" + condition
+            rows = connection.execute(query, (collection, *params)).fetchall()
+            for key, body in rows:
+                document = json_util.loads(body)
+                if matches(document, filters):
+                    self._put(connection, collection, key, apply_set(document, fields))
+
+    def delete(self, collection: str, filters: dict[str, Any]) -> None:
+        condition, params = _prefilter(filters)
+        with self._transaction() as connection:
+            query = "SELECT key, body FROM documents WHERE collection = ?" + condition
+            rows = connection.execute(query, (collection, *params)).fetchall()
+            for key, body in rows:
+                if matches(json_util.loads(body), filters):
+                    connection.execute("DELETE FROM documents WHERE collection = ? AND key = ?", (collection, key))
+
+    def prune(self, collection: str, max_age_seconds: float) -> int:
+        """drop the documents which were not used for a while. Returns the number of dropped documents."""
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "DELETE FROM documents WHERE collection = ? AND updated_at < ?",
+                (collection, time.time() - max_age_seconds),
+            )
+            return cursor.rowcount
+
+    # journal
+
+    def journal_append(self, collection: str, operation: str, payload: dict[str, Any]) -> None:
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO journal (collection, operation, payload, created_at) VALUES (?, ?, ?, ?)",
+                (collection, operation, json_util.dumps(payload), time.time()),
+            )
+
+    def journal_size(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM journal WHERE error IS NULL").fetchone()[0]
+
+    def journal_head(self, limit: int) -> list[JournalEntry]:
+        """get the oldest entries which are yet to be replayed"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT seq, collection, operation, payload FROM journal WHERE error IS NULL ORDER BY seq LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [JournalEntry(seq, collection, op, json_util.loads(payload)) for seq, collection, op, payload in rows]
+
+    def journal_remove(self, seq: int) -> None:
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM journal WHERE seq = ?", (seq,))
+
+    def journal_reject(self, seq: int, error: str) -> None:
+        """keep the entry which cannot be replayed for inspection, but skip it from now on"""
+        with self._transaction() as connection:
+            connection.execute("UPDATE journal SET error = ? WHERE seq = ?", (error, seq))
@@ -162,3 +162,14 @@ class SchemaListEntry(BaseModel):
 
 class SchemasList(GenericResponse):
     available_schemas: list[SchemaListEntry]
+
+
+class AsyncioTaskInfo(BaseModel):
+    name: str
+    coroutine: str
+    age_seconds: float | None
+    stack: list[str]
+
+
+class AsyncioTasksOut(GenericResponse):
+    tasks: list[AsyncioTaskInfo]
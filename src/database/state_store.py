@@ -0,0 +1,145 @@
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from src.config import StateStore as StateStoreSettings
+from src.database.database import BaseMongoDbWrapper
+from src.feecc_workbench.exceptions import StateConflictError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workbench_state (
+    workbench INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class StoredState:
+    """The authoritative state of a workbench shared by the daemon processes. Every change bumps the version."""
+
+    version: int
+    state: str
+    employee: dict[str, Any] | None = None
+    unit_id: str | None = None
+    # the process handling a transition holds a claim, the other processes do not act on the state till it expires
+    claimed_by: str | None = None
+    claimed_until: float | None = None
+
+    def claimed_by_other(self, process_id: str) -> bool:
+        return self.claimed_by not in (None, process_id) and (self.claimed_until or 0) > time.time()
+
+
+class _StateStore(ABC):
+    """
+    Keeps the workbench states with optimistic versioning: a state is only saved over the version it was
+    derived from, otherwise StateConflictError is raised and the caller has to reload it.
+    """
+
+    def __init__(self, claim_seconds: float) -> None:
+        self.claim_seconds = claim_seconds
+
+    @abstractmethod
+    def load(self, workbench: int) -> StoredState | None:
+        """the stored state, None if it has not been saved yet"""
+
+    @abstractmethod
+    def version(self, workbench: int) -> int | None:
+        """the current version only, polled by the processes to notice the changes made by the others"""
+
+    @abstractmethod
+    def save(self, workbench: int, state: StoredState, expected_version: int | None) -> None:
+        """save the state over the expected version, None creates it. Raises StateConflictError if it moved on."""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteStateStore(_StateStore):
+    """State store in an SQLite (WAL) file, shared by the worker processes of one host"""
+
+    def __init__(self, path: str, claim_seconds: float) -> None:
+        super().__init__(claim_seconds)
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def load(self, workbench: int) -> StoredState | None:
+        with self._lock:
+            query = "SELECT version, body FROM workbench_state WHERE workbench = ?"
+            row = self._connection.execute(query, (workbench,)).fetchone()
+        if row is None:
+            return None
+        version, body = row
+        return StoredState(version=version, **json.loads(body))
+
+    def version(self, workbench: int) -> int | None:
+        with self._lock:
+            row = self._connection.execute("SELECT version FROM workbench_state WHERE workbench = ?", (workbench,))
+            version = row.fetchone()
+        return None if version is None else version[0]
+
+    def save(self, workbench: int, state: StoredState, expected_version: int | None) -> None:
+        body = {k: v for k, v in asdict(state).items() if k != "version"}
+        with self._lock:
+            if expected_version is None:
+                query = "INSERT OR IGNORE INTO workbench_state VALUES (?, ?, ?, ?)"
+                params: tuple[Any, ...] = (workbench, state.version, json.dumps(body), time.time())
+            else:
+                query = """
+                    UPDATE workbench_state SET version = ?, body = ?, updated_at = ?
+                    WHERE workbench = ? AND version = ?
+                """
+                params = (state.version, json.dumps(body), time.time(), workbench, expected_version)
+            saved = self._connection.execute(query, params).rowcount > 0
+        if not saved:
+            raise StateConflictError(f"Workbench {workbench} state has been changed by another process")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class MongoStateStore(_StateStore):
+    """State store in MongoDB, shared by the daemon processes of any host. Needs MongoDB to be reachable."""
+
+    collection = "workbenchState"
+
+    def load(self, workbench: int) -> StoredState | None:
+        document = BaseMongoDbWrapper.find_one(self.collection, {"workbench": workbench}, projection={"_id": 0})
+        if document is None:
+            return None
+        return StoredState(**{k: v for k, v in document.items() if k not in ("workbench", "updated_at")})
+
+    def version(self, workbench: int) -> int | None:
+        projection = {"_id": 0, "version": 1}
+        document = BaseMongoDbWrapper.find_one(self.collection, {"workbench": workbench}, projection=projection)
+        return None if document is None else document["version"]
+
+    def save(self, workbench: int, state: StoredState, expected_version: int | None) -> None:
+        document = {"workbench": workbench, **asdict(state), "updated_at": time.time()}
+        if expected_version is None:
+            saved = BaseMongoDbWrapper.insert_unique(self.collection, document)
+        else:
+            filters = {"workbench": workbench, "version": expected_version}
+            saved = BaseMongoDbWrapper.update_matching(self.collection, {"$set": document}, filters)
+        if not saved:
+            raise StateConflictError(f"Workbench {workbench} state has been changed by another process")
+
+
+def create_state_store(settings: StateStoreSettings) -> _StateStore | None:
+    """the configured shared state store, None if the state is kept in the process memory"""
+    if settings.backend == "sqlite":
+        return SQLiteStateStore(settings.sqlite_path, settings.claim_seconds)
+    if settings.backend == "mongodb":
+        return MongoStateStore(settings.claim_seconds)
+    return None
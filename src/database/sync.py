@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from loguru import logger
+from pymongo.errors import ConnectionFailure
+
+from src.config import CONFIG
+from src.database.database import BaseMongoDbWrapper
+from src.feecc_workbench.Messenger import messenger
+
+SHUTDOWN_REPLAY_TIMEOUT = 10
+
+
+class LocalStoreSync:
+    """
+    Keeps the local store and MongoDB in sync in the background: replays the journaled writes
+    in order once MongoDB is reachable again and periodically refreshes the mirrored collections.
+    """
+
+    def __init__(self) -> None:
+        self._mirrors_refreshed_at = 0.0
+        self._worker: asyncio.Task[None] | None = None
+
+    @property
+    def _interval(self) -> float:
+        return CONFIG.mongodb.local_store_sync_interval_seconds
+
+    @property
+    def _mirror_refresh(self) -> float:
+        return CONFIG.mongodb.local_store_mirror_refresh_seconds
+
+    @property
+    def _unit_max_age(self) -> float:
+        return CONFIG.mongodb.local_store_unit_max_age_seconds
+
+    def start(self) -> None:
+        self._worker = asyncio.create_task(self._run())
+        logger.info("Local store sync worker started")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Local store sync iteration failed: {e}")
+            await asyncio.sleep(self._interval)
+
+    async def sync(self) -> None:
+        """replay the journal and refresh the mirrors if they are due. Blocking DB calls run in a thread."""
+        if BaseMongoDbWrapper.offline and not await asyncio.to_thread(BaseMongoDbWrapper.ping):
+            return
+
+        replayed_cnt = await asyncio.to_thread(BaseMongoDbWrapper.replay_journal)
+        if replayed_cnt:
+            logger.info(f"{replayed_cnt} journaled writes replayed to MongoDB")
+        # the messenger is not thread safe, so the warnings collected by the replay are emitted here
+        for warning in BaseMongoDbWrapper.pop_replay_warnings():
+            messenger.warning(warning)
+
+        if not BaseMongoDbWrapper.offline and time.monotonic() - self._mirrors_refreshed_at > self._mirror_refresh:
+            try:
+                await asyncio.to_thread(BaseMongoDbWrapper.refresh_mirrors, self._unit_max_age)
+            except ConnectionFailure as e:
+                logger.warning(f"Failed to refresh the local mirrors: {e}")
+                return
+            self._mirrors_refreshed_at = time.monotonic()
+            logger.debug("Local mirrors refreshed")
+
+    async def shutdown(self) -> None:
+        """Stop the worker making one last attempt to replay the journal"""
+        if self._worker is None:
+            return
+
+        self._worker.cancel()
+        try:
+            await asyncio.wait_for(asyncio.to_thread(BaseMongoDbWrapper.replay_journal), SHUTDOWN_REPLAY_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Journaled writes were not replayed on shutdown, they will be on the next start: {e}")
+
+
+local_store_sync = LocalStoreSync()
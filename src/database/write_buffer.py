@@ -0,0 +1,132 @@
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from aioprometheus.collectors import Counter, Histogram
+from loguru import logger
+from pymongo import UpdateOne
+
+from src.feecc_workbench.Types import Document
+
+buffered_updates = Counter("db_write_buffer_updates_total", "Field updates submitted to the write-behind buffer")
+flushed_documents = Counter("db_write_buffer_documents_total", "Documents written by the write-behind buffer flushes")
+flush_latency = Histogram(
+    "db_write_buffer_flush_seconds",
+    "Write-behind buffer flush duration",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, float("inf")),
+)
+
+
+def apply_set(document: Document, fields: dict[str, Any]) -> Document:
+    """apply a `$set` update to the document in memory. Dotted paths are supported."""
+    for path, value in fields.items():
+        *parents, key = path.split(".")
+        target = document
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[key] = value
+    return document
+
+
+class WriteBehindBuffer:
+    """
+    Coalesces `$set` updates of the documents of a collection.
+
+    Updates of the same document are merged and written with a single bulk write once the window
+    since the first pending update expires, the buffer grows too big or `flush` is called.
+    Point reads must be passed through `overlay` to see the pending updates.
+    """
+
+    def __init__(
+        self,
+        collection: str,
+        key_field: str,
+        writer: Callable[[list[UpdateOne]], Any],
+        window_seconds: float,
+        max_documents: int,
+    ) -> None:
+        self.collection = collection
+        self.key_field = key_field
+        self._writer = writer
+        self._window = window_seconds
+        self._max_documents = max_documents
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._in_flight: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+        self._labels = {"collection": collection}
+
+    @property
+    def pending_cnt(self) -> int:
+        return len(self._pending)
+
+    def set(self, key: str, fields: dict[str, Any]) -> None:
+        """schedule a `$set` update of the document"""
+        buffered_updates.inc(self._labels)
+        with self._lock:
+            self._pending.setdefault(key, {}).update(fields)
+            flush_now = self._window <= 0 or len(self._pending) >= self._max_documents
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(self._window, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if flush_now:
+            self.flush()
+
+    def overlay(self, document: Document | None) -> Document | None:
+        """apply the updates which are not written yet to the document read from the DB"""
+        if document is None:
+            return None
+        key = document.get(self.key_field)
+        with self._lock:
+            for updates in (self._in_flight, self._pending):
+                if key in updates:
+                    apply_set(document, updates[key])
+        return document
+
+    def flush(self) -> None:
+        """synchronously write all the pending updates"""
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._pending:
+                    return
+                self._in_flight, self._pending = self._pending, {}
+
+            started = time.perf_counter()
+            tasks = [UpdateOne({self.key_field: key}, {"$set": fields}) for key, fields in self._in_flight.items()]
+
+            try:
+                self._writer(tasks)
+            except Exception:
+                with self._lock:
+                    # keep the failed updates, the newer ones take precedence
+                    for key, fields in self._in_flight.items():
+                        self._pending[key] = {**fields, **self._pending.get(key, {})}
+                    self._in_flight = {}
+                raise
+
+            with self._lock:
+                self._in_flight = {}
+
+        flushed_documents.add(self._labels, len(tasks))
+        flush_latency.observe(self._labels, time.perf_counter() - started)
+        logger.debug(f"Flushed buffered updates of {len(tasks)} {self.collection} documents")
+
+    def _flush_in_background(self) -> None:
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush buffered {self.collection} updates, retrying later: {e}")
+            with self._lock:
+                if self._timer is None:
+                    self._timer = threading.Timer(self._window, self._flush_in_background)
+                    self._timer.daemon = True
+                    self._timer.start()
@@ -0,0 +1,84 @@
+import datetime as dt
+import enum
+
+from loguru import logger
+from pymongo import UpdateOne
+
+from src.database.database import BaseMongoDbWrapper
+from src.feecc_workbench.Types import Document
+
+# retry delays grow exponentially from the base value up to the cap
+RETRY_BASE_DELAY = dt.timedelta(seconds=15)
+RETRY_MAX_DELAY = dt.timedelta(hours=1)
+
+
+class DatalogEntryStatus(str, enum.Enum):
+    """supported datalog queue entry statuses"""
+
+    pending = "pending"
+    anchored = "anchored"
+
+
+def retry_delay(attempts: int) -> dt.timedelta:
+    """get the backoff delay before the next attempt after the provided number of failed ones"""
+    return min(RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY)
+
+
+class _DatalogQueueWrapper:
+    """Durable queue of passport CIDs waiting to be anchored in Robonomics datalog"""
+
+    collection = "datalogQueue"
+
+    def enqueue(self, cid: str, unit_internal_id: str) -> None:
+        """Add the CID to the queue. CIDs already queued or anchored are left untouched."""
+        now = dt.datetime.now()
+        entry = {
+            "cid": cid,
+            "unit_internal_id": unit_internal_id,
+            "status": DatalogEntryStatus.pending,
+            "attempts": 0,
+            "last_error": None,
+            "txn_hash": None,
+            "created_at": now,
+            "next_attempt_at": now,
+        }
+        BaseMongoDbWrapper.update(self.collection, {"$setOnInsert": entry}, {"cid": cid}, upsert=True)
+        logger.debug(f"CID {cid} of unit {unit_internal_id} is in the datalog queue")
+
+    def get_due(self, limit: int) -> list[Document]:
+        """get the oldest pending entries which are due for an attempt"""
+        filters = {"status": DatalogEntryStatus.pending, "next_attempt_at": {"$lte": dt.datetime.now()}}
+        return BaseMongoDbWrapper.find(
+            self.collection, filters, projection={"_id": 0}, sort=[("created_at", 1)], limit=limit
+        )
+
+    def get_next_attempt_at(self) -> dt.datetime | None:
+        """get the time the earliest pending entry is due for an attempt, None if nothing is pending"""
+        filters = {"status": DatalogEntryStatus.pending}
+        projection = {"_id": 0, "next_attempt_at": 1}
+        entries = BaseMongoDbWrapper.find(
+            self.collection, filters, projection=projection, sort=[("next_attempt_at", 1)], limit=1
+        )
+        return entries[0]["next_attempt_at"] if entries else None
+
+    def mark_anchored(self, cids: list[str], txn_hash: str) -> None:
+        """mark entries as successfully anchored"""
+        update = {"$set": {"status": DatalogEntryStatus.anchored, "txn_hash": txn_hash, "last_error": None}}
+        BaseMongoDbWrapper.bulk_write(self.collection, [UpdateOne({"cid": cid}, update) for cid in cids])
+
+    def mark_failed(self, entries: list[Document], error: str) -> None:
+        """register a failed attempt for the entries and schedule the next one"""
+        now = dt.datetime.now()
+        tasks = []
+
+        for entry in entries:
+            attempts = entry["attempts"] + 1
+            update = {
+                "$set": {"attempts": attempts, "last_error": error, "next_attempt_at": now + retry_delay(attempts)}
+            }
+            tasks.append(UpdateOne({"cid": entry["cid"]}, update))
+
+        BaseMongoDbWrapper.bulk_write(self.collection, tasks)
+
+
+DatalogQueueWrapper = _DatalogQueueWrapper()
@@ -1,6 +1,8 @@
+import asyncio
+import secrets
 from dataclasses import asdict
 
-from fastapi import HTTPException, status
+from fastapi import Header, HTTPException, Request, status
 from loguru import logger
 
 from src.database import models
@@ -11,10 +13,36 @@ from src.unit.unit_wrapper import UnitWrapper
 from src.employee.employee_wrapper import EmployeeWrapper
 from src.employee.Employee import Employee
 from src.prod_schema.prod_schema_wrapper import ProdSchemaWrapper
+from src.feecc_workbench.context import current_workbench
 from src.feecc_workbench.exceptions import EmployeeNotFoundError, UnitNotFoundError
 from src.feecc_workbench.Messenger import messenger
 from src.feecc_workbench.translation import translation
 from src.feecc_workbench.utils import is_a_ean13_barcode
+from src.feecc_workbench.WorkBench import Workbenches, _WorkBench
+
+
+def workbench_number_path(workbench_number: int) -> None:
+    """declare the workbench number path parameter of the `/benches/{workbench_number}` prefixed routes"""
+
+
+async def get_workbench(
+    request: Request, x_workbench_number: int | None = Header(default=None)  # noqa: B008
+) -> _WorkBench:
+    """
+    get the workbench the request is addressed to: by the `/benches/{workbench_number}` path prefix
+    or the X-Workbench-Number header, the default workbench otherwise. Notifications emitted while
+    handling the request go to this workbench's clients only (async, so that the context variable
+    is set in the request task). A state shared with other processes is brought up to date first.
+    """
+    number = request.path_params.get("workbench_number", x_workbench_number)
+    try:
+        workbench = Workbenches.get(None if number is None else int(number))
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No workbench {number} is hosted") from e
+    current_workbench.set(workbench.number)
+    if Workbenches.shared:
+        await workbench.refresh_async()
+    return workbench
 
 
 def get_unit_by_internal_id(unit_internal_id: str) -> Unit:
@@ -82,3 +110,12 @@ def identify_sender(event: models.HidEvent) -> models.HidEvent:
             return event
 
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Sender device {event.name} is unknown")
+
+
+def require_admin_token(x_admin_token: str | None = Header(default=None)) -> None:  # noqa: B008
+    """allow the request only if it carries the configured admin token"""
+    token = CONFIG.admin.token
+    if not token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Admin endpoints are disabled")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
@@ -1,13 +1,23 @@
+import functools
+from typing import TYPE_CHECKING
+
 from loguru import logger
 
 from src.database.database import BaseMongoDbWrapper
-from src.feecc_workbench.utils import time_execution
 from src.feecc_workbench.exceptions import EmployeeNotFoundError
 from src.feecc_workbench.Types import Document
 from .Employee import Employee
-from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"])
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+@functools.cache
+def pwd_context() -> "CryptContext":
+    """get the password hashing context. passlib is only loaded once a password login happens."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"])
 
 
 class _EmployeeWrapper:
@@ -37,7 +47,7 @@ class _EmployeeWrapper:
             logger.error(message)
             raise EmployeeNotFoundError(message)
 
-        if not bool(pwd_context.verify(password, employee_data["hashed_password"])):
+        if not bool(pwd_context().verify(password, employee_data["hashed_password"])):
             message = f"Incorrect password for username {username}"
             logger.error(message)
             raise EmployeeNotFoundError(message)
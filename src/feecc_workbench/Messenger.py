@@ -8,6 +8,8 @@ from uuid import uuid4
 
 from loguru import logger
 
+from .context import current_workbench
+
 MessageApiDict: TypeAlias = dict[str, bool | str | int | dict[str, str]]
 
 
@@ -56,6 +58,7 @@ class MessageBrocker:
     """A single message brocker. Provides awaitable interface for messages"""
 
     alive: bool = True
+    workbench: int | None = None  # receives the messages of this workbench only, all of them if None
     brocker_id: str = field(default_factory=lambda: uuid4().hex[:4])
     feed: asyncio.Queue[Message] = field(default_factory=asyncio.Queue)
 
@@ -78,6 +81,9 @@ class Messenger:
     Messenger is a single entrypoint to get brockers and
     emit messages across all brockers at once.
 
+    Messages emitted on behalf of a workbench (see `current_workbench`) only reach
+    the brockers of that workbench, the rest are broadcast.
+
     Interface mimics logger.
 
     Singleton object.
@@ -86,20 +92,22 @@ class Messenger:
     def __init__(self) -> None:
         self._brockers: list[MessageBrocker] = []
 
-    def get_brocker(self) -> MessageBrocker:
+    def get_brocker(self, workbench: int | None = None) -> MessageBrocker:
         """Get a new message brocker and register it in the Messenger"""
-        brocker = MessageBrocker()
+        brocker = MessageBrocker(workbench=workbench)
         self._brockers.append(brocker)
         return brocker
 
     async def emit_message(self, level: MessageLevels, message: str) -> None:
-        """Emit message across all brockers"""
+        """Emit message across all brockers of the current workbench"""
         self._brockers = [br for br in self._brockers if br.alive]
-        brocker_cnt = len(self._brockers)
+        workbench = current_workbench.get()
+        recipients = [br for br in self._brockers if workbench is None or br.workbench in (None, workbench)]
+        brocker_cnt = len(recipients)
         message_ = Message(message, level)
 
-        for i in range(brocker_cnt):
-            await self._brockers[i].send_message(message_)
+        for brocker in recipients:
+            await brocker.send_message(message_)
 
         if brocker_cnt:
             logger.info(f"Message '{message}' emitted to {brocker_cnt} brockers")
@@ -153,10 +161,10 @@ class Messenger:
 messenger = Messenger()
 
 
-async def message_generator() -> AsyncGenerator[str, None]:
+async def message_generator(workbench: int | None = None) -> AsyncGenerator[str, None]:
     """Notification generator for SSE message streaming"""
     logger.info("SSE connection to message streaming endpoint established.")
-    brocker = messenger.get_brocker()
+    brocker = messenger.get_brocker(workbench)
 
     try:
         while True:
@@ -1,12 +1,17 @@
 import asyncio
 from dataclasses import asdict
+import functools
+import inspect
 import pathlib
 from pathlib import Path
 import requests
+import time
+import uuid
 
 
 from loguru import logger
-from typing import Any
+from pymongo.errors import ConnectionFailure
+from typing import Any, Callable, TypeVar
 
 
 from src.feecc_workbench.utils import timestamp
@@ -14,14 +19,17 @@ from src.feecc_workbench._label_generation import create_qr, create_seal_tag
 from src.config import CONFIG
 from src.prod_schema.prod_schema_wrapper import ProdSchemaWrapper
 from src.employee.Employee import Employee
-from src.feecc_workbench.exceptions import StateForbiddenError, ManualInputNeeded
+from src.feecc_workbench.exceptions import StateConflictError, StateForbiddenError, ManualInputNeeded
 from src.feecc_workbench.ipfs import publish_file
+from src.feecc_workbench.context import current_workbench
 from src.feecc_workbench.Messenger import messenger
-from src.feecc_workbench.metrics import metrics
+from src.feecc_workbench.metrics import metrics, timed
 from src.database.models import AdditionalDetail, ProductionSchema, ManualInput
+from src.database.state_store import StoredState, _StateStore, create_state_store
 from src.feecc_workbench.certificate_generator import construct_unit_certificate
 from src.feecc_workbench.printer import print_image
-from src.feecc_workbench.robonomics import post_to_datalog
+from src.feecc_workbench.robonomics import datalog_batcher
+from src.feecc_workbench.snapshot import Snapshot, load_snapshot, save_snapshot
 from src.feecc_workbench.states import STATE_TRANSITION_MAP, State
 from src.feecc_workbench.translation import translation
 from src.feecc_workbench.Types import AdditionalInfo
@@ -29,7 +37,38 @@ from src.unit.unit_utils import UnitStatus, get_first_unit_matching_status, Unit
 from src.unit.unit_wrapper import UnitWrapper
 from src.unit.UnitManager import UnitManager
 
-STATE_SWITCH_EVENT = asyncio.Event()
+# tells the claims of this process on a shared workbench state from the ones of the other processes
+PROCESS_ID = uuid.uuid4().hex
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _transition(method: F) -> F:
+    """
+    claim a shared workbench state for the duration of the transition, before any of its side effects, so that
+    the other processes do not act on the state meanwhile. The state is published once the transition is over.
+    """
+    if inspect.iscoroutinefunction(method):
+
+        @functools.wraps(method)
+        async def async_wrapper(self: "_WorkBench", *args: Any, **kwargs: Any) -> Any:
+            self._claim()
+            try:
+                return await method(self, *args, **kwargs)
+            finally:
+                self._release()
+
+        return async_wrapper  # type: ignore[return-value]
+
+    @functools.wraps(method)
+    def wrapper(self: "_WorkBench", *args: Any, **kwargs: Any) -> Any:
+        self._claim()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._release()
+
+    return wrapper  # type: ignore[return-value]
 
 
 class _WorkBench:
@@ -38,17 +77,216 @@ class _WorkBench:
     It provides highly abstract interface for interaction with them
     """
 
-    @logger.catch
-    def __init__(self) -> None:
-        self.number: int = CONFIG.workbench.number
-        self.employee: Employee | None = (
-            None if CONFIG.workbench.login else Employee(*(CONFIG.workbench.dummy_employee.split(" ")))
-        )
+    def __init__(self, number: int, store: _StateStore | None = None, snapshot_path: str | None = None) -> None:
+        # the configured state is applied by `initialize` on startup
+        self.number: int = number
+        self.employee: Employee | None = None
         self.unit: UnitManager | None = None
-        self.state: State = State.AWAIT_LOGIN_STATE if CONFIG.workbench.login else State.AUTHORIZED_IDLING_STATE
+        self.state: State = State.AWAIT_LOGIN_STATE
+        self.state_switch_event = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None  # the loop serving the state streams, see `initialize`
+        # with a shared store the state above is a copy of the stored version, kept up to date by `refresh`
+        self._store = store
+        self._version: int | None = None
+        self._claims = 0  # transitions of this process holding the claim on the shared state
+        self._snapshot_path = snapshot_path
+
+    @logger.catch(reraise=True)
+    async def initialize(self) -> None:
+        """apply the workbench configuration, or adopt the shared state if another process has already done it"""
+        self._loop = asyncio.get_running_loop()
+        if not CONFIG.workbench.login:
+            self.employee = Employee(*(CONFIG.workbench.dummy_employee.split(" ")))
+            self.state = State.AUTHORIZED_IDLING_STATE
+
+        if self._store is not None:
+            stored = await asyncio.to_thread(self._store.load, self.number)
+            if stored is not None:
+                self._apply(stored)
+            else:
+                try:
+                    # nothing is served before the startup is over, so the state cannot change under the thread
+                    await asyncio.to_thread(self._publish)
+                except StateConflictError:
+                    pass  # another process has published it first and its state has been adopted
+        elif self._snapshot_path is not None:
+            snapshot = await asyncio.to_thread(load_snapshot, self._snapshot_path)
+            if snapshot is not None:
+                await self._restore(snapshot)
 
         logger.info(f"Workbench {self.number} was initialized")
 
+    def _apply(self, stored: StoredState) -> None:
+        """adopt the stored state and notify the state streams if it is not just a claim"""
+        current = (self.state.value, asdict(self.employee) if self.employee else None, self.unit_id)
+        self.state = State(stored.state)
+        self.employee = Employee(**stored.employee) if stored.employee else None
+        if stored.unit_id is None:
+            self.unit = None
+        elif self.unit is None or self.unit.unit_id != stored.unit_id:
+            self.unit = UnitManager(unit_id=stored.unit_id)
+        self._version = stored.version
+        if current != (stored.state, stored.employee, stored.unit_id):
+            self._notify_state_streams()
+
+    def _notify_state_streams(self) -> None:
+        """
+        wake up the state streams. asyncio.Event is not thread safe, so when called from a worker thread
+        (e.g. a sync route handler) the event is set on the loop the streams wait in.
+        """
+        try:
+            running_loop: asyncio.AbstractEventLoop | None = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if self._loop is None or running_loop is self._loop:
+            self.state_switch_event.set()
+        else:
+            self._loop.call_soon_threadsafe(self.state_switch_event.set)
+
+    @property
+    def unit_id(self) -> str | None:
+        return self.unit.unit_id if self.unit else None
+
+    def refresh(self) -> None:
+        """pick up the state changes made by the other daemon processes"""
+        if self._store is None:
+            return
+        self._adopt(self._store.load(self.number))
+
+    async def refresh_async(self) -> None:
+        """`refresh` for the loop: only the store is read in a thread, the state is changed on the loop"""
+        if self._store is None:
+            return
+        self._adopt(await asyncio.to_thread(self._store.load, self.number))
+
+    def _adopt(self, stored: StoredState | None) -> None:
+        if stored is not None and stored.version != self._version:
+            logger.debug(f"Workbench {self.number} state changed by another process (version {stored.version})")
+            self._apply(stored)
+
+    def _publish(self, claim: bool = False) -> None:
+        """save the state over the version it was derived from, or reload it and raise StateConflictError"""
+        if self._store is None:
+            return
+        if not claim:
+            # the other processes reload the unit from the database as soon as they see the new version
+            UnitWrapper.flush()
+        stored = StoredState(
+            version=(self._version or 0) + 1,
+            state=self.state.value,
+            employee=asdict(self.employee) if self.employee else None,
+            unit_id=self.unit_id,
+            claimed_by=PROCESS_ID if claim else None,
+            claimed_until=time.time() + self._store.claim_seconds if claim else None,
+        )
+        try:
+            self._store.save(self.number, stored, self._version)
+        except StateConflictError:
+            self.refresh()
+            raise
+        self._version = stored.version
+
+    def _save_snapshot(self) -> None:
+        if self._snapshot_path is None:
+            return
+        open_stage = None
+        if self.state == State.PRODUCTION_STAGE_ONGOING_STATE and self.unit is not None:
+            stage = self.unit.next_pending_operation
+            if stage is not None:
+                open_stage = {"number": stage.number, "name": stage.name, "started": stage.session_start_time}
+        snapshot = Snapshot(
+            state=self.state.value,
+            employee=asdict(self.employee) if self.employee else None,
+            unit_id=self.unit_id,
+            open_stage=open_stage,
+        )
+        try:
+            save_snapshot(self._snapshot_path, snapshot)
+        except OSError as e:
+            logger.error(f"Failed to save the workbench {self.number} snapshot: {e}")
+
+    async def _restore(self, snapshot: Snapshot) -> None:
+        """resume from the snapshot. Only the database is queried in a thread, the state is changed on the loop."""
+        started = time.perf_counter()
+        state, employee, unit = await asyncio.to_thread(self._reconcile, snapshot)
+
+        self.state, self.employee, self.unit = state, employee, unit
+        if state.value != snapshot.state:
+            logger.warning(f"Workbench {self.number} snapshot state {snapshot.state} reconciled to {state.value}")
+            self._save_snapshot()
+        self._notify_state_streams()  # the state streams replay the restored state
+        elapsed = (time.perf_counter() - started) * 1000
+        logger.info(f"Workbench {self.number} resumed in state {state.value} from the snapshot in {elapsed:.1f}ms")
+        if snapshot.open_stage is not None and state == State.PRODUCTION_STAGE_ONGOING_STATE:
+            stage = snapshot.open_stage
+            logger.info(f"Production stage {stage['name']} started at {stage['started']} is still ongoing")
+
+    def _reconcile(self, snapshot: Snapshot) -> tuple[State, Employee | None, UnitManager | None]:
+        """
+        reconcile the snapshot against the unit in the database: a unit which no longer exists is dropped,
+        and the production stage is ongoing if and only if the pending stage of the unit has been started
+        """
+        state = State(snapshot.state)
+        employee = Employee(**snapshot.employee) if snapshot.employee else self.employee
+        unit = UnitManager(unit_id=snapshot.unit_id) if snapshot.unit_id and employee is not None else None
+
+        if employee is None:
+            state = State.AWAIT_LOGIN_STATE
+        elif unit is None:
+            state = State.AUTHORIZED_IDLING_STATE
+        else:
+            try:
+                current_unit = unit._get_cur_unit
+            except ValueError:
+                logger.warning(f"Unit {snapshot.unit_id} of the workbench {self.number} snapshot no longer exists")
+                unit, state = None, State.AUTHORIZED_IDLING_STATE
+            except ConnectionFailure as e:
+                logger.warning(f"Workbench {self.number} snapshot is restored as is, the unit cannot be checked: {e}")
+            else:
+                pending = next((stage for stage in current_unit.operation_stages if not stage.completed), None)
+                if pending is not None and pending.session_start_time is not None:
+                    state = State.PRODUCTION_STAGE_ONGOING_STATE
+                elif None in (current_unit._component_slots or {}).values():
+                    state = State.GATHER_COMPONENTS_STATE
+                else:
+                    state = State.UNIT_ASSIGNED_IDLING_STATE
+        return state, employee, unit
+
+    def _claim(self) -> None:
+        """claim the shared state before the side effects of a transition. Raises StateConflictError if it is busy."""
+        if self._store is not None and not self._claims:
+            stored = self._store.load(self.number)
+            if stored is not None:
+                if stored.version != self._version:
+                    self._apply(stored)  # nothing has been done yet, the transition starts from the current state
+                if stored.claimed_by_other(PROCESS_ID):
+                    raise StateConflictError(f"Workbench {self.number} state is being changed by another process")
+            self._publish(claim=True)
+        self._claims += 1
+
+    def _release(self) -> None:
+        """publish the state and drop the claim once the outermost transition is over"""
+        self._claims -= 1
+        if not self._claims:
+            self._publish()
+
+    def _state_changed(self) -> None:
+        if not self._claims:
+            self._publish()  # transitions publish the state when they are over
+        self._save_snapshot()
+        self._notify_state_streams()
+
+    async def watch_store(self, interval: float) -> None:
+        """poll the stored version and adopt the changes made by the other processes"""
+        assert self._store is not None
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await asyncio.to_thread(self._store.version, self.number) != self._version:
+                    await self.refresh_async()
+            except Exception as e:
+                logger.warning(f"Failed to poll the workbench {self.number} state: {e}")
+
     async def _print_unit_barcode(self, unit: Unit) -> None:
         """Print unit barcode"""
         schema: ProductionSchema = ProdSchemaWrapper.get_schema_by_id(unit.schema_id)
@@ -67,6 +305,7 @@ class _WorkBench:
             pathlib.Path(unit.barcode.filename).unlink()
 
     @logger.catch(reraise=True, exclude=(StateForbiddenError, AssertionError))
+    @timed("create_unit")
     async def create_new_unit(self, schema: ProductionSchema) -> Unit:
         """initialize a new instance of the Unit class"""
         if self.state != State.AUTHORIZED_IDLING_STATE:
@@ -74,9 +313,12 @@ class _WorkBench:
             messenger.error(translation("AuthorizedState"))
             raise StateForbiddenError(message)
         unit = Unit(schema=schema)
+        # the unit is stored first: a taken internal id is redrawn on insert and the label must show the final one
+        with metrics.time_step("create_unit.db_write"):
+            UnitWrapper.push_unit(unit)
         if CONFIG.printer.print_barcode and CONFIG.printer.enable:
-            await self._print_unit_barcode(unit)
-        UnitWrapper.push_unit(unit)
+            with metrics.time_step("create_unit.print_barcode"):
+                await self._print_unit_barcode(unit)
         metrics.register_create_unit(self.employee, unit)
 
         return unit
@@ -94,9 +336,10 @@ class _WorkBench:
         self._validate_state_transition(new_state)
         logger.info(f"Workbench no.{self.number} state changed: {self.state.value} -> {new_state.value}")
         self.state = new_state
-        STATE_SWITCH_EVENT.set()
+        self._state_changed()
 
     @logger.catch(reraise=True, exclude=(StateForbiddenError, AssertionError))
+    @_transition
     def log_in(self, employee: Employee) -> None:
         """authorize employee"""
         self._validate_state_transition(State.AUTHORIZED_IDLING_STATE)
@@ -110,6 +353,7 @@ class _WorkBench:
         metrics.register_log_in(employee)
 
     @logger.catch(reraise=True, exclude=(StateForbiddenError, AssertionError))
+    @_transition
     def log_out(self) -> None:
         """log out the employee"""
         self._validate_state_transition(State.AWAIT_LOGIN_STATE)
@@ -127,6 +371,8 @@ class _WorkBench:
         self.switch_state(State.AWAIT_LOGIN_STATE)
 
     @logger.catch(reraise=True, exclude=(StateForbiddenError, AssertionError))
+    @timed("assign_unit")
+    @_transition
     def assign_unit(self, unit: Unit) -> None:
         """assign a unit to the workbench"""
         self._validate_state_transition(State.UNIT_ASSIGNED_IDLING_STATE)
@@ -163,6 +409,7 @@ class _WorkBench:
             self.switch_state(State.UNIT_ASSIGNED_IDLING_STATE)
 
     @logger.catch(reraise=True, exclude=(StateForbiddenError, AssertionError))
+    @_transition
     def remove_unit(self) -> None:
         """remove a unit from the workbench"""
         self._validate_state_transition(State.AUTHORIZED_IDLING_STATE)
@@ -183,6 +430,8 @@ class _WorkBench:
         self.switch_state(State.AUTHORIZED_IDLING_STATE)
 
     @logger.catch(reraise=True, exclude=(StateForbiddenError, AssertionError))
+    @timed("start_operation")
+    @_transition
     async def start_operation(self, additional_info: AdditionalInfo, manual_input: ManualInput | None = None) -> None:
         """begin work on the provided unit"""
         self._validate_state_transition(State.PRODUCTION_STAGE_ONGOING_STATE)
@@ -198,10 +447,12 @@ class _WorkBench:
 
         if manual_input is not None:
             logger.debug(manual_input)
-            response = requests.post(url=CONFIG.business_logic.manual_input_uri, json=manual_input.model_dump())
+            with metrics.time_step("start_operation.business_logic"):
+                response = requests.post(url=CONFIG.business_logic.manual_input_uri, json=manual_input.model_dump())
 
         else:
-            response = requests.post(url=CONFIG.business_logic.start_uri, json=self.unit.schema.model_dump())
+            with metrics.time_step("start_operation.business_logic"):
+                response = requests.post(url=CONFIG.business_logic.start_uri, json=self.unit.schema.model_dump())
             if response.status_code == 504:
                 raise ManualInputNeeded(response.json())  # pass business-logic detail to frontend
         # logger.debug(f"{response.status_code=}; {response.json()}")
@@ -213,6 +464,7 @@ class _WorkBench:
         self.switch_state(State.PRODUCTION_STAGE_ONGOING_STATE)
 
     @logger.catch(reraise=True, exclude=(StateForbiddenError, AssertionError, ValueError))
+    @_transition
     def assign_component_to_unit(self, component: Unit) -> None:
         """assign provided component to a composite unit"""
         assert (
@@ -220,14 +472,16 @@ class _WorkBench:
         ), f"Cannot assign components unless WB is in state {State.GATHER_COMPONENTS_STATE}"
 
         self.unit.assign_component(component)
-        
-        STATE_SWITCH_EVENT.set()
+
+        self._state_changed()
 
         if self.unit.components_filled:
             UnitWrapper.push_unit(self.unit._get_cur_unit)
             self.switch_state(State.UNIT_ASSIGNED_IDLING_STATE)
 
     @logger.catch(reraise=True, exclude=(StateForbiddenError, AssertionError))
+    @timed("end_operation")
+    @_transition
     async def end_operation(self, stage_data: AdditionalInfo | None = None, premature: bool = False) -> None:
         """end work on the provided unit"""
         self._validate_state_transition(State.UNIT_ASSIGNED_IDLING_STATE)
@@ -243,8 +497,9 @@ class _WorkBench:
 
         # Send the command to business logic to stop ongoing operation.
         try:
-            response = requests.get(CONFIG.business_logic.stop_uri)
-            data = response.json()
+            with metrics.time_step("end_operation.business_logic"):
+                response = requests.get(CONFIG.business_logic.stop_uri)
+                data = response.json()
         except Exception as e:
             message = f"Could not stop the operation via business logic: {str(e)}"
             messenger(message)
@@ -271,10 +526,13 @@ class _WorkBench:
             premature=premature,
             override_timestamp=override_timestamp,
         )
-        UnitWrapper.push_unit(self.unit._get_cur_unit, include_components=False)
+        unit = self.unit._get_cur_unit
+        with metrics.time_step("end_operation.db_write"):
+            UnitWrapper.push_unit(unit, include_components=False)
+            UnitWrapper.flush()
 
         self.switch_state(State.UNIT_ASSIGNED_IDLING_STATE)
-        metrics.register_complete_operation(self.employee, self.unit._get_cur_unit)
+        metrics.register_complete_operation(self.employee, unit)
 
     async def _print_security_tag(self) -> None:
         """Print security tag for the unit"""
@@ -312,6 +570,7 @@ class _WorkBench:
             pathlib.Path(qrcode_path).unlink()
 
     @logger.catch(reraise=True, exclude=(StateForbiddenError, AssertionError))
+    @timed("upload_passport")
     async def upload_unit_passport(self) -> None:  # noqa: CAC001,CCR001
         """Finalize the Unit's assembly by producing and publishing its passport"""
 
@@ -325,7 +584,8 @@ class _WorkBench:
             raise AssertionError("No employee is logged in at the workbench")
 
         # Generate and save passport YAML file
-        passport_file_path: Path = await construct_unit_certificate(self.unit._get_cur_unit)
+        with metrics.time_step("upload_passport.certificate"):
+            passport_file_path: Path = await construct_unit_certificate(self.unit._get_cur_unit)
         
         # Determine if QR-code has to be printed -> short link is needed right now
         print_qr = CONFIG.printer.print_qr and (
@@ -336,13 +596,15 @@ class _WorkBench:
 
         # Publish passport YAML file into IPFS
         if CONFIG.ipfs_gateway.enable:
-            cid, link = await publish_file(rfid_card_id=self.employee.rfid_card_id, file_path=passport_file_path)
-            UnitWrapper.update_by_uuid(self.unit.unit_id, "certificate_ipfs_cid", cid)
+            with metrics.time_step("upload_passport.ipfs_publish"):
+                cid, link = await publish_file(rfid_card_id=self.employee.rfid_card_id, file_path=passport_file_path)
+                UnitWrapper.update_by_uuid(self.unit.unit_id, "certificate_ipfs_cid", cid)
 
             # Generate a QR-code pointing to the unit's passport and print it
             if print_qr:
                 try:
-                    await self._print_qr(link)
+                    with metrics.time_step("upload_passport.print_qr"):
+                        await self._print_qr(link)
                 except Exception as e:
                     messenger.error(translation("CanceledPasport"))
                     logger.error(f"Failed to print QR code. Passport not saved. {e}")
@@ -350,20 +612,22 @@ class _WorkBench:
 
         # Print a security tag sticker if needed
         if CONFIG.printer.print_security_tag:
-            await self._print_security_tag()
+            with metrics.time_step("upload_passport.print_security_tag"):
+                await self._print_security_tag()
 
-        # Publish passport file's IPFS CID to Robonomics Datalog
+        # Queue passport file's IPFS CID for batched anchoring in Robonomics Datalog
         if CONFIG.robonomics.enable_datalog and (cid := self.unit._get_cur_unit.certificate_ipfs_cid) is not None:
-            asyncio.create_task(post_to_datalog(cid, self.unit._get_cur_unit.internal_id))
+            datalog_batcher.submit(cid, self.unit._get_cur_unit.internal_id)
 
         # Update unit data saved in the DB
-        UnitWrapper.push_unit(self.unit._get_cur_unit)
-        metrics.register_generate_passport(self.employee, self.unit._get_cur_unit)
-
-    async def shutdown(self) -> None:
-        logger.info("Workbench shutdown sequence initiated")
-        messenger.warning(translation("ShutDownServer"))
-
+        unit = self.unit._get_cur_unit
+        with metrics.time_step("upload_passport.db_write"):
+            UnitWrapper.push_unit(unit)
+            UnitWrapper.flush()
+        metrics.register_generate_passport(self.employee, unit)
+
+    async def _tear_down(self) -> None:
+        """end the ongoing operation, remove the unit and log the employee out"""
         if self.state == State.PRODUCTION_STAGE_ONGOING_STATE:
             logger.warning(
                 "Ending ongoing operation prematurely. Reason: Unfinished when Workbench shutdown sequence initiated"
@@ -375,16 +639,75 @@ class _WorkBench:
 
         if self.state in (State.UNIT_ASSIGNED_IDLING_STATE, State.GATHER_COMPONENTS_STATE):
             self.remove_unit()
-            ...
 
         if self.state == State.AUTHORIZED_IDLING_STATE:
             self.log_out()
-            ...
+
+    async def shutdown(self) -> None:
+        current_workbench.set(self.number)  # the workbench notifications and metrics, the task context is its own
+        logger.info(f"Workbench {self.number} shutdown sequence initiated")
+        messenger.warning(translation("ShutDownServer"))
+
+        if self._store is not None:
+            logger.info(f"Workbench {self.number} state is kept in the shared store for the other processes")
+        elif self._snapshot_path is not None:
+            # the employee, the unit and the ongoing stage are resumed from the snapshot on the next start
+            logger.info(f"Workbench {self.number} state is kept in the snapshot to resume from")
+        else:
+            await self._tear_down()
 
         message = "Workbench shutdown sequence complete"
         logger.info(message)
         messenger.success(translation("FinishServer"))
 
 
+class _WorkbenchRegistry:
+    """
+    The workbenches hosted by the daemon keyed by their numbers. Each has its own state machine and
+    SSE channels, while the database connection, caches, printer and messenger are shared.
+    """
+
+    def __init__(self) -> None:
+        self._workbenches: dict[int, _WorkBench] = {}
+        self._store: _StateStore | None = None
+        self._watchers: list[asyncio.Task[None]] = []
+
+    @property
+    def numbers(self) -> list[int]:
+        return list(self._workbenches)
+
+    @property
+    def shared(self) -> bool:
+        """whether the state is kept in a store shared with the other daemon processes"""
+        return self._store is not None
+
+    def _snapshot_path(self, number: int) -> str | None:
+        """a shared store outlives the process by itself, the snapshots are only saved without one"""
+        if self._store is not None or not CONFIG.workbench.snapshot_dir:
+            return None
+        return str(Path(CONFIG.workbench.snapshot_dir) / f"workbench-{number}.json")
+
+    async def initialize(self) -> None:
+        """create and initialize the configured workbenches"""
+        numbers = dict.fromkeys([CONFIG.workbench.number, *CONFIG.workbench.hosted_numbers])
+        self._store = create_state_store(CONFIG.state_store)
+        self._workbenches = {number: _WorkBench(number, self._store, self._snapshot_path(number)) for number in numbers}
+        await asyncio.gather(*(workbench.initialize() for workbench in self._workbenches.values()))
+        if self._store is not None:
+            interval = CONFIG.state_store.poll_interval_ms / 1000
+            self._watchers = [asyncio.create_task(bench.watch_store(interval)) for bench in self._workbenches.values()]
+
+    def get(self, number: int | None = None) -> _WorkBench:
+        """get the workbench by its number, the default one if no number is given. Raises KeyError if not hosted."""
+        return self._workbenches[CONFIG.workbench.number if number is None else number]
+
+    async def shutdown(self) -> None:
+        # every workbench shuts down in its own task, so that their contexts are separate
+        for watcher in self._watchers:
+            watcher.cancel()
+        await asyncio.gather(*(workbench.shutdown() for workbench in self._workbenches.values()))
+        if self._store is not None:
+            self._store.close()
+
 
-Workbench = _WorkBench()
+Workbenches = _WorkbenchRegistry()
@@ -0,0 +1,20 @@
+import asyncio
+
+from robonomicsinterface import Datalog
+
+from .exceptions import RobonomicsError
+
+
+class AsyncDatalogClient(Datalog):  # type: ignore
+    """Async thread safe Datalog client implementation"""
+
+    _client_lock: asyncio.Lock = asyncio.Lock()
+
+    async def record(self, data: str, nonce: int | None = None) -> str:
+        async with self._client_lock:
+            try:
+                loop = asyncio.get_running_loop()
+                result: str = await loop.run_in_executor(None, super().record, data)
+                return result
+            except Exception as e:
+                raise RobonomicsError(str(e)) from e
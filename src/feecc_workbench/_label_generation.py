@@ -1,19 +1,21 @@
+from __future__ import annotations
+
 import pathlib
 import time
 import os
 from datetime import datetime as dt
-import barcode as bcode
-from barcode.writer import ImageWriter
 from pydantic import BaseModel
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import qrcode
 from loguru import logger
-from PIL import Image, ImageDraw, ImageFont
 
 from ..config import CONFIG
 from .translation import translation
-from .utils import time_execution
+from .metrics import timed
+
+# Pillow, qrcode and python-barcode are imported on first use to keep them off the daemon startup path
+if TYPE_CHECKING:
+    from PIL import Image
 
 # color values
 color = tuple[int, int, int]
@@ -21,9 +23,11 @@ WHITE: color = (255, 255, 255)
 BLACK: color = (0, 0, 0)
 
 
-@time_execution
+@timed("label_resize")
 def _resize_to_paper_aspect_ratio(image: Image) -> Image:
     """expand image to fit the paper aspect ratio"""
+    from PIL import Image
+
     label_w, label_h = [int(x) for x in CONFIG.printer.paper_aspect_ratio.split(":")]
     or_img_w, or_img_h = image.size
     if or_img_w / or_img_h >= label_w / label_h:
@@ -38,9 +42,11 @@ def _resize_to_paper_aspect_ratio(image: Image) -> Image:
     return resized_image
 
 
-@time_execution
+@timed("label_create_qr")
 def create_qr(link: str) -> pathlib.Path:
     """This is a qr-creating submodule. Inserts a Robonomics logo inside the qr and adds logos aside if required"""
+    import qrcode
+
     logger.debug(f"Generating QR code image file for {link}")
 
     qr: Image = qrcode.make(link, border=1)
@@ -61,9 +67,11 @@ def create_qr(link: str) -> pathlib.Path:
     return path_to_qr
 
 
-@time_execution
+@timed("label_create_seal_tag")
 def create_seal_tag() -> pathlib.Path:
     """generate a custom seal tag with required parameters"""
+    from PIL import Image, ImageDraw, ImageFont
+
     logger.info("Generating seal tag")
 
     timestamp_enabled: bool = CONFIG.printer.security_tag_add_timestamp
@@ -118,11 +126,14 @@ class Barcode(BaseModel):
         arbitrary_types_allowed = True
         
     unit_code: str 
-    barcode: bcode.EAN13 | None = None
+    barcode: Any = None  # barcode.EAN13
     basename: str | None = None
     filename: str | None = None
     def model_post_init(self, __context: Any) -> None:
         if self.barcode is None:
+            import barcode as bcode
+            from barcode.writer import ImageWriter
+
             self.barcode = bcode.get("ean13", self.unit_code, writer=ImageWriter())
             if self.basename is None and self.filename is None:
                 self.basename = f"output/barcode/{self.barcode.get_fullcode()}_barcode"
@@ -132,6 +143,8 @@ class Barcode(BaseModel):
 
 def save_barcode(barcode: Barcode) -> str:
     """Method that saves the barcode image"""
+    from PIL import Image
+
     dir_ = pathlib.Path(barcode.filename).parent
     if not dir_.is_dir():
         dir_.mkdir(parents=True)
@@ -1,14 +1,26 @@
 import datetime as dt
+import hashlib
+import json
 import pathlib
+from dataclasses import asdict
 from typing import Any
 
 import yaml
 from loguru import logger
 
+from src.config import CONFIG
 from src.prod_stage.ProductionStage import ProductionStage
-from src.unit.unit_utils import Unit
+from src.unit.unit_utils import FROZEN_STATUSES, Unit
 from src.unit.unit_wrapper import UnitWrapper
-from src.feecc_workbench.translation import translation
+from src.feecc_workbench.translation import translation, translations_digest
+from src.feecc_workbench.utils import TIMESTAMP_FORMAT
+
+# libyaml based emitter is an order of magnitude faster than the pure Python one
+YamlDumper = getattr(yaml, "CDumper", yaml.Dumper)
+WRITE_BUFFER_SIZE = 64 * 1024
+
+# bump when the certificate layout changes to invalidate all the cached fragments
+CERTIFICATE_FORMAT_VERSION = 1
 
 
 def _construct_stage_dict(prod_stage: ProductionStage) -> dict[str, Any]:
@@ -25,65 +37,193 @@ def _construct_stage_dict(prod_stage: ProductionStage) -> dict[str, Any]:
     return stage
 
 
-def _get_total_assembly_time(unit: Unit) -> dt.timedelta:
-    """Calculate total assembly time of the unit and all its components recursively"""
-    own_time: dt.timedelta = unit.total_assembly_time
-    for component in unit.components_units:
-        component_time = _get_total_assembly_time(component)
-        own_time += component_time
+def _get_own_assembly_time(unit: Unit) -> dt.timedelta:
+    """Calculate total time spent during all production stages of the unit itself"""
+    total = dt.timedelta(0)
+
+    for stage in unit.operation_stages:
+        if stage.session_start_time is None:
+            continue
+        start_time = dt.datetime.strptime(stage.session_start_time, TIMESTAMP_FORMAT)
+        end_time = (
+            dt.datetime.strptime(stage.session_end_time, TIMESTAMP_FORMAT)
+            if stage.session_end_time is not None
+            else dt.datetime.now()
+        )
+        total += end_time - start_time
 
-    return own_time
+    return total
 
 
-def _get_certificate_dict(unit: Unit) -> dict[str, Any]:
+def _fragment_key(unit: Unit, component_keys: list[str | None]) -> str:
     """
-    form a nested dictionary containing all the unit
-    data to dump it into a human friendly certificate
+    key of the certificate fragment of the unit subtree: a digest of everything the fragment is rendered from,
+    including the keys of the component fragments and the translation table, so any change of these misses the cache
     """
-    certificate_dict: dict[str, Any] = {
-        translation("UnitID"): unit.uuid,
-        translation("UnitName"): unit.schema.schema_name,
+    inputs = {
+        "format": CERTIFICATE_FORMAT_VERSION,
+        "language": CONFIG.language_message,
+        "translations": translations_digest(CONFIG.language_message),
+        "uuid": unit.uuid,
+        "internal_id": unit.internal_id,
+        "serial_number": unit.serial_number,
+        "schema_name": unit.schema.schema_name,
+        "operation_stages": [asdict(stage) for stage in unit.operation_stages],
+        "certificate_txn_hash": unit.certificate_txn_hash,
+        "components": list(zip(unit.components_ids, component_keys)),
     }
+    content = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
 
-    try:
-        certificate_dict[translation("UnitTotalAssemblyTime")] = str(unit.total_assembly_time)
-    except Exception as e:
-        logger.error(str(e))
-
-    if unit.operation_stages:
-        certificate_dict[translation("UnitBiography")] = [_construct_stage_dict(stage) for stage in unit.operation_stages]
-
-    if unit.certificate_txn_hash is not None:
-        certificate_dict[translation("BuildVideoHashes")] = [
-            f"https://gateway.ipfs.io/ipfs/{cid}" for cid in unit.certificate_txn_hash
-        ]
 
-    if unit.components_ids:
-        components_units = UnitWrapper.get_components_units(unit.components_ids)
-        certificate_dict[translation("UnitComponents")] = [_get_certificate_dict(c) for c in components_units]
-        certificate_dict[translation("UnitTotalAssemblyTimeComponents")] = str(_get_total_assembly_time(unit))
+def _stored_key(unit: Unit) -> str | None:
+    """key of the cached certificate fragment of the unit, None if there is none or the unit is not frozen"""
+    if unit.status not in FROZEN_STATUSES or unit.certificate_fragment is None:
+        return None
+    key: str | None = unit.certificate_fragment.get("key")
+    return key
 
-    if unit.serial_number:
-        certificate_dict[translation("UnitSerialNumber")] = unit.serial_number
 
-    return certificate_dict
+def _load_unit_tree(unit: Unit, use_cache: bool = True) -> tuple[dict[str, Unit], dict[str, str | None]]:
+    """
+    Load all the units of the component tree with a single DB query per tree level.
+    Subtrees of the components with a valid cached certificate fragment are not loaded,
+    the fragment keys of their own components are returned instead to validate them.
+    """
+    tree: dict[str, Unit] = {unit.uuid: unit}
+    fragment_keys: dict[str, str | None] = {}
+    level = [unit]
+
+    while level:
+        cached = [u for u in level if use_cache and _stored_key(u) is not None]
+        if children_ids := [c_id for u in cached for c_id in u.components_ids]:
+            fragment_keys.update(UnitWrapper.get_certificate_fragment_keys(children_ids))
+        expand = [
+            u
+            for u in level
+            if u not in cached
+            or _fragment_key(u, [fragment_keys.get(c_id) for c_id in u.components_ids]) != _stored_key(u)
+        ]
+        pending = [c_id for u in expand for c_id in u.components_ids if c_id not in tree]
+        level = UnitWrapper.get_units_by_uuids(pending) if pending else []
+        tree.update((component.uuid, component) for component in level)
+
+    return tree, {uuid: key for uuid, key in fragment_keys.items() if uuid not in tree}
+
+
+class _CertificateBuilder:
+    """Builds a unit certificate out of a preloaded component tree, splicing in cached fragments"""
+
+    def __init__(
+        self, tree: dict[str, Unit], use_cache: bool = True, fragment_keys: dict[str, str | None] | None = None
+    ) -> None:
+        self.tree = tree
+        self.use_cache = use_cache
+        self.new_fragments: dict[str, dict[str, Any]] = {}
+        # fragment keys of the units already built in this pass and of the components left out of the tree
+        self._keys: dict[str, str | None] = dict(fragment_keys or {})
+
+    def _component_key(self, uuid: str) -> str | None:
+        if uuid in self._keys:
+            return self._keys[uuid]
+        return _stored_key(self.tree[uuid]) if uuid in self.tree else None
+
+    def _cached_fragment(self, unit: Unit) -> dict[str, Any] | None:
+        """the cached certificate fragment of the unit subtree if it has been rendered from the current inputs"""
+        key = _stored_key(unit)
+        if key is None or key != _fragment_key(unit, [self._component_key(c_id) for c_id in unit.components_ids]):
+            return None
+        return unit.certificate_fragment
+
+    def build_component(self, unit: Unit) -> tuple[dict[str, Any], dt.timedelta]:
+        """get the certificate of a component subtree along with its total assembly time"""
+        if self.use_cache and (fragment := self._cached_fragment(unit)) is not None:
+            self._keys[unit.uuid] = fragment["key"]
+            return fragment["certificate"], dt.timedelta(seconds=fragment["assembly_time_seconds"])
+
+        certificate, subtree_time = self.build(unit)
+        key = None
+        if unit.status in FROZEN_STATUSES:
+            component_keys = [self._component_key(c_id) for c_id in unit.components_ids]
+            # a fragment embedding a component which is not frozen would go stale along with it
+            if None not in component_keys:
+                key = _fragment_key(unit, component_keys)
+                self.new_fragments[unit.uuid] = {
+                    "key": key,
+                    "certificate": certificate,
+                    "assembly_time_seconds": subtree_time.total_seconds(),
+                }
+        self._keys[unit.uuid] = key
+        return certificate, subtree_time
+
+    def build(self, unit: Unit) -> tuple[dict[str, Any], dt.timedelta]:
+        """
+        form a nested dictionary containing all the unit data to dump it into a human friendly certificate.
+        Total assembly time of the unit subtree is computed bottom-up along the way and returned too.
+        """
+        own_time = _get_own_assembly_time(unit)
+        certificate_dict: dict[str, Any] = {
+            translation("UnitID"): unit.uuid,
+            translation("UnitName"): unit.schema.schema_name,
+            translation("UnitTotalAssemblyTime"): str(own_time),
+        }
+
+        if unit.operation_stages:
+            certificate_dict[translation("UnitBiography")] = [
+                _construct_stage_dict(stage) for stage in unit.operation_stages
+            ]
+
+        if unit.certificate_txn_hash is not None:
+            certificate_dict[translation("BuildVideoHashes")] = [
+                f"https://gateway.ipfs.io/ipfs/{cid}" for cid in unit.certificate_txn_hash
+            ]
+
+        subtree_time = own_time
+
+        if unit.components_ids:
+            components_certificates = []
+            for component_id in unit.components_ids:
+                if component_id not in self.tree:
+                    logger.error(f"Component {component_id} of unit {unit.uuid} not found")
+                    continue
+                component_certificate, component_time = self.build_component(self.tree[component_id])
+                components_certificates.append(component_certificate)
+                subtree_time += component_time
+
+            certificate_dict[translation("UnitComponents")] = components_certificates
+            certificate_dict[translation("UnitTotalAssemblyTimeComponents")] = str(subtree_time)
+
+        if unit.serial_number:
+            certificate_dict[translation("UnitSerialNumber")] = unit.serial_number
+
+        return certificate_dict, subtree_time
+
+
+def build_unit_certificate(unit: Unit, use_cache: bool = True) -> dict[str, Any]:
+    """
+    form the unit certificate dictionary. Certificate fragments of frozen components are reused
+    and the newly rendered ones are cached, unless `use_cache` is off: then the cache is left as is.
+    """
+    tree, fragment_keys = _load_unit_tree(unit, use_cache)
+    builder = _CertificateBuilder(tree, use_cache, fragment_keys)
+    certificate, _ = builder.build_component(unit)
+    if use_cache and builder.new_fragments:
+        UnitWrapper.save_certificate_fragments(builder.new_fragments)
+    return certificate
 
 
-def _save_certificate(unit: Unit, certificate_dict: dict[str, Any], path: str) -> None:
+def save_certificate(unit: Unit, certificate_dict: dict[str, Any], path: pathlib.Path) -> None:
     """makes a unit certificate and dumps it in a form of a YAML file"""
-    dir_ = pathlib.Path("unit-certificates")
-    if not dir_.is_dir():
-        dir_.mkdir()
-    certificate_file = pathlib.Path(path)
-    with certificate_file.open("w") as f:
-        yaml.dump(certificate_dict, f, allow_unicode=True, sort_keys=False)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        yaml.dump(certificate_dict, f, Dumper=YamlDumper, allow_unicode=True, sort_keys=False)
     logger.info(f"Unit certificate with UUID {unit.uuid} has been dumped successfully")
 
 
 @logger.catch(reraise=True)
-async def construct_unit_certificate(unit: Unit) -> pathlib.Path:
+async def construct_unit_certificate(unit: Unit, use_cache: bool = True) -> pathlib.Path:
     """construct own certificate, dump it as .yaml file and return a path to it"""
-    certificate = _get_certificate_dict(unit)
-    path = f"unit-certificates/unit-certificate-{unit.uuid}.yaml"
-    _save_certificate(unit, certificate, path)
-    return pathlib.Path(path)
+    certificate = build_unit_certificate(unit, use_cache)
+    path = pathlib.Path(f"unit-certificates/unit-certificate-{unit.uuid}.yaml")
+    save_certificate(unit, certificate, path)
+    return path
@@ -0,0 +1,5 @@
+from contextvars import ContextVar
+
+# number of the workbench the current request or task acts on. Set by the request routing and the workbench lifecycle,
+# it scopes the notifications and labels the metrics. None means no particular workbench.
+current_workbench: ContextVar[int | None] = ContextVar("current_workbench", default=None)
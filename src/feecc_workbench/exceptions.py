@@ -7,12 +7,11 @@ from .metrics import metrics
 class TrackedException(Exception):  # noqa: N818
     """An exception that increments Prometheus metric counter for itself"""
 
+    # constant labels only: the message is unbounded and is logged by the handlers instead
     _labels: dict[str, str] = {}
 
     def __init__(self, *args: Any) -> None:
         labels = copy(self._labels)
-        if args:
-            labels["message"] = args[0]
         metrics.register(
             name=self.__class__.__name__,
             description=self.__class__.__doc__,
@@ -33,6 +32,10 @@ class StateForbiddenError(TrackedException):
     """Raised when state transition is forbidden"""
 
 
+class StateConflictError(TrackedException):
+    """Raised when the workbench state has been changed by another process in the meantime"""
+
+
 class RobonomicsError(TrackedException):
     """Raised when Robonmics transactions fail"""
 
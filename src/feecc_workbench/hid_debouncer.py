@@ -0,0 +1,47 @@
+from aioprometheus.collectors import Counter
+from loguru import logger
+
+from ..config import CONFIG
+from ..database.models import HidEvent
+
+suppressed_events = Counter("hid_duplicate_events_suppressed_total", "HID events dropped as duplicates of a recent one")
+
+
+class HidDebouncer:
+    """
+    Drops repeated HID events: barcode readers often send the same code twice within milliseconds
+    and card taps bounce. An event is a duplicate if the same device sent the same string within
+    the debounce window of the last accepted one. Windows are tracked per workbench and device and by
+    the event timestamps, so the order the requests are handled in does not matter.
+    """
+
+    def __init__(self) -> None:
+        # (workbench, device) -> string -> timestamp of the last accepted event
+        self._accepted: dict[tuple[int | None, str], dict[str, float]] = {}
+
+    @property
+    def _window(self) -> float:
+        return CONFIG.workbench.hid_debounce_ms / 1000
+
+    def is_duplicate(self, event: HidEvent, workbench: int | None = None) -> bool:
+        """check the event against the recent ones, remembering it if it is accepted"""
+        window = self._window
+        if window <= 0:
+            return False
+
+        accepted = self._accepted.setdefault((workbench, event.name), {})
+        last = accepted.get(event.string)
+        if last is not None and abs(event.timestamp - last) < window:
+            suppressed_events.inc({"device": event.name})
+            logger.debug(f"Duplicate {event.name} event '{event.string}' suppressed")
+            return True
+
+        # forget the events the window has passed for
+        for string, timestamp in list(accepted.items()):
+            if event.timestamp - timestamp >= window:
+                del accepted[string]
+        accepted[event.string] = event.timestamp
+        return False
+
+
+hid_debouncer = HidDebouncer()
@@ -0,0 +1,39 @@
+import json
+import pathlib
+import threading
+
+from loguru import logger
+
+from ..config import CONFIG
+from ..database.models import HidEvent
+
+
+class HidEventRecorder:
+    """Appends the HID events received by the daemon to a JSON lines file, so that they can be replayed later"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def record(self, event: HidEvent) -> None:
+        """save the event if recording is enabled. Recording failures never affect event handling."""
+        path = CONFIG.workbench.hid_events_record_path
+        if not path:
+            return
+
+        try:
+            with self._lock:
+                pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+                with open(path, "a") as f:
+                    f.write(event.model_dump_json() + "\n")
+        except OSError as e:
+            logger.error(f"Failed to record HID event to {path}: {e}")
+
+
+def load_events(path: str | pathlib.Path) -> list[HidEvent]:
+    """read the recorded events ordered by their timestamps"""
+    with open(path) as f:
+        events = [HidEvent(**json.loads(line)) for line in f if line.strip()]
+    return sorted(events, key=lambda event: event.timestamp)
+
+
+hid_recorder = HidEventRecorder()
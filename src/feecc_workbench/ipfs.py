@@ -7,25 +7,25 @@ from loguru import logger
 from ..config import CONFIG
 from .Messenger import messenger
 from .translation import translation
-from .utils import async_time_execution, get_headers, service_is_up
+from .metrics import timed
+from .utils import get_headers, service_is_up
 
-IPFS_GATEWAY_ADDRESS: str = CONFIG.ipfs_gateway.ipfs_server_uri
 
-
-@async_time_execution
+@timed("ipfs_publish")
 async def publish_file(rfid_card_id: str, file_path: pathlib.Path) -> tuple[str, str]:
     """publish a provided file to IPFS using the Feecc gateway and return it's CID and URL"""
     if not CONFIG.ipfs_gateway.enable:
         raise ValueError("IPFS Gateway disabled in config")
 
-    if not service_is_up(IPFS_GATEWAY_ADDRESS):
+    gateway_address = CONFIG.ipfs_gateway.ipfs_server_uri
+    if not service_is_up(gateway_address):
         message = "IPFS gateway is not available"
         messenger.error(translation("IPFSunavailable"))
         raise ConnectionError(message)
 
     file_path = pathlib.Path(file_path)
     headers: dict[str, str] = get_headers(rfid_card_id)
-    base_url = f"{IPFS_GATEWAY_ADDRESS}/publish-to-ipfs"
+    base_url = f"{gateway_address}/publish-to-ipfs"
 
     async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
         if file_path.exists():
@@ -0,0 +1,89 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+from aioprometheus.collectors import Counter, Histogram
+from loguru import logger
+
+from ..config import CONFIG
+
+BLOCKING_STACK_LIMIT = 10  # innermost frames of the blocking call stack that are logged
+
+loop_lag = Histogram(
+    "event_loop_lag_seconds",
+    "Delay of the event loop heartbeat behind its schedule",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf")),
+)
+loop_blocks = Counter("event_loop_blocked_total", "Times the event loop was blocked for longer than the threshold")
+
+
+class LoopWatchdog:
+    """
+    Measures the event loop lag with a heartbeat task. A watchdog thread notices when the heartbeat
+    stalls for longer than the threshold and logs the stack of the code blocking the loop at that moment.
+    """
+
+    def __init__(self) -> None:
+        self._heartbeat: asyncio.Task[None] | None = None
+        self._watcher: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: int | None = None
+        self._last_beat = 0.0
+
+    @property
+    def _interval(self) -> float:
+        return CONFIG.loop_watchdog.interval_ms / 1000
+
+    @property
+    def _threshold(self) -> float:
+        return CONFIG.loop_watchdog.block_threshold_ms / 1000
+
+    def start(self) -> None:
+        """start watching the running loop. Must be called from the loop thread."""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._watcher = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watcher.start()
+        logger.info(f"Event loop watchdog started, blocks longer than {self._threshold * 1000:.0f}ms are reported")
+
+    async def _beat(self) -> None:
+        interval = self._interval
+        while True:
+            scheduled_at = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            self._last_beat = time.monotonic()
+            loop_lag.observe({}, max(0.0, self._last_beat - scheduled_at))
+
+    def blocked_for(self) -> float:
+        """how long the heartbeat is overdue"""
+        return time.monotonic() - self._last_beat - self._interval
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stopped.wait(self._threshold / 2):
+            last_beat = self._last_beat
+            blocked_for = self.blocked_for()
+            if blocked_for < self._threshold or last_beat == reported_beat:
+                continue
+
+            reported_beat = last_beat  # a single report per block
+            loop_blocks.inc({})
+            frame = sys._current_frames().get(self._loop_thread_id)  # type: ignore[arg-type]
+            stack = "".join(traceback.format_stack(frame, BLOCKING_STACK_LIMIT)) if frame is not None else "unavailable"
+            logger.warning(f"Event loop blocked for over {blocked_for * 1000:.0f}ms. Blocking call stack:\n{stack}")
+
+    async def shutdown(self) -> None:
+        if self._heartbeat is None:
+            return
+
+        self._heartbeat.cancel()
+        self._stopped.set()
+        if self._watcher is not None:
+            await asyncio.to_thread(self._watcher.join)
+
+
+loop_watchdog = LoopWatchdog()
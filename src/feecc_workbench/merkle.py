@@ -0,0 +1,79 @@
+import hashlib
+from dataclasses import dataclass, field
+
+# domain separation prefixes prevent a leaf from being passed off as an inner node
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+@dataclass
+class ProofStep:
+    """A single sibling hash on the path from a leaf to the Merkle root"""
+
+    sibling: str
+    side: str  # "left" or "right" - the side the sibling is on
+
+
+@dataclass
+class InclusionProof:
+    """Proof that a passport CID is a part of a Merkle tree with the provided root"""
+
+    cid: str
+    root: str
+    index: int
+    path: list[ProofStep] = field(default_factory=list)
+
+
+def _sha256(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+def leaf_hash(cid: str) -> bytes:
+    """hash a passport CID into a tree leaf"""
+    return _sha256(_LEAF_PREFIX + cid.encode())
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """hash two child nodes into their parent"""
+    return _sha256(_NODE_PREFIX + left + right)
+
+
+def _next_level(level: list[bytes]) -> list[bytes]:
+    """hash nodes pairwise. The odd node out (if any) is promoted to the next level as is."""
+    parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def build_proofs(cids: list[str]) -> list[InclusionProof]:
+    """Build a Merkle tree over the provided CIDs and return an inclusion proof for each one of them"""
+    if not cids:
+        raise ValueError("Cannot build a Merkle tree with no leaves")
+
+    level = [leaf_hash(cid) for cid in cids]
+    paths: list[list[ProofStep]] = [[] for _ in cids]
+    positions = list(range(len(cids)))
+
+    while len(level) > 1:
+        for leaf_no, pos in enumerate(positions):
+            sibling_pos = pos ^ 1
+            if sibling_pos < len(level):
+                side = "left" if sibling_pos < pos else "right"
+                paths[leaf_no].append(ProofStep(sibling=level[sibling_pos].hex(), side=side))
+            positions[leaf_no] = pos // 2
+        level = _next_level(level)
+
+    root = level[0].hex()
+    return [InclusionProof(cid=cid, root=root, index=i, path=paths[i]) for i, cid in enumerate(cids)]
+
+
+def verify_proof(cid: str, path: list[ProofStep], root: str) -> bool:
+    """Check that the CID is included into the Merkle tree with the provided root"""
+    current = leaf_hash(cid)
+
+    for step in path:
+        sibling = bytes.fromhex(step.sibling)
+        current = node_hash(sibling, current) if step.side == "left" else node_hash(current, sibling)
+
+    return current.hex() == root
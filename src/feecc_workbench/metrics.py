@@ -1,102 +1,189 @@
 from __future__ import annotations
 
+import contextlib
+import datetime as dt
+import functools
+import inspect
+import json
 import os
 import re
-from typing import TYPE_CHECKING
+import time
+from collections.abc import Callable, Iterator
+from typing import TYPE_CHECKING, Any, TypeVar
 
-from aioprometheus.collectors import Summary
+from aioprometheus.collectors import Counter, Histogram, Summary
+from loguru import logger
 
+from ..config import CONFIG
 from ..employee.Employee import Employee
-from .utils import export_version
-from src.prod_schema.prod_schema_wrapper import ProdSchemaWrapper
+from .context import current_workbench
+from .utils import TIMESTAMP_FORMAT, export_version
 
 if TYPE_CHECKING:
+    from src.prod_stage.ProductionStage import ProductionStage
     from src.unit.unit_utils import Unit
 
+# labels are bounded: event types are fixed, schemas and workbenches are few. Per unit detail goes to the event log.
+production_events = Counter("production_events_total", "Production events by type, unit schema and workbench")
+operation_duration = Histogram(
+    "production_operation_duration_seconds",
+    "Duration of the completed production stages by unit schema",
+    buckets=(10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 14400, float("inf")),
+)
+assembly_duration = Histogram(
+    "production_unit_assembly_duration_seconds",
+    "Total production stages duration of the built units by unit schema",
+    buckets=(60, 300, 600, 1800, 3600, 7200, 14400, 28800, 86400, float("inf")),
+)
+workflow_step_duration = Histogram(
+    "workflow_step_duration_seconds",
+    "Latency of the unit lifecycle steps and their sub-steps by outcome",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, float("inf")),
+)
+
+# production events are written to a dedicated log sink, see `src._logging`
+event_log = logger.bind(production_event=True)
+
+
+def _stage_duration(stage: ProductionStage) -> float | None:
+    if stage.session_start_time is None or stage.session_end_time is None:
+        return None
+    start = dt.datetime.strptime(stage.session_start_time, TIMESTAMP_FORMAT)
+    end = dt.datetime.strptime(stage.session_end_time, TIMESTAMP_FORMAT)
+    return (end - start).total_seconds()
+
 
 class Metrics:
     def __init__(self) -> None:
-        self._metrics: dict[str, Summary] = {}
+        self._metrics: dict[str, Counter] = {}
+        self._default_workbench = "unknown"
+        # schema id -> name of the schemas seen on the units, so that no label needs a database query
+        self._schema_names: dict[str, str] = {}
+
+    def initialize(self) -> None:
+        """export the app version. Called once on startup."""
         export_version()
         app_version = Summary(name="app_version", doc="Runtime application version")
         app_version.observe(labels={"app_version": os.getenv("VERSION", "Unknown")}, value=1)
+        self._default_workbench = str(CONFIG.workbench.number)
 
     @staticmethod
     def _transform(text: str) -> str:
         """Convert camel/pascal case to snake_case"""
         return re.sub(r"(?<!^)(?=[A-Z])", "_", text).lower()
 
+    @property
+    def _workbench(self) -> str:
+        """workbench label value: the workbench being acted on or the default one"""
+        workbench = current_workbench.get()
+        return self._default_workbench if workbench is None else str(workbench)
+
+    @contextlib.contextmanager
+    def time_step(self, step: str) -> Iterator[None]:
+        """observe the duration of a workflow step, failed attempts included"""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            elapsed = time.perf_counter() - started
+            labels = {"step": step, "outcome": outcome, "workbench": self._workbench}
+            workflow_step_duration.observe(labels, elapsed)
+            logger.debug(f"Step {step!r} ({outcome}) took {elapsed:.4f}s")
+
     def _create(self, name: str, description: str) -> None:
         """Create metric"""
-        self._metrics[name] = Summary(name=self._transform(name), doc=description)
+        self._metrics[name] = Counter(name=f"{self._transform(name)}_total", doc=description)
 
     def register(self, name: str, description: str | None, labels: dict[str, str] | None = None) -> None:
-        """Register metric event"""
+        """Count an event. Labels must have a bounded set of values."""
         if labels is None:
             labels = {}
         if name not in self._metrics:
             self._create(name=name, description=description or "")
-        self._metrics[name].observe(labels=labels, value=1)
+        self._metrics[name].inc(labels)
+
+    def _schema_name(self, unit: Unit) -> str:
+        """schema label value of the unit. Never queries the database."""
+        if unit.schema is not None:
+            self._schema_names[unit.schema_id] = unit.schema.schema_name
+        return self._schema_names.get(unit.schema_id, "unknown")
+
+    def _register_event(
+        self, event_type: str, employee: Employee | None, unit: Unit | None = None, duration: float | None = None
+    ) -> None:
+        schema = self._schema_name(unit) if unit is not None else ""
+        production_events.inc({"event_type": event_type, "schema": schema, "workbench": self._workbench})
+
+        event = {
+            "timestamp": dt.datetime.now().isoformat(timespec="milliseconds"),
+            "event_type": event_type,
+            "workbench": self._workbench,
+            "employee_name": employee.name if employee else "Unknown",
+        }
+        if unit is not None:
+            event |= {"unit_id": unit.internal_id, "unit_type": schema}
+        if duration is not None:
+            event["duration_seconds"] = duration
+        event_log.info(json.dumps(event, ensure_ascii=False))
 
     def register_log_in(self, employee: Employee | None) -> None:
         """Register log_in event"""
-        labels = {
-            "event_type": "log_in",
-            "employee_name": employee.name if employee else "Unknown",
-        }
-        self.register(name="production_metrics", description=None, labels=labels)
+        self._register_event("log_in", employee)
 
     def register_log_out(self, employee: Employee | None) -> None:
         """Register log_out event"""
-        labels = {
-            "event_type": "log_out",
-            "employee_name": employee.name if employee else "Unknown",
-        }
-        self.register(name="production_metrics", description=None, labels=labels)
+        self._register_event("log_out", employee)
 
     def register_create_unit(self, employee: Employee | None, unit: Unit) -> None:
         """Register create_unit event"""
-        unit_name = ProdSchemaWrapper.get_schema_by_id(unit.schema_id).schema_name
-        labels = {
-            "event_type": "create_unit",
-            "employee_name": employee.name if employee else "Unknown",
-            "unit_id": unit.internal_id,
-            "unit_type": unit_name,
-        }
-        self.register(name="production_metrics", description=None, labels=labels)
+        self._register_event("create_unit", employee, unit)
 
     def register_complete_unit(self, employee: Employee | None, unit: Unit) -> None:
         """Register complete_unit event"""
-        unit_name = ProdSchemaWrapper.get_schema_by_id(unit.schema_id).schema_name
-        labels = {
-            "event_type": "complete_unit",
-            "employee_name": employee.name if employee else "Unknown",
-            "unit_id": unit.internal_id,
-            "unit_type": unit_name,
-        }
-        self.register(name="production_metrics", description=None, labels=labels)
+        assembly_time = unit.total_assembly_time
+        duration = assembly_time.total_seconds() if isinstance(assembly_time, dt.timedelta) else float(assembly_time)
+        assembly_duration.observe({"schema": self._schema_name(unit), "workbench": self._workbench}, duration)
+        self._register_event("complete_unit", employee, unit, duration)
 
     def register_complete_operation(self, employee: Employee | None, unit: Unit) -> None:
         """Register complete_operation event"""
-        unit_name = ProdSchemaWrapper.get_schema_by_id(unit.schema_id).schema_name
-        labels = {
-            "event_type": "complete_operation",
-            "employee_name": employee.name if employee else "Unknown",
-            "unit_id": unit.internal_id,
-            "unit_type": unit_name,
-        }
-        self.register(name="production_metrics", description=None, labels=labels)
+        completed = [stage for stage in unit.operation_stages if stage.completed]
+        duration = _stage_duration(max(completed, key=lambda stage: stage.number)) if completed else None
+        if duration is not None:
+            operation_duration.observe({"schema": self._schema_name(unit), "workbench": self._workbench}, duration)
+        self._register_event("complete_operation", employee, unit, duration)
 
     def register_generate_passport(self, employee: Employee | None, unit: Unit) -> None:
         """Register generate_passport event"""
-        unit_name = ProdSchemaWrapper.get_schema_by_id(unit.schema_id).schema_name
-        labels = {
-            "event_type": "generate_passport",
-            "employee_name": employee.name if employee else "Unknown",
-            "unit_id": unit.internal_id,
-            "unit_type": unit_name,
-        }
-        self.register(name="production_metrics", description=None, labels=labels)
+        self._register_event("generate_passport", employee, unit)
 
 
 metrics = Metrics()
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def timed(step: str) -> Callable[[F], F]:
+    """observe the duration of every call of the decorated function or coroutine function as a workflow step"""
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with metrics.time_step(step):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with metrics.time_step(step):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -1,20 +1,25 @@
+from __future__ import annotations
+
 import os
 import textwrap
 from pathlib import Path
 from statistics import mean
 from string import ascii_letters
+from typing import TYPE_CHECKING
 
-import cups
 from loguru import logger
-from PIL import Image, ImageDraw, ImageFont
-from PIL.ImageFont import FreeTypeFont
 
 from ..config import CONFIG
 from .Messenger import messenger
 from .translation import translation
-from .utils import async_time_execution
+from .metrics import timed
 from ._label_generation import _resize_to_paper_aspect_ratio
 
+# pycups and Pillow are imported when printing, benches with the printer disabled never load them
+if TYPE_CHECKING:
+    from PIL import Image
+    from PIL.ImageFont import FreeTypeFont
+
 
 async def print_image(file_path: Path, annotation: str | None = None) -> None:
     """print the provided image file"""
@@ -27,6 +32,8 @@ async def print_image(file_path: Path, annotation: str | None = None) -> None:
 
     try:
         if annotation:
+            from PIL import Image
+
             image: Image = Image.open(file_path)
             image = _annotate_image(image, annotation)
             image = _resize_to_paper_aspect_ratio(image)
@@ -39,9 +46,10 @@ async def print_image(file_path: Path, annotation: str | None = None) -> None:
     await task
 
 
-@async_time_execution
+@timed("print_image")
 async def _print_image_task(file_path: Path) -> None:
     """print image via cups"""
+    import cups
 
     try:
         cups.setUser("feecc")
@@ -56,6 +64,8 @@ async def _print_image_task(file_path: Path) -> None:
 
 def _annotate_image(image: Image, text: str) -> Image:
     """add an annotation to the bottom of the image"""
+    from PIL import Image, ImageDraw, ImageFont
+
     # wrap the message
     font_path = "src/media/helvetica-cyrillic-bold.ttf"
     assert os.path.exists(font_path), f"Cannot open font at {font_path=}. No such file."
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from types import FrameType
+from typing import Any
+
+from loguru import logger
+
+# leaf frames of threads waiting for work or IO, dropped from the profile unless idle stacks are requested
+IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+EVENT_LOOP_THREAD_NAME = "event-loop"
+TASK_STACK_LIMIT = 5
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _is_idle(frame: FrameType) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_LEAVES
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is being taken"""
+
+
+class SamplingProfiler:
+    """Samples the stacks of all the daemon threads from a background thread, no restart or tracing needed"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def sample(self, seconds: float, interval: float, loop_thread_id: int | None, idle: bool = False) -> Counter[str]:
+        """
+        sample the stacks of every other thread for the given time and count the collapsed stacks.
+        The root frame of every stack is the thread name, the event loop thread is named 'event-loop'.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("Another profile is being taken")
+
+        stacks: Counter[str] = Counter()
+        own_thread_id = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        try:
+            logger.info(f"Sampling profile started for {seconds}s with {interval * 1000:.0f}ms interval")
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread_id or (not idle and _is_idle(frame)):
+                        continue
+                    frames: list[str] = []
+                    current: FrameType | None = frame
+                    while current is not None:
+                        frames.append(_frame_label(current))
+                        current = current.f_back
+                    thread_name = EVENT_LOOP_THREAD_NAME if thread_id == loop_thread_id else names.get(thread_id)
+                    frames.append(thread_name or str(thread_id))
+                    stacks[";".join(reversed(frames))] += 1
+                time.sleep(interval)
+        finally:
+            self._lock.release()
+
+        logger.info(f"Sampling profile finished with {sum(stacks.values())} samples")
+        return stacks
+
+
+def collapsed(stacks: Counter[str]) -> str:
+    """render the stacks in the collapsed format flamegraph.pl, speedscope and inferno read"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+# creation time of the tasks created after the tracking has been installed
+_task_created_at: weakref.WeakKeyDictionary[asyncio.Task[Any], float] = weakref.WeakKeyDictionary()
+
+
+def install_task_age_tracking(loop: asyncio.AbstractEventLoop) -> None:
+    """record the creation time of every new task on the loop, keeping any task factory already set"""
+    previous_factory = loop.get_task_factory()
+
+    def factory(loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> asyncio.Future[Any]:
+        if previous_factory is not None:
+            task = previous_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        if isinstance(task, asyncio.Task):
+            _task_created_at[task] = time.monotonic()
+        return task
+
+    loop.set_task_factory(factory)
+
+
+def describe_tasks() -> list[dict[str, Any]]:
+    """current tasks of the running loop, the oldest first. Tasks created before the tracking have no age."""
+    now = time.monotonic()
+    tasks = []
+    for task in asyncio.all_tasks():
+        created_at = _task_created_at.get(task)
+        coro = task.get_coro()
+        tasks.append(
+            {
+                "name": task.get_name(),
+                "coroutine": getattr(coro, "__qualname__", repr(coro)),
+                "age_seconds": None if created_at is None else round(now - created_at, 3),
+                "stack": [_frame_label(frame) for frame in task.get_stack(limit=TASK_STACK_LIMIT)],
+            }
+        )
+    return sorted(tasks, key=lambda task: -1 if task["age_seconds"] is None else task["age_seconds"], reverse=True)
+
+
+profiler = SamplingProfiler()
@@ -1,64 +1,232 @@
+from __future__ import annotations
+
 import asyncio
+import contextlib
+import datetime as dt
+import time
+from typing import TYPE_CHECKING
 
 from loguru import logger
-from robonomicsinterface import Account, Datalog
+from pymongo.errors import ConnectionFailure
 
 from ..config import CONFIG
+from ..datalog.datalog_queue_wrapper import DatalogQueueWrapper, retry_delay
 from ..unit.unit_wrapper import UnitWrapper
-from .exceptions import RobonomicsError
+from .merkle import build_proofs
 from .Messenger import messenger
-from .utils import async_time_execution
+from .metrics import timed
 from .translation import translation
+from .Types import Document
+
+if TYPE_CHECKING:
+    from ._datalog_client import AsyncDatalogClient
+
+SHUTDOWN_FLUSH_TIMEOUT = 10
+HEALTHCHECK_INTERVAL = 60
+
+
+class _DatalogConnection:
+    """
+    Lazily established, long-lived Robonomics datalog client.
+
+    The account and its substrate connection are only created on the first datalog post.
+    After a period of inactivity the client is health-checked and rebuilt if the check fails.
+    A client that failed to post is dropped, so the next attempt reconnects.
+    """
+
+    def __init__(self) -> None:
+        self._client: AsyncDatalogClient | None = None
+        self._last_used: float = 0
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    @staticmethod
+    def _connect() -> AsyncDatalogClient:
+        # substrate client libraries are heavy to import, so they are only loaded once datalog is used
+        from robonomicsinterface import Account
+
+        from ._datalog_client import AsyncDatalogClient
+
+        logger.info(f"Connecting to Robonomics node {CONFIG.robonomics.substrate_node_uri}")
+        account = Account(
+            seed=CONFIG.robonomics.account_seed,
+            remote_ws=CONFIG.robonomics.substrate_node_uri,
+        )
+        return AsyncDatalogClient(account=account, wait_for_inclusion=False)
+
+    @staticmethod
+    def _is_healthy(client: AsyncDatalogClient) -> bool:
+        try:
+            client.get_index(client.account.get_address())
+            return True
+        except Exception as e:
+            logger.warning(f"Robonomics datalog client health check failed: {e}")
+            return False
+
+    async def get_client(self) -> AsyncDatalogClient:
+        """get a healthy datalog client, connecting if needed"""
+        assert CONFIG.robonomics.enable_datalog, "Robonomics datalog is disabled in config"
+        loop = asyncio.get_running_loop()
+
+        async with self._lock:
+            idle_time = time.monotonic() - self._last_used
+            if self._client is not None and idle_time > HEALTHCHECK_INTERVAL:
+                if not await loop.run_in_executor(None, self._is_healthy, self._client):
+                    self._client = None
+
+            if self._client is None:
+                self._client = await loop.run_in_executor(None, self._connect)
+
+            self._last_used = time.monotonic()
+            return self._client
+
+    def reset(self) -> None:
+        """drop the current client so that the next post reconnects"""
+        self._client = None
+
+
+datalog_connection = _DatalogConnection()
+
+
+@timed("datalog_post")
+async def post_to_datalog(content: str) -> str:
+    """Post the provided content to Robonomics datalog and return the transaction hash"""
+    datalog_client = await datalog_connection.get_client()
+    logger.info(f"Posting data '{content}' to Robonomics datalog")
+
+    try:
+        txn_hash: str = await datalog_client.record(data=content)
+    except Exception:
+        datalog_connection.reset()
+        raise
+
+    assert txn_hash
+    logger.info(f"Data '{content}' has been posted to the Robonomics datalog. {txn_hash=}")
+    return txn_hash
+
+
+class DatalogBatcher:
+    """
+    Anchors passport CIDs to the Robonomics datalog in batches, one Merkle root per batch.
 
+    CIDs are kept in a durable queue in the DB, so nothing is lost on restarts or failed
+    attempts. A background worker posts a batch as soon as it is full or its oldest entry
+    has waited for the whole window. Failed batches are retried with exponential backoff.
+    Every unit of an anchored batch gets the transaction hash and its own inclusion proof saved.
+    """
 
-class AsyncDatalogClient(Datalog):  # type: ignore
-    """Async thread safe Datalog client implementation"""
+    def __init__(self, max_batch_size: int | None = None, window_seconds: float | None = None) -> None:
+        self._batch_size_override = max_batch_size
+        self._window_override = window_seconds
+        self._wakeup = asyncio.Event()
+        self._worker: asyncio.Task[None] | None = None
+
+    @property
+    def _max_batch_size(self) -> int:
+        return self._batch_size_override or CONFIG.robonomics.batch_max_size
+
+    @property
+    def _window(self) -> dt.timedelta:
+        return dt.timedelta(seconds=self._window_override or CONFIG.robonomics.batch_window_seconds)
+
+    def submit(self, cid: str, unit_internal_id: str) -> None:
+        """Schedule the passport CID for anchoring"""
+        DatalogQueueWrapper.enqueue(cid, unit_internal_id)
+        self._wakeup.set()
+
+    def reconcile(self) -> None:
+        """Queue built units which have a passport CID but were never anchored"""
+        try:
+            units = UnitWrapper.get_unanchored_units()
+        except ConnectionFailure as e:
+            logger.warning(f"Datalog queue reconciliation skipped, MongoDB is unreachable: {e}")
+            return
+        for unit in units:
+            DatalogQueueWrapper.enqueue(unit["certificate_ipfs_cid"], unit["internal_id"])
+        if units:
+            logger.warning(f"Reconciliation: {len(units)} unanchored passports found and queued for datalog")
 
-    _client_lock: asyncio.Lock = asyncio.Lock()
+    def start(self) -> None:
+        """Resume anchoring pending CIDs. Run `reconcile` beforehand to queue the missed ones."""
+        self._worker = asyncio.create_task(self._run())
+        logger.info("Datalog anchoring worker started")
 
-    async def record(self, data: str, nonce: int | None = None) -> str:
-        async with self._client_lock:
+    async def _run(self) -> None:
+        failures = 0
+        while True:
             try:
-                loop = asyncio.get_running_loop()
-                result: str = await loop.run_in_executor(None, super().record, data)
-                return result
+                timeout = await self.process_due()
+                failures = 0
             except Exception as e:
-                raise RobonomicsError(str(e)) from e
+                failures += 1
+                timeout = retry_delay(failures).total_seconds()
+                logger.error(f"Datalog anchoring worker iteration failed, retrying in {timeout:.0f}s: {e}")
 
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
 
-ROBONOMICS_ACCOUNT: Account | None = None
+    async def process_due(self, force: bool = False) -> float:
+        """Anchor a batch if it is ready (or forced). Returns seconds until the next check is needed."""
+        due = DatalogQueueWrapper.get_due(limit=self._max_batch_size)
+        if not due:
+            return self._until_next_attempt(self._window)
 
-if CONFIG.robonomics.enable_datalog:
-    ROBONOMICS_ACCOUNT = Account(
-        seed=CONFIG.robonomics.account_seed,
-        remote_ws=CONFIG.robonomics.substrate_node_uri,
-    )
+        batch_age = dt.datetime.now() - due[0]["created_at"]
+        if not force and len(due) < self._max_batch_size and batch_age < self._window:
+            return self._until_next_attempt(self._window - batch_age)
 
+        if await self._anchor(due) and len(due) == self._max_batch_size:
+            return 0
+        return self._until_next_attempt(self._window)
 
-@async_time_execution
-async def post_to_datalog(content: str, unit_internal_id: str) -> None:
-    assert ROBONOMICS_ACCOUNT is not None, "Robonomics credentials have not been provided"
-    datalog_client = AsyncDatalogClient(
-        account=ROBONOMICS_ACCOUNT,
-        wait_for_inclusion=False,
-    )
-    logger.info(f"Posting data '{content}' to Robonomics datalog")
-    retry_cnt = 3
-    txn_hash: str = ""
+    @staticmethod
+    def _until_next_attempt(timeout: dt.timedelta) -> float:
+        """seconds to wait: the timeout or less if a failed entry comes out of its backoff earlier"""
+        next_attempt_at = DatalogQueueWrapper.get_next_attempt_at()
+        if next_attempt_at is not None:
+            timeout = min(timeout, next_attempt_at - dt.datetime.now())
+        return max(timeout.total_seconds(), 0)
+
+    async def _anchor(self, entries: list[Document]) -> bool:
+        """post the Merkle root of the entries to the datalog and save the proofs"""
+        cids = [entry["cid"] for entry in entries]
+        proofs = build_proofs(cids)
+        root = proofs[0].root
 
-    for i in range(1, retry_cnt + 1):
         try:
-            txn_hash = await datalog_client.record(data=content)
-            break
+            txn_hash = await post_to_datalog(root)
         except Exception as e:
-            logger.error(f"Failed to post to the Datalog (attempt {i}/{retry_cnt}): {e}")
-            if i < retry_cnt:
-                continue
+            logger.error(f"Failed to anchor a batch of {len(entries)} passports with root {root}: {e}")
             messenger.error(translation("FailedToWrite"))
-            raise e
+            DatalogQueueWrapper.mark_failed(entries, str(e))
+            return False
 
-    assert txn_hash
-    UnitWrapper.unit_update_single_field(unit_internal_id, "txn_hash", txn_hash)
-    message = f"Data '{content}' has been posted to the Robonomics datalog. {txn_hash=}"
-    messenger.success(translation("DataPublished"))
-    logger.info(message)
+        UnitWrapper.save_datalog_proofs(txn_hash, {e["unit_internal_id"]: p for e, p in zip(entries, proofs)})
+        DatalogQueueWrapper.mark_anchored(cids, txn_hash)
+        messenger.success(translation("DataPublished"))
+        logger.info(f"Batch of {len(entries)} passports anchored to the datalog under root {root}. {txn_hash=}")
+        return True
+
+    async def shutdown(self) -> None:
+        """
+        Stop the worker and anchor a batch which is already due. A partial batch is not posted early:
+        the queue is durable, so its entries stay there till the next start.
+        """
+        if self._worker is None:
+            return
+
+        self._worker.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._worker
+        self._worker = None
+
+        try:
+            await asyncio.wait_for(self.process_due(), timeout=SHUTDOWN_FLUSH_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Due datalog entries were not anchored on shutdown: {e}")
+
+
+# batching settings are read from the config on the first use
+datalog_batcher = DatalogBatcher()
@@ -0,0 +1,43 @@
+import json
+import os
+import pathlib
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from loguru import logger
+
+
+@dataclass
+class Snapshot:
+    """What a workbench needs to resume after a crash or a restart, saved on every state transition"""
+
+    state: str
+    employee: dict[str, Any] | None = None
+    unit_id: str | None = None
+    open_stage: dict[str, Any] | None = None  # number, name and start time of the ongoing production stage
+    saved_at: float = field(default_factory=time.time)
+
+
+def save_snapshot(path: str, snapshot: Snapshot) -> None:
+    """write the snapshot atomically, so that a crash leaves either the previous or the new one on disk"""
+    target = pathlib.Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temporary = target.with_name(f"{target.name}.tmp")
+    with temporary.open("w") as f:
+        json.dump(asdict(snapshot), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, target)
+
+
+def load_snapshot(path: str) -> Snapshot | None:
+    """read the saved snapshot, None if there is none or it cannot be read"""
+    try:
+        with open(path) as f:
+            return Snapshot(**json.load(f))
+    except FileNotFoundError:
+        return None
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"Ignoring the unreadable workbench snapshot {path}: {e}")
+        return None
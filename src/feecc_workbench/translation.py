@@ -1,17 +1,31 @@
 from ..config import CONFIG
 import csv
+import hashlib
+import json
 import os
+from functools import lru_cache
 
 current_file = os.path.realpath(__file__)
 current_directory = os.path.dirname(current_file) + "/message_lang.csv"
 
 
-def translation(key: str):
-    lang = CONFIG.language_message
-
+@lru_cache(maxsize=None)
+def _load_translations(lang: str) -> dict[str, str]:
+    """read all the messages for the language once"""
     with open(f"{current_directory}", "r") as f:
-        result = {}
+        result: dict[str, str] = {}
         red = csv.DictReader(f, delimiter=";")
         for d in red:
-            result.setdefault(d["key"], [d[lang]])
-    return result[key][0]
+            result.setdefault(d["key"], d[lang])
+    return result
+
+
+@lru_cache(maxsize=None)
+def translations_digest(lang: str) -> str:
+    """digest of the messages of the language, it changes along with the translation table"""
+    content = json.dumps(_load_translations(lang), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def translation(key: str) -> str:
+    return _load_translations(CONFIG.language_message)[key]
@@ -1,10 +1,11 @@
+import asyncio
 import datetime as dt
 import os
 import re
+import reprlib
 import socket
 import sys
 from pathlib import Path
-from time import time
 from typing import Any
 
 from loguru import logger
@@ -13,32 +14,27 @@ from yarl import URL
 from ..config import CONFIG
 
 TIMESTAMP_FORMAT = "%d-%m-%Y %H:%M:%S"
+CONNECTIVITY_CHECK_TIMEOUT = 3
 
+_log_repr = reprlib.Repr()
+_log_repr.maxlevel = 3
+_log_repr.maxdict = _log_repr.maxlist = 5
+_log_repr.maxstring = _log_repr.maxother = 100
 
-def time_execution(func: Any) -> Any:
-    """This decorator shows the execution time of the function object passed"""
 
-    def wrap_func(*args: Any, **kwargs: Any) -> Any:
-        t1 = time()
-        result = func(*args, **kwargs)
-        t2 = time()
-        logger.debug(f"Function {func.__name__!r} executed in {(t2 - t1):.4f}s")
-        return result
+class LogValue:
+    """
+    A log message argument rendering a potentially large value (e.g. a unit biography) as a bounded repr.
+    Rendering happens only if some sink accepts the record: `logger.debug("set to {}", LogValue(value))`
+    """
 
-    return wrap_func
+    __slots__ = ("value",)
 
+    def __init__(self, value: Any) -> None:
+        self.value = value
 
-def async_time_execution(func: Any) -> Any:
-    """This decorator shows the execution time of the function object passed"""
-
-    async def wrap_func(*args: Any, **kwargs: Any) -> Any:
-        t1 = time()
-        result = await func(*args, **kwargs)
-        t2 = time()
-        logger.debug(f"Function {func.__name__!r} executed in {(t2 - t1):.4f}s")
-        return result
-
-    return wrap_func
+    def __format__(self, format_spec: str) -> str:
+        return _log_repr.repr(self.value)
 
 
 def get_headers(rfid_card_id: str) -> dict[str, str]:
@@ -71,26 +67,39 @@ def service_is_up(service_endpoint: str | URL) -> bool:  # noqa: CAC001
     return result == 0
 
 
-def check_service_connectivity() -> None:  # noqa: CAC001,CCR001
-    """check if all requsted external services are reachable"""
+async def async_service_is_up(service_endpoint: str | URL, timeout: float = CONNECTIVITY_CHECK_TIMEOUT) -> bool:
+    """Check if the provided host is reachable without blocking the event loop"""
+    if isinstance(service_endpoint, str):
+        service_endpoint = URL(service_endpoint)
+
+    try:
+        connection = asyncio.open_connection(service_endpoint.host, service_endpoint.port)
+        _, writer = await asyncio.wait_for(connection, timeout)
+    except Exception as e:
+        logger.debug(f"An error occured during socket connection attempt: {e}")
+        return False
+
+    writer.close()
+    return True
+
+
+async def check_service_connectivity() -> None:
+    """check if all requsted external services are reachable. The checks run concurrently."""
     services = ((CONFIG.ipfs_gateway.enable, CONFIG.ipfs_gateway.ipfs_server_uri),)
-    failed_cnt, checked_cnt = 0, 0
+    endpoints = [service_endpoint for enabled, service_endpoint in services if enabled]
 
-    for _, service_endpoint in filter(lambda s: s[0], services):
+    for service_endpoint in endpoints:
         logger.info(f"Checking connection for service endpoint {service_endpoint}")
-        checked_cnt += 1
 
-        try:
-            result = service_is_up(service_endpoint)
-        except Exception as e:
-            logger.debug(f"An error occured during socket connection attempt: {e}")
-            result = False
+    results = await asyncio.gather(*(async_service_is_up(endpoint) for endpoint in endpoints))
 
+    for service_endpoint, result in zip(endpoints, results):
         if result:
             logger.info(f"{service_endpoint} connection tested positive")
         else:
             logger.error(f"{service_endpoint} connection has been refused.")
-            failed_cnt += 1
+
+    failed_cnt, checked_cnt = results.count(False), len(results)
 
     if failed_cnt:
         logger.critical(f"{failed_cnt}/{checked_cnt} connectivity checks have failed. Exiting.")
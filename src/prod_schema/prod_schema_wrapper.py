@@ -1,6 +1,5 @@
 import pydantic
 
-from src.feecc_workbench.utils import time_execution
 from src.database.database import BaseMongoDbWrapper
 from src.database.models import ProductionSchema
 
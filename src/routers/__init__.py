@@ -1,3 +1,4 @@
+from .admin_router import router as admin_router
 from .employee_router import router as employee_router
 from .unit_router import router as unit_router
 from .workbench_router import router as workbench_router
\ No newline at end of file
@@ -0,0 +1,45 @@
+import asyncio
+import datetime as dt
+import threading
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from src.config import CONFIG
+from src.database import models as mdl
+from src.dependencies import require_admin_token
+from src.feecc_workbench.profiler import ProfilerBusyError, collapsed, describe_tasks, profiler
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin_token)],
+)
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(10.0, ge=1),
+    idle: bool = False,
+) -> PlainTextResponse:
+    """take a sampling profile of all the daemon threads and return it as collapsed stacks for a flamegraph"""
+    if seconds > CONFIG.admin.profile_max_seconds:
+        message = f"Profile duration is limited to {CONFIG.admin.profile_max_seconds}s"
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=message)
+
+    loop_thread_id = threading.get_ident()
+    try:
+        stacks = await asyncio.to_thread(profiler.sample, seconds, interval_ms / 1000, loop_thread_id, idle)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
+
+    filename = f"workbench-profile-{dt.datetime.now():%Y%m%d-%H%M%S}.collapsed"
+    return PlainTextResponse(collapsed(stacks), headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@router.get("/tasks")
+async def get_tasks() -> mdl.AsyncioTasksOut:
+    """dump the asyncio tasks currently alive along with their ages and stacks"""
+    tasks = [mdl.AsyncioTaskInfo(**task) for task in describe_tasks()]
+    return mdl.AsyncioTasksOut(status_code=status.HTTP_200_OK, detail=f"{len(tasks)} tasks", tasks=tasks)
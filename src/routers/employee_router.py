@@ -3,14 +3,16 @@ from loguru import logger
 from starlette import status
 
 from src.config import CONFIG
-from src.dependencies import get_employee_by_card_id, get_employee_by_username, identify_sender
+from src.dependencies import get_employee_by_card_id, get_employee_by_username, get_workbench, identify_sender
 from src.database import models as mdl
 from src.employee.Employee import Employee
 from src.employee.employee_wrapper import EmployeeWrapper
+from src.feecc_workbench.hid_debouncer import hid_debouncer
+from src.feecc_workbench.hid_recorder import hid_recorder
 from src.feecc_workbench.Messenger import messenger
 from src.feecc_workbench.translation import translation
-from src.feecc_workbench.exceptions import StateForbiddenError, EmployeeNotFoundError
-from src.feecc_workbench.WorkBench import Workbench as WORKBENCH
+from src.feecc_workbench.exceptions import StateConflictError, StateForbiddenError, EmployeeNotFoundError
+from src.feecc_workbench.WorkBench import _WorkBench
 
 
 router = APIRouter(
@@ -30,9 +32,12 @@ def get_employee_data(
 
 
 @router.post("/login-creds", response_model=mdl.EmployeeOut)
-def log_in_creds(employee: mdl.EmployeeWCardModel = Depends(get_employee_by_username)) -> mdl.EmployeeOut:
+def log_in_creds(
+    employee: mdl.EmployeeWCardModel = Depends(get_employee_by_username),  # noqa: B008
+    workbench: _WorkBench = Depends(get_workbench),  # noqa: B008
+) -> mdl.EmployeeOut:
     try:
-        WORKBENCH.log_in(
+        workbench.log_in(
             Employee(
                 rfid_card_id=employee.rfid_card_id,
                 name=employee.name,
@@ -44,6 +49,8 @@ def log_in_creds(employee: mdl.EmployeeWCardModel = Depends(get_employee_by_user
             status_code=status.HTTP_200_OK, detail="Employee logged in successfully", employee_data=employee
         )
 
+    except StateConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     except StateForbiddenError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e)) from e
 
@@ -51,10 +58,11 @@ def log_in_creds(employee: mdl.EmployeeWCardModel = Depends(get_employee_by_user
 @router.post("/log-in", response_model=mdl.EmployeeOut)
 def log_in_employee(
     employee: mdl.EmployeeWCardModel = Depends(get_employee_by_card_id),  # noqa: B008
+    workbench: _WorkBench = Depends(get_workbench),  # noqa: B008
 ) -> mdl.EmployeeOut:
     """handle logging in the Employee at a given Workbench"""
     try:
-        WORKBENCH.log_in(
+        workbench.log_in(
             Employee(
                 rfid_card_id=employee.rfid_card_id,
                 name=employee.name,
@@ -66,12 +74,19 @@ def log_in_employee(
             status_code=status.HTTP_200_OK, detail="Employee logged in successfully", employee_data=employee
         )
 
+    except StateConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     except StateForbiddenError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e)) from e
 
 
 @router.post("/handle-rfid-event", response_model=mdl.GenericResponse)
-async def handle_rfid_event(event: mdl.HidEvent) -> mdl.GenericResponse:
+async def handle_rfid_event(
+    event: mdl.HidEvent, workbench: _WorkBench = Depends(get_workbench)  # noqa: B008
+) -> mdl.GenericResponse:
+    hid_recorder.record(event)
+    if hid_debouncer.is_duplicate(event, workbench.number):
+        return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail="Duplicate event suppressed")
     try:
         if event.name != "rfid_reader":
             raise KeyError(f"Unknown sender: {event.name}")
@@ -81,8 +96,8 @@ async def handle_rfid_event(event: mdl.HidEvent) -> mdl.GenericResponse:
         if not CONFIG.workbench.login:
             return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail="Hid event has been handled as expected")
 
-        if WORKBENCH.employee is not None:
-            WORKBENCH.log_out()
+        if workbench.employee is not None:
+            workbench.log_out()
             return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail="Hid event has been handled as expected")
 
         try:
@@ -91,23 +106,27 @@ async def handle_rfid_event(event: mdl.HidEvent) -> mdl.GenericResponse:
             messenger.warning(translation("NoEmployee"))
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e)) from e
 
-        WORKBENCH.log_in(employee)
+        workbench.log_in(employee)
         return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail="Hid event has been handled as expected")
 
+    except StateConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     except Exception as e:
         logger.error(e)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e)) from e
 
 
 @router.post("/log-out", response_model=mdl.GenericResponse)
-def log_out_employee() -> mdl.GenericResponse:
+def log_out_employee(workbench: _WorkBench = Depends(get_workbench)) -> mdl.GenericResponse:  # noqa: B008
     """handle logging out the Employee at a given Workbench"""
     try:
-        WORKBENCH.log_out()
-        if WORKBENCH.employee is not None:
+        workbench.log_out()
+        if workbench.employee is not None:
             raise ValueError("Unable to logout employee")
         return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail="Employee logged out successfully")
 
+    except StateConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     except Exception as e:
         message: str = f"An error occurred while logging out the Employee: {e}"
         logger.error(message)
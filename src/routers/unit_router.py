@@ -2,12 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from loguru import logger
 from starlette import status
 
-from src.dependencies import get_revision_pending_units, get_schema_by_id, get_unit_by_internal_id
+from src.dependencies import get_revision_pending_units, get_schema_by_id, get_unit_by_internal_id, get_workbench
 from src.database import models as mdl
-from src.feecc_workbench.exceptions import StateForbiddenError
+from src.feecc_workbench.exceptions import StateConflictError, StateForbiddenError
 from src.feecc_workbench.states import State
 from src.unit.unit_utils import Unit
-from src.feecc_workbench.WorkBench import Workbench as WORKBENCH
+from src.feecc_workbench.WorkBench import _WorkBench
 
 router = APIRouter(
     prefix="/unit",
@@ -16,12 +16,15 @@ router = APIRouter(
 
 
 @router.post("/new/{schema_id}", response_model=mdl.UnitOut)
-async def create_unit(schema: mdl.ProductionSchema = Depends(get_schema_by_id)) -> mdl.UnitOut:  # noqa: B008
+async def create_unit(
+    schema: mdl.ProductionSchema = Depends(get_schema_by_id),  # noqa: B008
+    workbench: _WorkBench = Depends(get_workbench),  # noqa: B008
+) -> mdl.UnitOut:
     """handle new Unit creation"""
     try:
-        if not schema.is_allowed(WORKBENCH.employee.position):
+        if not schema.is_allowed(workbench.employee.position):
             raise ValueError("schema is not allowed")
-        unit: Unit = await WORKBENCH.create_new_unit(schema)
+        unit: Unit = await workbench.create_new_unit(schema)
         logger.info(f"Initialized new unit with internal ID {unit.internal_id}")
         return mdl.UnitOut(
             status_code=status.HTTP_200_OK,
@@ -76,15 +79,15 @@ def get_revision_pending(
 
 
 @router.post("/upload", response_model=mdl.GenericResponse)
-async def unit_upload_record() -> mdl.GenericResponse:
+async def unit_upload_record(workbench: _WorkBench = Depends(get_workbench)) -> mdl.GenericResponse:  # noqa: B008
     """handle Unit lifecycle end"""
     try:
-        if WORKBENCH.employee is None:
+        if workbench.employee is None:
             raise StateForbiddenError("Employee is not authorized on the workbench")
 
-        await WORKBENCH.upload_unit_passport()
+        await workbench.upload_unit_passport()
         return mdl.GenericResponse(
-            status_code=status.HTTP_200_OK, detail=f"Uploaded data for unit {WORKBENCH.unit.internal_id}"
+            status_code=status.HTTP_200_OK, detail=f"Uploaded data for unit {workbench.unit.internal_id}"
         )
 
     except Exception as e:
@@ -94,18 +97,22 @@ async def unit_upload_record() -> mdl.GenericResponse:
 
 
 @router.post("/assign-component/{unit_internal_id}", response_model=mdl.GenericResponse)
-async def assign_component(unit: Unit = Depends(get_unit_by_internal_id)) -> mdl.GenericResponse:  # noqa: B008
+async def assign_component(
+    unit: Unit = Depends(get_unit_by_internal_id), workbench: _WorkBench = Depends(get_workbench)  # noqa: B008
+) -> mdl.GenericResponse:
     """assign a unit as a component to the composite unit"""
-    if WORKBENCH.state != State.GATHER_COMPONENTS_STATE:
+    if workbench.state != State.GATHER_COMPONENTS_STATE:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Component assignment can only be done while the workbench is in state 'GatherComponents'",
         )
 
     try:
-        await WORKBENCH.assign_component_to_unit(unit)
+        workbench.assign_component_to_unit(unit)
         return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail="Component has been assigned")
 
+    except StateConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     except Exception as e:
         message: str = f"An error occurred during component assignment: {e}"
         logger.error(message)
@@ -6,18 +6,19 @@ from fastapi.responses import JSONResponse
 from loguru import logger
 from sse_starlette.sse import EventSourceResponse
 
-from src.dependencies import get_schema_by_id, get_unit_by_internal_id, identify_sender
+from src.dependencies import get_schema_by_id, get_unit_by_internal_id, get_workbench, identify_sender
 from src.database import models as mdl
 from src.prod_schema.prod_schema_wrapper import ProdSchemaWrapper
 from src.employee.employee_wrapper import EmployeeWrapper
 from src.employee.Employee import Employee
-from src.feecc_workbench.exceptions import EmployeeNotFoundError, ManualInputNeeded
+from src.feecc_workbench.exceptions import EmployeeNotFoundError, ManualInputNeeded, StateConflictError
+from src.feecc_workbench.hid_debouncer import hid_debouncer
+from src.feecc_workbench.hid_recorder import hid_recorder
 from src.feecc_workbench.Messenger import messenger
 from src.feecc_workbench.states import State
 from src.feecc_workbench.translation import translation
 from src.unit.unit_utils import Unit
-from src.feecc_workbench.WorkBench import STATE_SWITCH_EVENT
-from src.feecc_workbench.WorkBench import Workbench as WORKBENCH
+from src.feecc_workbench.WorkBench import _WorkBench
 from src.config import CONFIG
 
 router = APIRouter(
@@ -26,13 +27,13 @@ router = APIRouter(
 )
 
 
-def get_workbench_status_data() -> mdl.WorkbenchOut:
-    unit = WORKBENCH.unit
+def get_workbench_status_data(workbench: _WorkBench) -> mdl.WorkbenchOut:
+    unit = workbench.unit
     return mdl.WorkbenchOut(
-        state=WORKBENCH.state.value,
-        employee_logged_in=bool(WORKBENCH.employee),
-        employee=WORKBENCH.employee.data if WORKBENCH.employee else None,
-        operation_ongoing=WORKBENCH.state.value == State.PRODUCTION_STAGE_ONGOING_STATE.value,
+        state=workbench.state.value,
+        employee_logged_in=bool(workbench.employee),
+        employee=workbench.employee.data if workbench.employee else None,
+        operation_ongoing=workbench.state.value == State.PRODUCTION_STAGE_ONGOING_STATE.value,
         unit_internal_id=unit.internal_id if unit else None,
         unit_status=unit.status if unit else None,
         unit_biography=[stage.name for stage in unit.operation_stages] if unit else None,
@@ -41,44 +42,48 @@ def get_workbench_status_data() -> mdl.WorkbenchOut:
 
 
 @router.get("/status", response_model=mdl.WorkbenchOut, deprecated=True)
-def get_workbench_status() -> mdl.WorkbenchOut:
+def get_workbench_status(workbench: _WorkBench = Depends(get_workbench)) -> mdl.WorkbenchOut:  # noqa: B008
     """
     handle providing status of the given Workbench
 
     DEPRECATED: Use SSE instead
     """
-    return get_workbench_status_data()
+    return get_workbench_status_data(workbench)
 
 
-async def state_update_generator(event: asyncio.Event) -> AsyncGenerator[str, None]:
+async def state_update_generator(workbench: _WorkBench) -> AsyncGenerator[str, None]:
     """State update event generator for SSE streaming"""
     logger.info("SSE connection to state streaming endpoint established.")
 
     try:
         while True:
-            yield get_workbench_status_data().model_dump_json()
+            yield get_workbench_status_data(workbench).model_dump_json()
             logger.debug("State notification sent to the SSE client")
-            event.clear()
-            await event.wait()
+            workbench.state_switch_event.clear()
+            await workbench.state_switch_event.wait()
 
     except asyncio.CancelledError as e:
         logger.info(f"SSE connection to state streaming endpoint closed. {e}")
 
 
 @router.get("/status/stream")
-async def stream_workbench_status() -> EventSourceResponse:
+async def stream_workbench_status(workbench: _WorkBench = Depends(get_workbench)) -> EventSourceResponse:  # noqa: B008
     """Send updates on the workbench state into an SSE stream"""
-    status_stream = state_update_generator(STATE_SWITCH_EVENT)
+    status_stream = state_update_generator(workbench)
     return EventSourceResponse(status_stream)
 
 
 @router.post("/assign-unit/{unit_internal_id}", response_model=mdl.GenericResponse)
-def assign_unit(unit: Unit = Depends(get_unit_by_internal_id)) -> mdl.GenericResponse:  # noqa: B008
+def assign_unit(
+    unit: Unit = Depends(get_unit_by_internal_id), workbench: _WorkBench = Depends(get_workbench)  # noqa: B008
+) -> mdl.GenericResponse:
     """assign the provided unit to the workbench"""
     try:
-        WORKBENCH.assign_unit(unit)
+        workbench.assign_unit(unit)
         return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail=f"Unit {unit.internal_id} has been assigned")
 
+    except StateConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     except Exception as e:
         message: str = f"An error occurred during unit assignment: {e}"
         logger.error(message)
@@ -86,12 +91,14 @@ def assign_unit(unit: Unit = Depends(get_unit_by_internal_id)) -> mdl.GenericRes
 
 
 @router.post("/remove-unit", response_model=mdl.GenericResponse)
-def remove_unit() -> mdl.GenericResponse:
+def remove_unit(workbench: _WorkBench = Depends(get_workbench)) -> mdl.GenericResponse:  # noqa: B008
     """remove the unit from the workbench"""
     try:
-        WORKBENCH.remove_unit()
+        workbench.remove_unit()
         return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail="Unit has been removed")
 
+    except StateConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     except Exception as e:
         message: str = f"An error occurred during unit removal: {e}"
         logger.error(message)
@@ -100,15 +107,19 @@ def remove_unit() -> mdl.GenericResponse:
 
 @router.post("/start-operation")
 async def start_operation(
-    workbench_details: mdl.WorkbenchExtraDetails, manual_input: mdl.ManualInput | None = None
+    workbench_details: mdl.WorkbenchExtraDetails,
+    manual_input: mdl.ManualInput | None = None,
+    workbench: _WorkBench = Depends(get_workbench),  # noqa: B008
 ) -> mdl.GenericResponse:
     """handle start recording operation on a Unit"""
     try:
-        await WORKBENCH.start_operation(workbench_details.additional_info, manual_input)
-        unit = WORKBENCH.unit
+        await workbench.start_operation(workbench_details.additional_info, manual_input)
+        unit = workbench.unit
         message: str = f"Started operation '{unit.next_pending_operation.name}' on Unit {unit.internal_id}"
         logger.info(message)
         return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail=message)
+    except StateConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     except ManualInputNeeded as e:
         return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT, content=e.args)
     except Exception as e:
@@ -118,15 +129,19 @@ async def start_operation(
 
 
 @router.post("/end-operation", response_model=mdl.GenericResponse)
-async def end_operation(workbench_data: mdl.OperationStageData) -> mdl.GenericResponse:
+async def end_operation(
+    workbench_data: mdl.OperationStageData, workbench: _WorkBench = Depends(get_workbench)  # noqa: B008
+) -> mdl.GenericResponse:
     """handle end recording operation on a Unit"""
     try:
-        await WORKBENCH.end_operation(workbench_data.stage_data, workbench_data.premature_ending)
-        unit = WORKBENCH.unit
+        await workbench.end_operation(workbench_data.stage_data, workbench_data.premature_ending)
+        unit = workbench.unit
         message: str = f"Ended current operation on unit {unit.internal_id}"
         logger.info(message)
         return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail=message)
 
+    except StateConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     except Exception as e:
         message = f"Couldn't handle end record request. An error occurred: {e}"
         logger.error(message)
@@ -134,10 +149,10 @@ async def end_operation(workbench_data: mdl.OperationStageData) -> mdl.GenericRe
 
 
 @router.get("/production-schemas/names", response_model=mdl.SchemasList)
-def get_schemas() -> mdl.SchemasList:
+def get_schemas(workbench: _WorkBench = Depends(get_workbench)) -> mdl.SchemasList:  # noqa: B008
     """get all available schemas"""
     all_schemas = {
-        schema.schema_id: schema for schema in ProdSchemaWrapper.get_all_schemas(WORKBENCH.employee.position)
+        schema.schema_id: schema for schema in ProdSchemaWrapper.get_all_schemas(workbench.employee.position)
     }
     handled_schemas = set()
 
@@ -182,37 +197,44 @@ async def get_schema(
 
 
 @router.post("/handle-barcode-event", response_model=mdl.GenericResponse)
-async def handle_barcode_event(event: mdl.HidEvent) -> mdl.GenericResponse:
+async def handle_barcode_event(
+    event: mdl.HidEvent, workbench: _WorkBench = Depends(get_workbench)  # noqa: B008
+) -> mdl.GenericResponse:
     """Handle HID event produced by the barcode reader"""
+    hid_recorder.record(event)
+    if hid_debouncer.is_duplicate(event, workbench.number):
+        return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail="Duplicate event suppressed")
     try:
         if event.name != "barcode_reader":
             raise KeyError(f"Unknown sender: {event.name}")
 
         logger.debug(f"Handling BARCODE event. String: {event.string}")
 
-        if WORKBENCH.state == State.PRODUCTION_STAGE_ONGOING_STATE:
-            await WORKBENCH.end_operation()
+        if workbench.state == State.PRODUCTION_STAGE_ONGOING_STATE:
+            await workbench.end_operation()
             return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail="Hid event has been handled as expected")
 
         unit = get_unit_by_internal_id(event.string)
 
-        match WORKBENCH.state:
+        match workbench.state:
             case State.AUTHORIZED_IDLING_STATE:
-                WORKBENCH.assign_unit(unit)
+                workbench.assign_unit(unit)
             case State.UNIT_ASSIGNED_IDLING_STATE:
-                if WORKBENCH.unit is not None and WORKBENCH.unit.unit_id == unit.uuid:
+                if workbench.unit is not None and workbench.unit.unit_id == unit.uuid:
                     messenger.info(translation("UnitOnWorkbench"))
                     return mdl.GenericResponse(
                         status_code=status.HTTP_200_OK, detail="Hid event has been handled as expected"
                     )
-                WORKBENCH.remove_unit()
-                WORKBENCH.assign_unit(unit)
+                workbench.remove_unit()
+                workbench.assign_unit(unit)
             case State.GATHER_COMPONENTS_STATE:
-                await WORKBENCH.assign_component_to_unit(unit)
+                workbench.assign_component_to_unit(unit)
             case _:
                 logger.error(f"Received input {event.string}. Ignoring event since no one is authorized.")
         return mdl.GenericResponse(status_code=status.HTTP_200_OK, detail="Hid event has been handled as expected")
 
+    except StateConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
     except Exception as e:
         logger.error(e)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e)) from e
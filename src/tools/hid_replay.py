@@ -0,0 +1,171 @@
+"""
+HID event replay and burst generator.
+
+Events received by the daemon are recorded to a JSON lines file when WORKBENCH__HID_EVENTS_RECORD_PATH
+is set. `replay` sends a recorded file to a running daemon preserving the original intervals
+between the events, scaled by --speed (2 replays twice as fast, 0 sends everything at once).
+Events are sent at their due time without waiting for the previous response, like the scanners
+do, unless --sequential is given. Latency of every event, the send lag behind the schedule
+and the rejected events (state machine violations and other errors) are reported. Exits with
+a non-zero code if any event was rejected. With --workbench the events are sent to one of the
+workbenches hosted by a multi-workbench daemon.
+
+`burst` writes a synthetic event file, e.g. an operator scanning a composite unit followed
+by its twenty components 150 ms apart:
+
+    python -m src.tools.hid_replay burst burst.jsonl --barcodes <composite> <component> ... --interval-ms 150
+    python -m src.tools.hid_replay replay burst.jsonl --url http://127.0.0.1:5000
+
+Usage: python -m src.tools.hid_replay {replay,burst} ...
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+import httpx
+
+from src.database.models import HidEvent
+from src.feecc_workbench.hid_recorder import load_events
+
+ENDPOINTS = {
+    "barcode_reader": "/workbench/handle-barcode-event",
+    "rfid_reader": "/employee/handle-rfid-event",
+}
+REQUEST_TIMEOUT = 30
+
+
+@dataclass
+class ReplayResult:
+    event: HidEvent
+    due: float  # seconds since the replay start the event was scheduled for
+    lag: float  # how late the event was sent
+    latency: float
+    status_code: int
+    detail: str
+
+    @property
+    def rejected(self) -> bool:
+        return self.status_code != 200
+
+
+def schedule(events: list[HidEvent], speed: float) -> list[float]:
+    """get the send offsets of the events relative to the first one, scaled by the speed"""
+    if not events:
+        return []
+    if speed <= 0:
+        return [0.0] * len(events)
+    first = events[0].timestamp
+    return [(event.timestamp - first) / speed for event in events]
+
+
+async def _send(
+    client: httpx.AsyncClient, event: HidEvent, due: float, started: float, prefix: str
+) -> ReplayResult:
+    await asyncio.sleep(max(0.0, started + due - time.perf_counter()))
+    sent_at = time.perf_counter()
+    payload = event.model_dump(mode="json")
+    payload.pop("timestamp")  # the daemon receives the events live, so they get a fresh timestamp
+    try:
+        response = await client.post(prefix + ENDPOINTS[event.name], json=payload)
+        status_code, detail = response.status_code, response.text
+        if response.headers.get("content-type") == "application/json":
+            detail = str(response.json().get("detail", ""))
+    except httpx.HTTPError as e:
+        status_code, detail = 0, f"{type(e).__name__}: {e}"
+    return ReplayResult(event, due, sent_at - started - due, time.perf_counter() - sent_at, status_code, detail)
+
+
+async def replay(
+    url: str, events: list[HidEvent], speed: float, sequential: bool, workbench: int | None = None
+) -> list[ReplayResult]:
+    unknown = {event.name for event in events} - ENDPOINTS.keys()
+    if unknown:
+        raise ValueError(f"Events from unknown devices: {', '.join(sorted(unknown))}")
+
+    offsets = schedule(events, speed)
+    prefix = f"/benches/{workbench}" if workbench is not None else ""
+    async with httpx.AsyncClient(base_url=url, timeout=REQUEST_TIMEOUT) as client:
+        started = time.perf_counter()
+        sends = (_send(client, event, due, started, prefix) for event, due in zip(events, offsets))
+        if sequential:
+            return [await send for send in sends]
+        return list(await asyncio.gather(*sends))
+
+
+def burst(barcodes: list[str], interval_ms: float, card: str | None) -> list[HidEvent]:
+    """generate barcode scans the given interval apart, optionally preceded by an RFID card tap"""
+    now = time.time()
+    events = [HidEvent(string=card, name="rfid_reader", timestamp=now)] if card else []
+    start = now + (interval_ms / 1000 if card else 0)
+    events += [
+        HidEvent(string=barcode, name="barcode_reader", timestamp=start + i * interval_ms / 1000)
+        for i, barcode in enumerate(barcodes)
+    ]
+    return events
+
+
+def report(results: list[ReplayResult], verbose: bool) -> None:
+    if verbose:
+        print(f"{'due':>9} {'lag':>8} {'latency':>9} {'status':>6}  event")
+        for r in results:
+            print(
+                f"{r.due * 1000:>7.0f}ms {r.lag * 1000:>6.1f}ms {r.latency * 1000:>7.1f}ms {r.status_code:>6}"
+                f"  {r.event.name} {r.event.string}" + (f": {r.detail}" if r.rejected else "")
+            )
+
+    for name in sorted({r.event.name for r in results}):
+        latencies = sorted(r.latency for r in results if r.event.name == name)
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(
+            f"{name}: {len(latencies)} events, latency p50 {statistics.median(latencies) * 1000:.1f}ms, "
+            f"p99 {p99 * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms"
+        )
+    print(f"max send lag behind the schedule: {max(r.lag for r in results) * 1000:.1f}ms")
+
+    rejections = Counter(f"{r.status_code} {r.detail}" for r in results if r.rejected)
+    print(f"{sum(rejections.values())}/{len(results)} events rejected")
+    for reason, count in rejections.most_common():
+        print(f"  {count:>4} x {reason}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay_parser = commands.add_parser("replay", help="replay recorded events against a running daemon")
+    replay_parser.add_argument("file", help="recorded events file")
+    replay_parser.add_argument("--url", default="http://127.0.0.1:5000", help="daemon base URL")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor, 0 sends all at once")
+    replay_parser.add_argument("--workbench", type=int, help="number of the hosted workbench to send the events to")
+    replay_parser.add_argument("--sequential", action="store_true", help="wait for every response before the next")
+    replay_parser.add_argument("--verbose", action="store_true", help="print every event")
+
+    burst_parser = commands.add_parser("burst", help="generate a burst of barcode scans")
+    burst_parser.add_argument("file", help="output events file")
+    burst_parser.add_argument("--barcodes", nargs="+", required=True, help="scanned barcodes in order")
+    burst_parser.add_argument("--interval-ms", type=float, default=150, help="interval between the scans")
+    burst_parser.add_argument("--card", help="RFID card tapped before the scans")
+
+    args = parser.parse_args()
+
+    if args.command == "burst":
+        with open(args.file, "w") as f:
+            f.writelines(event.model_dump_json() + "\n" for event in burst(args.barcodes, args.interval_ms, args.card))
+        return
+
+    events = load_events(args.file)
+    if not events:
+        sys.exit(f"No events in {args.file}")
+
+    results = asyncio.run(replay(args.url, events, args.speed, args.sequential, args.workbench))
+    report(results, args.verbose)
+    if any(r.rejected for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+MongoDB index advisor.
+
+Runs explain() on every hot query the daemon issues and flags the ones which are served
+by a collection scan or need an in-memory sort. Sample query values are taken from the
+existing documents, so run it against a populated database.
+
+Usage: python -m src.tools.index_advisor
+"""
+import datetime as dt
+import sys
+from dataclasses import dataclass, field
+from typing import Any
+
+from loguru import logger
+
+from src.database.database import BaseMongoDbWrapper
+from src.feecc_workbench.Types import Document
+
+# placeholder substituted with a sample value of the field taken from the existing documents
+SAMPLE = "<sample>"
+# plan stages which mean the query is not (fully) served by an index
+BAD_STAGES = {"COLLSCAN": "collection scan", "SORT": "in-memory sort"}
+
+
+@dataclass
+class HotQuery:
+    """A query issued on the request path"""
+
+    description: str
+    collection: str
+    sample_field: str | None
+    filters: dict[str, Any]
+    options: dict[str, Any] = field(default_factory=dict)
+
+
+POINT: dict[str, Any] = {"limit": 1}  # the way find_one queries are issued
+
+HOT_QUERIES: list[HotQuery] = [
+    HotQuery("unit by uuid", "unitData", "uuid", {"uuid": SAMPLE}, POINT),
+    HotQuery("unit by internal id", "unitData", "internal_id", {"internal_id": SAMPLE}, POINT),
+    HotQuery("units by uuids", "unitData", "uuid", {"uuid": {"$in": [SAMPLE]}}),
+    HotQuery("units by status", "unitData", None, {"status": "revision"}),
+    HotQuery(
+        "unanchored units",
+        "unitData",
+        None,
+        {"status": "built", "certificate_ipfs_cid": {"$ne": None}, "txn_hash": None},
+    ),
+    HotQuery("employee by card", "employeeData", "rfid_card_id", {"rfid_card_id": SAMPLE}, POINT),
+    HotQuery("employee by username", "employeeData", "username", {"username": SAMPLE}, POINT),
+    HotQuery("schema by id", "productionSchemas", "schema_id", {"schema_id": SAMPLE}, POINT),
+    HotQuery("datalog queue entry by cid", "datalogQueue", "cid", {"cid": SAMPLE}),
+    HotQuery(
+        "due datalog queue entries",
+        "datalogQueue",
+        None,
+        {"status": "pending", "next_attempt_at": {"$lte": dt.datetime.now()}},
+        {"sort": [("created_at", 1)], "limit": 50},
+    ),
+]
+
+
+def _fill_sample(filters: Any, value: Any) -> Any:
+    """substitute the placeholders in the filter with the sample value"""
+    if isinstance(filters, dict):
+        return {k: _fill_sample(v, value) for k, v in filters.items()}
+    if isinstance(filters, list):
+        return [_fill_sample(v, value) for v in filters]
+    return value if filters == SAMPLE else filters
+
+
+def _plan_stages(plan: Document) -> list[str]:
+    """list all the stages of the query plan tree"""
+    stages = [plan["stage"]]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def analyze(query: HotQuery) -> list[str]:
+    """explain the query and return a list of detected problems"""
+    value: Any = "sample"
+    if query.sample_field is not None:
+        sample = BaseMongoDbWrapper.find_one(query.collection, {query.sample_field: {"$exists": True}})
+        if sample is not None:
+            value = sample[query.sample_field]
+
+    explanation = BaseMongoDbWrapper.explain(query.collection, _fill_sample(query.filters, value), **query.options)
+    stages = _plan_stages(explanation["queryPlanner"]["winningPlan"])
+    return [BAD_STAGES[stage] for stage in stages if stage in BAD_STAGES]
+
+
+def main() -> None:
+    problems_cnt = 0
+
+    for query in HOT_QUERIES:
+        problems = analyze(query)
+        if problems:
+            problems_cnt += 1
+            logger.warning(f"[{query.collection}] {query.description}: {', '.join(problems)}")
+        else:
+            logger.info(f"[{query.collection}] {query.description}: served by an index")
+
+    if problems_cnt:
+        logger.error(f"{problems_cnt}/{len(HOT_QUERIES)} hot queries are not served by indexes")
+        sys.exit(1)
+
+    logger.info(f"All {len(HOT_QUERIES)} hot queries are served by indexes")
+
+
+if __name__ == "__main__":
+    main()
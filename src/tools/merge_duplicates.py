@@ -0,0 +1,149 @@
+"""
+Duplicate document merger.
+
+Finds documents sharing a value of a uniquely indexed field (unit uuid and internal id, employee
+RFID card id, production schema id) and merges every group of copies of the same document into
+one. Fields of the newer copies take precedence, which matches what the daemon used to read before
+the uniqueness was enforced. Merged away copies are backed up into the `<collection>Duplicates`
+collection.
+
+Units are only copies of each other if they share the uuid. Internal ids are derived from a part
+of the uuid, so distinct units may get the same one: the newer of such units is kept and gets a
+freshly drawn internal id and barcode instead, its label has to be reprinted.
+
+Without --apply only a report is printed. Once all the duplicates are resolved, the unique indexes
+are created.
+
+Usage: python -m src.tools.merge_duplicates [--apply]
+"""
+import argparse
+import sys
+from typing import Any
+
+from loguru import logger
+from pymongo import DeleteMany, ReplaceOne, UpdateOne
+
+from src.database.database import BaseMongoDbWrapper
+from src.database.indexes import INDEXES, IndexSpec, ensure_indexes
+from src.feecc_workbench.Types import Document
+from src.unit.unit_utils import draw_barcode
+
+# documents of these collections are copies of each other only if they share the identity field
+IDENTITY_FIELDS = {"unitData": "uuid"}
+
+
+def _unique_fields() -> list[IndexSpec]:
+    return [spec for spec in INDEXES if spec.options.get("unique") and len(spec.keys) == 1]
+
+
+def find_duplicates(spec: IndexSpec) -> list[list[Any]]:
+    """get `_id`s of the documents sharing the indexed field value, grouped and ordered from the oldest"""
+    field = spec.keys[0][0]
+    pipeline: list[dict[str, Any]] = [
+        {"$match": spec.options.get("partialFilterExpression", {})},
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": f"${field}", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    return [group["ids"] for group in BaseMongoDbWrapper.aggregate(spec.collection, pipeline)]
+
+
+def merge_documents(documents: list[Document]) -> Document:
+    """merge documents ordered from the oldest. Newer values win, the newest `_id` is kept."""
+    merged: Document = {}
+    for document in documents:
+        merged.update(document)
+    return merged
+
+
+def _merge_copies(collection: str, documents: list[Document]) -> None:
+    """merge the copies of a document ordered from the oldest into the newest one, backing up the rest"""
+    merged = merge_documents(documents)
+    stale_ids = [document["_id"] for document in documents[:-1]]
+    # backups are upserted, so a re-run after an interrupted merge does not fail on the ones already made
+    backups = [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents[:-1]]
+    BaseMongoDbWrapper.bulk_write(f"{collection}Duplicates", backups)
+    BaseMongoDbWrapper.bulk_write(
+        collection, [ReplaceOne({"_id": merged["_id"]}, merged), DeleteMany({"_id": {"$in": stale_ids}})]
+    )
+
+
+def _redraw_internal_id(unit: Document) -> None:
+    """give the unit a new internal id and barcode, re-pointing its components to it"""
+    while True:
+        barcode = draw_barcode()
+        internal_id = str(barcode.barcode.get_fullcode())
+        if BaseMongoDbWrapper.find_one("unitData", {"internal_id": internal_id}, projection={"_id": 1}) is None:
+            break
+
+    barcode.barcode = None
+    update = {"$set": {"internal_id": internal_id, "barcode": barcode.model_dump()}}
+    BaseMongoDbWrapper.update("unitData", update, {"_id": unit["_id"]})
+    if unit.get("components_ids"):
+        BaseMongoDbWrapper.bulk_write(
+            "unitData",
+            [
+                UpdateOne(
+                    {"uuid": component_id, "featured_in_int_id": unit["internal_id"]},
+                    {"$set": {"featured_in_int_id": internal_id}},
+                )
+                for component_id in unit["components_ids"]
+            ],
+        )
+    logger.warning(
+        f"Unit {unit['uuid']} shared internal id {unit['internal_id']} with another unit, "
+        f"it has got internal id {internal_id} instead. Reprint its label."
+    )
+
+
+def merge_group(spec: IndexSpec, ids: list[Any]) -> None:
+    """merge the copies of the same document, distinct units sharing an internal id get a new one"""
+    documents = BaseMongoDbWrapper.find(spec.collection, {"_id": {"$in": ids}}, sort=[("_id", 1)])
+    if len(documents) < 2:
+        return  # already resolved as a part of another group
+
+    identity = IDENTITY_FIELDS.get(spec.collection)
+    copies: dict[Any, list[Document]] = {}
+    for document in documents:
+        copies.setdefault(document.get(identity) if identity else None, []).append(document)
+
+    for group in copies.values():
+        if len(group) > 1:
+            _merge_copies(spec.collection, group)
+    # the oldest unit keeps the internal id, the newer ones are given new ids
+    for group in list(copies.values())[1:]:
+        _redraw_internal_id(merge_documents(group))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apply", action="store_true", help="merge the duplicates instead of only reporting them")
+    args = parser.parse_args()
+
+    total_cnt = 0
+
+    for spec in _unique_fields():
+        field = spec.keys[0][0]
+        groups = find_duplicates(spec)
+        total_cnt += len(groups)
+        if not groups:
+            logger.info(f"[{spec.collection}] no duplicate {field} values")
+            continue
+
+        logger.warning(f"[{spec.collection}] {len(groups)} duplicate {field} values")
+        if args.apply:
+            for ids in groups:
+                merge_group(spec, ids)
+            logger.info(f"[{spec.collection}] {len(groups)} groups of documents with the same {field} resolved")
+
+    if not args.apply:
+        if total_cnt:
+            logger.warning("Run with --apply to merge the duplicates")
+            sys.exit(1)
+        return
+
+    ensure_indexes()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Bulk unit certificate regeneration.
+
+Streams units from the DB (filtered by status and/or creation date range), rebuilds their
+certificates in a process pool and either saves them to a directory or publishes them to IPFS
+via the Feecc gateway, updating the units' passport CIDs (and queueing them for datalog
+anchoring if it is enabled). Progress is checkpointed, so an interrupted run can be resumed.
+
+Usage: python -m src.tools.regenerate_certificates --status built --output unit-certificates/regenerated
+"""
+import argparse
+import asyncio
+import datetime as dt
+import json
+import multiprocessing
+import pathlib
+import sys
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from bson import ObjectId
+from loguru import logger
+
+from src.config import CONFIG
+from src.database.database import BaseMongoDbWrapper
+from src.datalog.datalog_queue_wrapper import DatalogQueueWrapper
+from src.feecc_workbench.certificate_generator import build_unit_certificate, save_certificate
+from src.feecc_workbench.ipfs import publish_file
+from src.unit.unit_wrapper import UnitWrapper
+
+DEFAULT_CHECKPOINT = "regenerate-certificates.checkpoint.json"
+
+
+def _init_worker() -> None:
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    # workers only read the units, there is nothing to keep offline, and every one of them would open the local store
+    CONFIG.mongodb.local_store = False
+
+
+def _regenerate_chunk(uuids: list[str], output_dir: str, use_cache: bool) -> list[tuple[str, str]]:
+    """build and save certificates for the chunk of units. Runs in a worker process."""
+    results = []
+
+    for unit in UnitWrapper.get_units_by_uuids(uuids):
+        certificate = build_unit_certificate(unit, use_cache)
+        path = pathlib.Path(output_dir) / f"unit-certificate-{unit.uuid}.yaml"
+        save_certificate(unit, certificate, path)
+        results.append((unit.uuid, str(path)))
+
+    return results
+
+
+def _build_filters(args: argparse.Namespace, resume_after: str | None) -> dict[str, Any]:
+    filters: dict[str, Any] = {}
+    if args.status:
+        filters["status"] = {"$in": args.status}
+    if args.since or args.until:
+        filters["creation_time"] = {}
+        if args.since:
+            filters["creation_time"]["$gte"] = args.since
+        if args.until:
+            filters["creation_time"]["$lt"] = args.until
+    if resume_after is not None:
+        filters["_id"] = {"$gt": ObjectId(resume_after)}
+    return filters
+
+
+def _iter_chunks(filters: dict[str, Any], chunk_size: int) -> Iterator[tuple[str, list[str]]]:
+    """stream unit uuids in _id order, yielding them in chunks along with the last _id of every chunk"""
+    cursor = BaseMongoDbWrapper.find_iter(
+        UnitWrapper.collection, filters, projection={"_id": 1, "uuid": 1}, sort=[("_id", 1)]
+    )
+    chunk: list[str] = []
+    last_id = ""
+
+    for document in cursor:
+        chunk.append(document["uuid"])
+        last_id = str(document["_id"])
+        if len(chunk) == chunk_size:
+            yield last_id, chunk
+            chunk = []
+
+    if chunk:
+        yield last_id, chunk
+
+
+class _Checkpoint:
+    """Tracks the last unit up to which everything has been regenerated"""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self.last_id: str | None = None
+        self.processed = 0
+
+    def load(self) -> None:
+        if self.path.exists():
+            data = json.loads(self.path.read_text())
+            self.last_id, self.processed = data["last_id"], data["processed"]
+            logger.info(f"Resuming after unit {self.last_id}, {self.processed} units already processed")
+
+    def save(self, last_id: str, processed_cnt: int) -> None:
+        self.last_id = last_id
+        self.processed += processed_cnt
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"last_id": self.last_id, "processed": self.processed}))
+        tmp_path.replace(self.path)
+
+
+async def _publish(results: list[tuple[str, str]], rfid_card_id: str) -> None:
+    """publish regenerated certificates to IPFS and update the units"""
+    for uuid, path in results:
+        cid, link = await publish_file(rfid_card_id=rfid_card_id, file_path=pathlib.Path(path))
+        UnitWrapper.update_by_uuid(uuid, "certificate_ipfs_cid", cid)
+        UnitWrapper.update_by_uuid(uuid, "certificate_ipfs_link", link)
+        if CONFIG.robonomics.enable_datalog:
+            unit = UnitWrapper.get_unit_by_uuid(uuid)
+            DatalogQueueWrapper.enqueue(cid, unit.internal_id)
+    UnitWrapper.flush()  # before the checkpoint moves past these units
+
+
+async def regenerate(args: argparse.Namespace) -> None:  # noqa: CCR001
+    checkpoint = _Checkpoint(pathlib.Path(args.checkpoint))
+    if args.resume:
+        checkpoint.load()
+
+    filters = _build_filters(args, checkpoint.last_id)
+    total = BaseMongoDbWrapper.count(UnitWrapper.collection, filters)
+    logger.info(f"{total} units to regenerate certificates for using {args.workers} worker processes")
+
+    loop = asyncio.get_running_loop()
+    context = multiprocessing.get_context("spawn")  # every worker gets its own DB client
+    in_flight: deque[tuple[str, asyncio.Future[list[tuple[str, str]]]]] = deque()
+    done_cnt, started = 0, time.monotonic()
+
+    with ProcessPoolExecutor(args.workers, mp_context=context, initializer=_init_worker) as pool:
+        chunks = _iter_chunks(filters, args.chunk_size)
+        exhausted = False
+
+        while not exhausted or in_flight:
+            # keep the pool saturated without reading the whole collection ahead
+            while not exhausted and len(in_flight) < args.workers * 2:
+                try:
+                    last_id, uuids = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                future = loop.run_in_executor(pool, _regenerate_chunk, uuids, args.output, args.use_cache)
+                in_flight.append((last_id, future))
+
+            if not in_flight:
+                break
+
+            await asyncio.wait([f for _, f in in_flight], return_when=asyncio.FIRST_COMPLETED)
+
+            # chunks complete out of order, checkpoint only advances over a contiguous completed prefix
+            while in_flight and in_flight[0][1].done():
+                last_id, future = in_flight.popleft()
+                results = future.result()
+                if args.ipfs:
+                    await _publish(results, args.rfid_card_id)
+                checkpoint.save(last_id, len(results))
+                done_cnt += len(results)
+
+            elapsed = time.monotonic() - started
+            rate = done_cnt / elapsed if elapsed else 0
+            eta = (total - done_cnt) / rate if rate else 0
+            logger.info(f"Regenerated {done_cnt}/{total} certificates. {rate:.1f} units/s, ETA {eta:.0f}s")
+
+    logger.info(f"Done. {done_cnt} certificates regenerated in {time.monotonic() - started:.1f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", nargs="*", help="only regenerate units with these statuses")
+    parser.add_argument("--since", type=dt.datetime.fromisoformat, help="only units created at or after (ISO date)")
+    parser.add_argument("--until", type=dt.datetime.fromisoformat, help="only units created before (ISO date)")
+    parser.add_argument("--output", default="unit-certificates/regenerated", help="directory to save certificates to")
+    parser.add_argument("--ipfs", action="store_true", help="publish regenerated certificates to IPFS")
+    parser.add_argument("--rfid-card-id", help="employee card ID to authorize IPFS gateway publishing with")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=50, help="units per worker task")
+    parser.add_argument("--use-cache", action="store_true", help="reuse and save cached certificate fragments")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="checkpoint file path")
+    parser.add_argument("--resume", action="store_true", help="resume from the checkpoint file")
+    args = parser.parse_args()
+
+    if args.ipfs and not args.rfid_card_id:
+        parser.error("--rfid-card-id is required for IPFS publishing")
+
+    asyncio.run(regenerate(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -273,13 +273,13 @@ class UnitManager:
         UnitWrapper.update_by_uuid(self.unit_id, "operation_stages", [asdict(stage) for stage in bio])
 
         if all(stage.completed for stage in bio):
-            prev_status = self._get_cur_unit.status
+            unit = self._get_cur_unit
             UnitWrapper.update_by_uuid(self.unit_id, "status", UnitStatus.built)
             logger.info(
-                f"Unit has no more pending production stages. Unit status changed: {prev_status} -> "
+                f"Unit has no more pending production stages. Unit status changed: {unit.status} -> "
                 f"{UnitStatus.built}"
             )
-            metrics.register_complete_unit(None, self._get_cur_unit)
+            metrics.register_complete_unit(None, unit)
 
         self.employee = None
 
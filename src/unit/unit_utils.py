@@ -2,11 +2,11 @@ from __future__ import annotations
 
 import enum
 import datetime as dt
+import pathlib
 
-import barcode as bcode
 from pydantic import BaseModel, Field, field_serializer, computed_field
 from uuid import uuid4
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 from functools import reduce
 from operator import add
 
@@ -46,6 +46,15 @@ class UnitStatus(str, enum.Enum):
     finalized = "finalized"
 
 
+# certificate subtrees of units in these statuses never change, so their rendered fragments are cached
+FROZEN_STATUSES = (UnitStatus.built, UnitStatus.finalized)
+
+
+def draw_barcode() -> Barcode:
+    """draw a random unit barcode. Its full code serves as the unit internal id."""
+    return Barcode(unit_code=str(int(uuid4().hex, 16))[:12])
+
+
 def _get_unit_list(unit_: Unit) -> list[Unit]:
     """list all the units in the component tree"""
     units_tree = [unit_]
@@ -77,6 +86,7 @@ class Unit(BaseModel):
     certificate_ipfs_cid: str | None = None
     certificate_ipfs_link: str | None = None
     certificate_txn_hash: list[str] | None = None
+    certificate_fragment: dict[str, Any] | None = None  # Cached certificate of a frozen unit subtree
     serial_number: str | None = None
     components_ids: list[str] = []
     featured_in_int_id: str | None = None
@@ -124,6 +134,14 @@ class Unit(BaseModel):
             self.operation_stages = biography_factory(self.schema_id, self.uuid)
 
         return super().model_post_init(__context)
+
+    def regenerate_internal_id(self) -> None:
+        """draw another barcode and internal id for the unit, e.g. when the one derived from the uuid is taken"""
+        if self.barcode is not None and self.barcode.filename is not None:
+            pathlib.Path(self.barcode.filename).unlink(missing_ok=True)
+        self.barcode = draw_barcode()
+        save_barcode(self.barcode)
+        self.internal_id = str(self.barcode.barcode.get_fullcode())
     
     @field_serializer('barcode')
     def serialize_barcode(self, barcode: Barcode, _info):
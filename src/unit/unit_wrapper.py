@@ -1,18 +1,52 @@
+import functools
+from dataclasses import asdict
 from loguru import logger
 from typing import Any
 
-from src.database.database import BaseMongoDbWrapper
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from src.config import CONFIG
+from src.database.database import BaseMongoDbWrapper, JournalConflictResolver
+from src.database.write_buffer import WriteBehindBuffer
+from src.feecc_workbench.merkle import InclusionProof
 from src.prod_stage.ProductionStage import ProductionStage
 from src.feecc_workbench.Types import Document
-from src.feecc_workbench.utils import time_execution
 from src.feecc_workbench.exceptions import UnitNotFoundError
+from src.feecc_workbench.utils import LogValue
 from src.prod_schema.prod_schema_wrapper import ProdSchemaWrapper
-from src.unit.unit_utils import Unit, UnitStatus
+from src.feecc_workbench.translation import translation
+from src.unit.unit_utils import FROZEN_STATUSES, Unit, UnitStatus, draw_barcode
+
+# attempts to insert a unit with a freshly drawn internal id if it collides with an existing one
+INTERNAL_ID_ATTEMPTS = 5
+# fields which are either computed or only ever written by dedicated methods
+PUSH_EXCLUDED_FIELDS = {"total_assembly_time", "certificate_fragment"}
+# the identity of a stored unit is only ever changed by an internal id redraw, updates must not revert it
+UPDATE_EXCLUDED_FIELDS = PUSH_EXCLUDED_FIELDS | {"internal_id", "barcode"}
+# fields the unit certificate is rendered from, editing them invalidates the cached certificate fragments
+CERTIFICATE_FIELDS = {"operation_stages", "components_ids", "serial_number", "certificate_txn_hash", "schema_id"}
 
 
 class _UnitWrapper:
     collection = "unitData"
 
+    @functools.cached_property
+    def _buffer(self) -> WriteBehindBuffer:
+        """field updates by uuid are coalesced and written behind"""
+        return WriteBehindBuffer(
+            self.collection,
+            "uuid",
+            lambda tasks: BaseMongoDbWrapper.bulk_write(self.collection, tasks),
+            CONFIG.mongodb.write_behind_window_seconds,
+            CONFIG.mongodb.write_behind_max_documents,
+        )
+
+    def flush(self) -> None:
+        """Synchronously write all the buffered unit updates"""
+        if "_buffer" in self.__dict__:  # nothing can be buffered before the buffer is created
+            self._buffer.flush()
+
     def push_unit(self, unit: Unit, include_components: bool = True) -> None:
         """Upload or update data about the unit into the DB"""
         if unit.components_ids and include_components:
@@ -21,35 +55,104 @@ class _UnitWrapper:
                 self.push_unit(component)
 
         if unit.is_in_db:
-            unit_dict = unit.model_dump(exclude="total_assembly_time")
-            filters = {"uuid": unit.uuid}
-            update = {"$set": unit_dict}
-            BaseMongoDbWrapper.update(self.collection, update, filters)
+            unit_dict = unit.model_dump(exclude=UPDATE_EXCLUDED_FIELDS)
+            self._buffer.set(unit.uuid, unit_dict)
+            if unit.certificate_fragment is not None and unit.status not in FROZEN_STATUSES:
+                unit.certificate_fragment = None
+                self._drop_certificate_fragments({"uuid": unit.uuid})
         else:
             unit.is_in_db = True
-            unit_dict = unit.model_dump(exclude="total_assembly_time")
-            BaseMongoDbWrapper.insert(self.collection, unit_dict)
+            self._insert_unit(unit)
+
+    def _insert_unit(self, unit: Unit) -> None:
+        """
+        insert a new unit. The internal id is derived from a part of the uuid, so it may collide with the id
+        of another unit: the unique index rejects the insert then and the unit gets a new internal id.
+        Inserts journaled offline are resolved the same way on replay, see `_InternalIdRedrawer`.
+        """
+        for attempt in range(1, INTERNAL_ID_ATTEMPTS + 1):
+            unit_dict = unit.model_dump(exclude=PUSH_EXCLUDED_FIELDS)
+            try:
+                BaseMongoDbWrapper.insert(self.collection, unit_dict)
+                return
+            except DuplicateKeyError as e:
+                if not _is_internal_id_conflict(e) or attempt == INTERNAL_ID_ATTEMPTS:
+                    raise
+                logger.warning(f"Internal id {unit.internal_id} of unit {unit.uuid} is taken, drawing another one")
+                unit.regenerate_internal_id()
 
     def get_unit_by_uuid(self, uuid: str) -> Unit:
         filters = {"uuid": uuid}
-        unit = BaseMongoDbWrapper.find_one(collection=self.collection, filters=filters)
+        unit = self._buffer.overlay(BaseMongoDbWrapper.find_one(collection=self.collection, filters=filters))
         if unit is None:
             raise ValueError(f"No unit with {uuid=} was found.")
         return Unit(**unit)
 
     def unit_update_single_field(self, unit_internal_id: str, field_name: str, field_val: Any) -> None:
         """Updates single field in unit collection's document by internal id."""
+        self.flush()
         filters = {"internal_id": unit_internal_id}
         update = {"$set": {field_name: field_val}}
         BaseMongoDbWrapper.update(self.collection, update, filters)
-        logger.debug(f"Unit {unit_internal_id} field '{field_name}' has been set to '{field_val}'")
+        logger.debug("Unit {} field '{}' has been set to {}", unit_internal_id, field_name, LogValue(field_val))
+        if field_name in CERTIFICATE_FIELDS or (field_name == "status" and field_val not in FROZEN_STATUSES):
+            self._drop_certificate_fragments(filters)
 
     def update_by_uuid(self, unit_id: str, field_name: str, field_val: Any) -> None:
-        filters = {"uuid": unit_id}
-        update = {"$set": {field_name: field_val}}
-        BaseMongoDbWrapper.update(self.collection, update, filters)
-        logger.debug(f"Unit {unit_id} field '{field_name}' has been set to '{field_val}'")
+        self._buffer.set(unit_id, {field_name: field_val})
+        logger.debug("Unit {} field '{}' has been set to {}", unit_id, field_name, LogValue(field_val))
+        if field_name in CERTIFICATE_FIELDS or (field_name == "status" and field_val not in FROZEN_STATUSES):
+            self._drop_certificate_fragments({"uuid": unit_id})
+
+    def _drop_certificate_fragments(self, filters: dict[str, Any]) -> None:
+        """
+        drop the cached certificate fragment of an edited or reopened unit (e.g. sent to revision)
+        and the fragments of the composite units it is a part of, which embed its old subtree.
+        A fragment is never rendered over a component without one, so the walk stops at the first such unit.
+        """
+        projection = {"_id": 0, "uuid": 1, "featured_in_int_id": 1, "certificate_fragment.key": 1}
+        dropped: list[str] = []
+        while filters:
+            document = BaseMongoDbWrapper.find_one(self.collection, filters, projection=projection)
+            document = self._buffer.overlay(document)
+            if document is None or document.get("certificate_fragment") is None or document["uuid"] in dropped:
+                break
+            self._buffer.set(document["uuid"], {"certificate_fragment": None})
+            dropped.append(document["uuid"])
+            parent_id = document.get("featured_in_int_id")
+            filters = {"internal_id": parent_id} if parent_id else {}
+        if dropped:
+            logger.debug(f"Certificate fragments of units {dropped} have been dropped")
+
+    def save_datalog_proofs(self, txn_hash: str, proofs: dict[str, InclusionProof]) -> None:
+        """Save the datalog transaction hash and Merkle inclusion proofs for a batch of units (by internal id)"""
+        tasks = [
+            UpdateOne({"internal_id": internal_id}, {"$set": {"txn_hash": txn_hash, "datalog_proof": asdict(proof)}})
+            for internal_id, proof in proofs.items()
+        ]
+        BaseMongoDbWrapper.bulk_write(self.collection, tasks)
+        logger.debug(f"Datalog proofs for {len(tasks)} units have been saved. {txn_hash=}")
+
+    def save_certificate_fragments(self, fragments: dict[str, dict[str, Any]]) -> None:
+        """Save rendered certificate fragments next to the unit documents (by uuid)"""
+        self.flush()  # a pending drop of a fragment must not overwrite the new one
+        tasks = [
+            UpdateOne({"uuid": uuid}, {"$set": {"certificate_fragment": fragment}})
+            for uuid, fragment in fragments.items()
+        ]
+        BaseMongoDbWrapper.bulk_write(self.collection, tasks)
+        logger.debug(f"Certificate fragments for {len(tasks)} units have been saved")
 
+    def get_unanchored_units(self) -> list[Document]:
+        """Return internal ids and passport CIDs of the built units which have not been anchored to datalog"""
+        self.flush()
+        filters = {
+            "status": UnitStatus.built,
+            "certificate_ipfs_cid": {"$ne": None},
+            "txn_hash": None,
+        }
+        projection = {"_id": 0, "internal_id": 1, "certificate_ipfs_cid": 1}
+        return BaseMongoDbWrapper.find(self.collection, filters, projection=projection)
 
     def get_unit_by_internal_id(self, unit_internal_id: str) -> Unit:
         # """Returns unit given internal_id"""
@@ -86,6 +189,7 @@ class _UnitWrapper:
 
         filters = {"internal_id": unit_internal_id}
         unit = BaseMongoDbWrapper.find_one(collection=self.collection, filters=filters, projection={"_id": 0})
+        unit = self._buffer.overlay(unit)
         if not unit:
             message = f"Unit with internal id {unit_internal_id} not found"
             logger.warning(message)
@@ -129,6 +233,7 @@ class _UnitWrapper:
 
     def get_unit_ids_and_names_by_status(self, status: UnitStatus) -> list[dict[str, str]]:
         """Return's units' ids and names filtered by status."""
+        self.flush()
         pipeline = [  # noqa: CCR001,ECE001
             {"$match": {"status": status}},
             {
@@ -158,5 +263,72 @@ class _UnitWrapper:
     def get_components_units(self, components_ids: list[str]) -> list[Unit]:
         return [self.get_unit_by_uuid(component) for component in components_ids]
 
+    def get_certificate_fragment_keys(self, uuids: list[str]) -> dict[str, str | None]:
+        """Fetch the keys of the cached certificate fragments of the frozen units (by uuid)"""
+        self.flush()
+        filters = {"uuid": {"$in": uuids}}
+        projection = {"_id": 0, "uuid": 1, "status": 1, "certificate_fragment.key": 1}
+        documents = BaseMongoDbWrapper.find(collection=self.collection, filters=filters, projection=projection)
+        return {
+            document["uuid"]: (document.get("certificate_fragment") or {}).get("key")
+            for document in documents
+            if document.get("status") in FROZEN_STATUSES
+        }
+
+    def get_units_by_uuids(self, uuids: list[str]) -> list[Unit]:
+        """Fetch multiple units with a single query"""
+        self.flush()
+        filters = {"uuid": {"$in": uuids}}
+        units = BaseMongoDbWrapper.find(collection=self.collection, filters=filters, projection={"_id": 0})
+        return [Unit(**unit) for unit in units]
+
+
+def _is_internal_id_conflict(error: DuplicateKeyError) -> bool:
+    return "internal_id" in (error.details or {}).get("keyPattern", {})
+
+
+class _InternalIdRedrawer(JournalConflictResolver):
+    """
+    Redraws the internal id of a unit inserted offline if it turns out to be taken once the insert is replayed.
+    The later journaled writes referring to the unit by its former internal id are pointed to the new one.
+    """
+
+    def __init__(self) -> None:
+        self._redrawn: dict[str, str] = {}
+
+    def resolve(
+        self, operation: str, payload: dict[str, Any], error: DuplicateKeyError
+    ) -> tuple[dict[str, Any], str] | None:
+        if operation != "insert" or not _is_internal_id_conflict(error):
+            return None
+
+        document = payload["doc"]
+        barcode = draw_barcode()
+        internal_id = str(barcode.barcode.get_fullcode())
+        barcode.barcode = None
+        self._redrawn[document["internal_id"]] = internal_id
+        warning = (
+            f"{translation('UnitInternalID')} {document['internal_id']} {translation('InternalIDTaken')} "
+            f"{internal_id}. {translation('ReprintLabel')}"
+        )
+        return {**payload, "doc": {**document, "internal_id": internal_id, "barcode": barcode.model_dump()}}, warning
+
+    def _rewrite_request(self, request: dict[str, Any]) -> dict[str, Any]:
+        request = dict(request)
+        if (internal_id := (request.get("filter") or {}).get("internal_id")) in self._redrawn:
+            request["filter"] = {**request["filter"], "internal_id": self._redrawn[internal_id]}
+        fields = (request.get("doc") or {}).get("$set") or {}
+        if (internal_id := fields.get("featured_in_int_id")) in self._redrawn:
+            request["doc"] = {**request["doc"], "$set": {**fields, "featured_in_int_id": self._redrawn[internal_id]}}
+        return request
+
+    def rewrite(self, operation: str, payload: dict[str, Any]) -> dict[str, Any]:
+        if not self._redrawn:
+            return payload
+        if operation == "bulk_write":
+            return {**payload, "requests": [self._rewrite_request(request) for request in payload["requests"]]}
+        return self._rewrite_request(payload)
+
 
 UnitWrapper = _UnitWrapper()
+BaseMongoDbWrapper.register_conflict_resolver(UnitWrapper.collection, _InternalIdRedrawer())
@@ -0,0 +1,136 @@
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from src.feecc_workbench import certificate_generator as cg
+from src.feecc_workbench import translation
+from src.prod_stage.ProductionStage import ProductionStage
+from src.unit.unit_utils import UnitStatus
+from src.unit.unit_wrapper import UnitWrapper
+
+
+class FakeUnits:
+    """in-memory unit collection standing in for the UnitWrapper queries used by the certificate generator"""
+
+    def __init__(self, *units: SimpleNamespace) -> None:
+        self.units = {unit.uuid: unit for unit in units}
+        self.loaded: list[str] = []
+        self.saved: list[str] = []
+
+    def get_units_by_uuids(self, uuids: list[str]) -> list[SimpleNamespace]:
+        self.loaded.extend(uuids)
+        return [self.units[uuid] for uuid in uuids]
+
+    def get_certificate_fragment_keys(self, uuids: list[str]) -> dict[str, str | None]:
+        return {uuid: cg._stored_key(self.units[uuid]) for uuid in uuids}  # type: ignore[arg-type]
+
+    def save_certificate_fragments(self, fragments: dict[str, dict[str, Any]]) -> None:
+        for uuid, fragment in fragments.items():
+            self.units[uuid].certificate_fragment = fragment
+        self.saved.extend(fragments)
+
+
+def make_unit(uuid: str, components_ids: list[str]) -> SimpleNamespace:
+    stage = ProductionStage(
+        name="Assembly",
+        parent_unit_uuid=uuid,
+        number=0,
+        employee_name="Operator",
+        session_start_time="01-01-2024 10:00:00",
+        session_end_time="01-01-2024 10:30:00",
+        completed=True,
+    )
+    return SimpleNamespace(
+        uuid=uuid,
+        internal_id=uuid[:12],
+        serial_number=None,
+        schema=SimpleNamespace(schema_name="Unit"),
+        status=UnitStatus.built,
+        operation_stages=[stage],
+        certificate_txn_hash=None,
+        components_ids=components_ids,
+        certificate_fragment=None,
+    )
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch: pytest.MonkeyPatch) -> None:
+    settings = SimpleNamespace(language_message="en")
+    monkeypatch.setattr("src.feecc_workbench.certificate_generator.CONFIG", settings)
+    monkeypatch.setattr("src.feecc_workbench.translation.CONFIG", settings)
+
+
+@pytest.fixture
+def units(monkeypatch: pytest.MonkeyPatch) -> FakeUnits:
+    """a root unit assembled of a component, which is assembled of a part. The certificate is built once."""
+    fake = FakeUnits(make_unit("root", ["component"]), make_unit("component", ["part"]), make_unit("part", []))
+    for method in ("get_units_by_uuids", "get_certificate_fragment_keys", "save_certificate_fragments"):
+        monkeypatch.setattr(UnitWrapper, method, getattr(fake, method))
+    cg.build_unit_certificate(fake.units["root"])  # type: ignore[arg-type]
+    assert fake.saved == ["part", "component", "root"]
+    fake.loaded.clear()
+    fake.saved.clear()
+    return fake
+
+
+def test_unchanged_certificate_is_served_from_the_cache(units: FakeUnits) -> None:
+    certificate = cg.build_unit_certificate(units.units["root"])  # type: ignore[arg-type]
+
+    assert certificate == units.units["root"].certificate_fragment["certificate"]
+    assert not units.loaded, "Components of a cached unit must not be loaded"
+    assert not units.saved
+
+
+def test_cache_is_left_as_is_when_not_used(units: FakeUnits) -> None:
+    units.units["root"].serial_number = "SN-1"
+
+    cg.build_unit_certificate(units.units["root"], use_cache=False)  # type: ignore[arg-type]
+
+    assert units.loaded == ["component", "part"], "Cached fragments are not reused"
+    assert not units.saved
+
+
+def test_edited_unit_misses_the_cache(units: FakeUnits) -> None:
+    units.units["root"].serial_number = "SN-1"
+
+    certificate = cg.build_unit_certificate(units.units["root"])  # type: ignore[arg-type]
+
+    assert certificate[translation.translation("UnitSerialNumber")] == "SN-1"
+    assert units.saved == ["root"], "Fragments of the unchanged components are reused"
+
+
+def test_edited_component_misses_the_cache(units: FakeUnits) -> None:
+    # UnitWrapper drops the fragments of an edited unit and of the units it is a part of
+    part = units.units["part"]
+    part.operation_stages[0].employee_name = "Another operator"
+    for uuid in ("part", "component", "root"):
+        units.units[uuid].certificate_fragment = None
+
+    certificate = cg.build_unit_certificate(units.units["root"])  # type: ignore[arg-type]
+
+    (component,) = certificate[translation.translation("UnitComponents")]
+    (part_certificate,) = component[translation.translation("UnitComponents")]
+    (stage,) = part_certificate[translation.translation("UnitBiography")]
+    assert stage[translation.translation("BuildEmployee")] == "Another operator"
+    assert units.saved == ["part", "component", "root"]
+
+
+def test_translation_change_misses_the_cache(
+    units: FakeUnits, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    table = Path(translation.current_directory).read_text().replace(";Name\n", ";Title\n")
+    monkeypatch.setattr(translation, "current_directory", str(tmp_path / "message_lang.csv"))
+    (tmp_path / "message_lang.csv").write_text(table)
+    translation._load_translations.cache_clear()
+    translation.translations_digest.cache_clear()
+    try:
+        certificate = cg.build_unit_certificate(units.units["root"])  # type: ignore[arg-type]
+        (stage,) = certificate[translation.translation("UnitBiography")]
+    finally:
+        translation._load_translations.cache_clear()
+        translation.translations_digest.cache_clear()
+
+    assert "Title" in stage
+    assert units.saved == ["part", "component", "root"]
@@ -0,0 +1,119 @@
+import asyncio
+import datetime as dt
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from pymongo import UpdateOne
+
+from src.datalog.datalog_queue_wrapper import RETRY_BASE_DELAY, DatalogEntryStatus
+from src.feecc_workbench import robonomics
+from src.feecc_workbench.robonomics import DatalogBatcher
+
+
+class FakeQueueCollection:
+    """in-memory datalogQueue collection serving the queries of DatalogQueueWrapper"""
+
+    def __init__(self) -> None:
+        self.entries: dict[str, dict[str, Any]] = {}
+
+    def update(self, collection: str, update: dict[str, Any], filters: dict[str, Any], upsert: bool = False) -> None:
+        self.entries.setdefault(filters["cid"], dict(update["$setOnInsert"]))
+
+    def find(self, collection: str, filters: dict[str, Any], **kwargs: Any) -> list[dict[str, Any]]:
+        entries = [e for e in self.entries.values() if e["status"] == filters["status"]]
+        if "next_attempt_at" in filters:
+            entries = [e for e in entries if e["next_attempt_at"] <= filters["next_attempt_at"]["$lte"]]
+        ((field, _),) = kwargs["sort"]
+        return sorted(entries, key=lambda e: e[field])[: kwargs["limit"]]
+
+    def bulk_write(self, collection: str, tasks: list[UpdateOne]) -> None:
+        for task in tasks:
+            self.entries[task._filter["cid"]].update(task._doc["$set"])
+
+
+class FakeDatalog:
+    def __init__(self) -> None:
+        self.posted: list[str] = []
+        self.fail = False
+
+    async def __call__(self, content: str) -> str:
+        if self.fail:
+            raise ConnectionError("Robonomics node is unreachable")
+        self.posted.append(content)
+        return f"0x{len(self.posted)}"
+
+
+@pytest.fixture
+def queue(monkeypatch: pytest.MonkeyPatch) -> FakeQueueCollection:
+    collection = FakeQueueCollection()
+    monkeypatch.setattr("src.datalog.datalog_queue_wrapper.BaseMongoDbWrapper", collection)
+    monkeypatch.setattr("src.feecc_workbench.translation.CONFIG", SimpleNamespace(language_message="en"))
+    monkeypatch.setattr(robonomics, "messenger", SimpleNamespace(error=lambda _: None, success=lambda _: None))
+    monkeypatch.setattr(robonomics.UnitWrapper, "save_datalog_proofs", lambda txn_hash, proofs: None)
+    return collection
+
+
+@pytest.fixture
+def datalog(monkeypatch: pytest.MonkeyPatch) -> FakeDatalog:
+    fake = FakeDatalog()
+    monkeypatch.setattr(robonomics, "post_to_datalog", fake)
+    return fake
+
+
+def test_failed_batch_is_retried_after_the_backoff(queue: FakeQueueCollection, datalog: FakeDatalog) -> None:
+    batcher = DatalogBatcher(max_batch_size=2, window_seconds=600)
+    batcher.submit("cid-a", "1")
+    batcher.submit("cid-b", "2")
+
+    datalog.fail = True
+    timeout = asyncio.run(batcher.process_due())
+
+    assert timeout == pytest.approx(RETRY_BASE_DELAY.total_seconds(), abs=1), "The worker waits for the backoff"
+    assert {e["attempts"] for e in queue.entries.values()} == {1}
+    assert asyncio.run(batcher.process_due()) > 0 and not datalog.posted, "Entries are not retried before it"
+
+    for entry in queue.entries.values():
+        entry["next_attempt_at"] -= RETRY_BASE_DELAY
+    datalog.fail = False
+    asyncio.run(batcher.process_due())
+
+    assert len(datalog.posted) == 1
+    assert {e["status"] for e in queue.entries.values()} == {DatalogEntryStatus.anchored}
+
+
+def test_shutdown_stops_the_worker_and_keeps_a_partial_batch(
+    queue: FakeQueueCollection, datalog: FakeDatalog
+) -> None:
+    batcher = DatalogBatcher(max_batch_size=2, window_seconds=600)
+
+    async def main() -> asyncio.Task[None]:
+        batcher.start()
+        worker = batcher._worker
+        assert worker is not None
+        batcher.submit("cid-a", "1")
+        await asyncio.sleep(0.01)
+        await batcher.shutdown()
+        return worker
+
+    worker = asyncio.run(main())
+
+    assert worker.cancelled()
+    assert not datalog.posted
+    assert queue.entries["cid-a"]["status"] == DatalogEntryStatus.pending
+
+
+def test_shutdown_anchors_a_due_batch(queue: FakeQueueCollection, datalog: FakeDatalog) -> None:
+    batcher = DatalogBatcher(max_batch_size=2, window_seconds=600)
+    batcher.submit("cid-a", "1")
+    queue.entries["cid-a"]["created_at"] -= dt.timedelta(seconds=600)
+
+    async def main() -> None:
+        # the worker is stuck waiting, as if the wakeup had been missed
+        batcher._worker = asyncio.create_task(asyncio.sleep(3600))
+        await batcher.shutdown()
+
+    asyncio.run(main())
+
+    assert len(datalog.posted) == 1
+    assert queue.entries["cid-a"]["status"] == DatalogEntryStatus.anchored
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.database.models import HidEvent
+from src.feecc_workbench.hid_debouncer import HidDebouncer
+
+
+@pytest.fixture
+def debouncer(monkeypatch: pytest.MonkeyPatch) -> HidDebouncer:
+    config = SimpleNamespace(workbench=SimpleNamespace(hid_debounce_ms=300))
+    monkeypatch.setattr("src.feecc_workbench.hid_debouncer.CONFIG", config)
+    return HidDebouncer()
+
+
+def _scan(string: str, timestamp: float, name: str = "barcode_reader") -> HidEvent:
+    return HidEvent(string=string, name=name, timestamp=timestamp)
+
+
+def test_repeated_scan_within_window_is_suppressed(debouncer: HidDebouncer) -> None:
+    assert not debouncer.is_duplicate(_scan("4600000000017", 10.0))
+    assert debouncer.is_duplicate(_scan("4600000000017", 10.005))
+    assert debouncer.is_duplicate(_scan("4600000000017", 10.2))
+    assert not debouncer.is_duplicate(_scan("4600000000017", 10.35))
+
+
+def test_windows_are_per_device_and_code(debouncer: HidDebouncer) -> None:
+    assert not debouncer.is_duplicate(_scan("4600000000017", 10.0))
+    assert not debouncer.is_duplicate(_scan("4600000000024", 10.01))
+    assert not debouncer.is_duplicate(_scan("4600000000017", 10.02, name="rfid_reader"))
+    # a late request carrying an earlier timestamp is still a duplicate
+    assert debouncer.is_duplicate(_scan("4600000000017", 9.9))
+
+
+def test_windows_are_per_workbench(debouncer: HidDebouncer) -> None:
+    assert not debouncer.is_duplicate(_scan("4600000000017", 10.0), workbench=1)
+    assert not debouncer.is_duplicate(_scan("4600000000017", 10.01), workbench=2)
+    assert debouncer.is_duplicate(_scan("4600000000017", 10.02), workbench=2)
@@ -0,0 +1,27 @@
+import pathlib
+from types import SimpleNamespace
+
+import pytest
+
+from src.database.models import HidEvent
+from src.feecc_workbench.hid_recorder import HidEventRecorder, load_events
+from src.tools.hid_replay import burst, schedule
+
+
+def test_recorded_events_are_loaded_in_order(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "hid" / "events.jsonl"
+    config = SimpleNamespace(workbench=SimpleNamespace(hid_events_record_path=str(path)))
+    monkeypatch.setattr("src.feecc_workbench.hid_recorder.CONFIG", config)
+    recorder = HidEventRecorder()
+    recorder.record(HidEvent(string="4600000000017", name="barcode_reader", timestamp=2.0))
+    recorder.record(HidEvent(string="0008368511", name="rfid_reader", timestamp=1.0))
+
+    assert [event.string for event in load_events(path)] == ["0008368511", "4600000000017"]
+
+
+def test_schedule_is_scaled() -> None:
+    events = burst(["4600000000017", "4600000000024", "4600000000031"], interval_ms=100, card="0008368511")
+
+    assert [event.name for event in events] == ["rfid_reader"] + ["barcode_reader"] * 3
+    assert schedule(events, speed=2) == pytest.approx([0, 0.05, 0.1, 0.15])
+    assert schedule(events, speed=0) == [0, 0, 0, 0]
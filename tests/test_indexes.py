@@ -0,0 +1,37 @@
+from typing import Any
+
+import pytest
+
+from src.database import indexes
+from src.database.indexes import INDEXES, ensure_indexes
+
+
+class FakeIndexes:
+    def __init__(self, existing: dict[str, dict[str, Any]]) -> None:
+        self.existing = existing
+        self.dropped: list[tuple[str, str]] = []
+
+    def index_information(self, collection: str) -> dict[str, Any]:
+        return self.existing.get(collection, {})
+
+    def drop_index(self, collection: str, index_name: str) -> None:
+        self.dropped.append((collection, index_name))
+
+    def create_index(self, collection: str, keys: list[tuple[str, int]], **kwargs: Any) -> str:
+        return str(kwargs["name"])
+
+
+def test_text_indexes_of_all_the_initialized_collections_are_dropped(monkeypatch: pytest.MonkeyPatch) -> None:
+    text_index = {"key": [("_fts", "text"), ("_ftsx", 1)]}
+    fake = FakeIndexes(
+        {
+            "unitData": {"uuid_text": text_index, "_id_": {"key": [("_id", 1)]}},
+            "productionStagesData": {"id_text": text_index},
+        }
+    )
+    monkeypatch.setattr(indexes, "BaseMongoDbWrapper", fake)
+    assert "productionStagesData" not in {spec.collection for spec in INDEXES}
+
+    ensure_indexes()
+
+    assert sorted(fake.dropped) == [("productionStagesData", "id_text"), ("unitData", "uuid_text")]
@@ -0,0 +1,63 @@
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+
+from src.database import instrumentation
+from src.database.instrumentation import STREAM_SIZE_SAMPLING, Observation, _stream, instrumented, served_locally
+from src.feecc_workbench.Types import Document
+
+
+@pytest.fixture
+def records(monkeypatch: pytest.MonkeyPatch) -> list[tuple[float, Observation]]:
+    recorded: list[tuple[float, Observation]] = []
+
+    def record(collection: str, operation: str, filters: Any, elapsed: float, observation: Observation) -> None:
+        recorded.append((elapsed, observation))
+
+    monkeypatch.setattr(instrumentation, "_record", record)
+    return recorded
+
+
+def test_stream_does_not_count_the_caller_time(records: list[tuple[float, Observation]]) -> None:
+    for _ in _stream(iter([{"a": 1}, {"a": 2}]), "unitData", "find_iter", {}):
+        time.sleep(0.05)
+
+    ((elapsed, observation),) = records
+    assert observation.documents == 2
+    assert elapsed < 0.05
+
+
+def test_stream_size_is_sampled(records: list[tuple[float, Observation]], monkeypatch: pytest.MonkeyPatch) -> None:
+    measured: list[Any] = []
+    monkeypatch.setattr(instrumentation, "bson_size", lambda document: measured.append(document) or 10)
+    count = STREAM_SIZE_SAMPLING * 3 + 1
+
+    assert len(list(_stream(({"n": n} for n in range(count)), "unitData", "find_iter", {}))) == count
+
+    ((_, observation),) = records
+    assert len(measured) == 4
+    assert observation.documents == count
+    assert observation.bytes == 10 * count
+
+
+def test_operations_are_labelled_with_the_backend_serving_them(records: list[tuple[float, Observation]]) -> None:
+    class Wrapper:
+        @instrumented("find")
+        def find(self, collection: str, filters: dict[str, Any], local: bool) -> list[Document]:
+            if local:
+                served_locally()
+            return [{"a": 1}]
+
+        @instrumented("find_iter")
+        def find_iter(self, collection: str, filters: dict[str, Any]) -> Iterator[Document]:
+            served_locally()
+            return iter([{"a": 1}])
+
+    wrapper = Wrapper()
+    wrapper.find("unitData", {}, local=False)
+    wrapper.find("unitData", {}, local=True)
+    list(wrapper.find_iter("unitData", {}))
+
+    assert [observation.backend for _, observation in records] == ["mongo", "local", "local"]
@@ -0,0 +1,23 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+REPO_ROOT = pathlib.Path(__file__).parent.parent
+
+IMPORT_SNIPPET = """
+import sys
+import src.database.database, src.database.sync, src.unit.unit_wrapper
+import src.feecc_workbench.robonomics, src.feecc_workbench.certificate_generator, src.feecc_workbench.metrics
+from src.database.database import BaseMongoDbWrapper
+assert BaseMongoDbWrapper._client is None, "MongoDB client created on import"
+assert "robonomicsinterface" not in sys.modules, "Robonomics client libraries imported eagerly"
+"""
+
+
+def test_modules_import_without_config_and_services() -> None:
+    env = {"PATH": os.environ.get("PATH", ""), "PYTHONPATH": str(REPO_ROOT)}
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,146 @@
+import pathlib
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from pymongo.errors import ConnectionFailure, DuplicateKeyError
+
+from src.database.database import _BaseMongoDbWrapper
+from src.database.local_store import LocalStore, NotServable, matches, project
+
+
+@pytest.fixture
+def store(tmp_path: pathlib.Path) -> LocalStore:
+    return LocalStore(str(tmp_path / "store" / "local.sqlite3"))
+
+
+def test_journal_keeps_order_and_survives_reopening(tmp_path: pathlib.Path) -> None:
+    path = str(tmp_path / "local.sqlite3")
+    store = LocalStore(path)
+    for i in range(5):
+        store.journal_append("unitData", "update", {"filter": {"uuid": "a"}, "doc": {"$set": {"n": i}}})
+    store.close()
+
+    store = LocalStore(path)
+    entries = store.journal_head(10)
+    assert [entry.payload["doc"]["$set"]["n"] for entry in entries] == list(range(5))
+
+    store.journal_remove(entries[0].seq)
+    store.journal_reject(entries[1].seq, "E11000 duplicate key")
+    assert store.journal_size() == 3
+    assert store.journal_head(1)[0].seq == entries[2].seq
+
+
+def test_local_documents_follow_updates(store: LocalStore) -> None:
+    store.put("unitData", "a", {"uuid": "a", "internal_id": "1", "status": "production"})
+    store.put("unitData", "b", {"uuid": "b", "internal_id": "2", "status": "production"})
+    store.update("unitData", {"internal_id": "1"}, {"status": "built"})
+
+    assert store.find("unitData", {"uuid": "a"}) == [{"uuid": "a", "internal_id": "1", "status": "built"}]
+    assert [d["uuid"] for d in store.find("unitData", {"uuid": {"$in": ["a", "b"]}})] == ["a", "b"]
+
+    store.delete("unitData", {"uuid": "a"})
+    assert store.find("unitData", {"uuid": "a"}) == []
+
+
+def test_complex_filters_are_not_served() -> None:
+    with pytest.raises(NotServable):
+        matches({"status": "built"}, {"certificate_ipfs_cid": {"$ne": None}})
+
+
+def test_projection() -> None:
+    document = {"_id": 1, "name": "A", "hashed_password": "x"}
+    assert project(document, {"_id": 0, "hashed_password": 0}) == {"name": "A"}
+    assert project(document, {"name": 1}) == {"_id": 1, "name": "A"}
+    assert project(document, None) == document
+
+
+class FakeCollection:
+    def __init__(self) -> None:
+        self.documents: list[dict[str, Any]] = []
+        self.error: Exception | None = None
+
+    def insert_one(self, document: dict[str, Any]) -> None:
+        if self.error is not None:
+            raise self.error
+        self.documents.append(document)
+
+    def find_one(self, filter: dict[str, Any], **kwargs: Any) -> dict[str, Any] | None:
+        if self.error is not None:
+            raise self.error
+        return next((d for d in self.documents if matches(d, filter)), None)
+
+    def update_one(self, filter: dict[str, Any], update: dict[str, Any], upsert: bool = False) -> None:
+        if self.error is not None:
+            raise self.error
+        for document in self.documents:
+            if matches(document, filter):
+                document.update(update["$set"])
+
+    def find(self, filter: dict[str, Any], **kwargs: Any) -> list[dict[str, Any]]:
+        if self.error is not None:
+            raise self.error
+        return [d for d in self.documents if matches(d, filter)]
+
+
+@pytest.fixture
+def wrapper(store: LocalStore, monkeypatch: pytest.MonkeyPatch) -> _BaseMongoDbWrapper:
+    settings = SimpleNamespace(mongodb=SimpleNamespace(slow_query_ms=1e6))
+    monkeypatch.setattr("src.database.instrumentation.CONFIG", settings)
+    db = _BaseMongoDbWrapper()
+    collections = {"unitData": FakeCollection(), "employeeData": FakeCollection()}
+    db._client, db._db, db._local_store = object(), collections, store  # type: ignore[assignment]
+    return db
+
+
+def test_rejected_write_is_not_applied_locally(wrapper: _BaseMongoDbWrapper, store: LocalStore) -> None:
+    wrapper._database["unitData"].error = DuplicateKeyError("E11000 duplicate key")
+
+    with pytest.raises(DuplicateKeyError):
+        wrapper.insert("unitData", {"uuid": "a", "internal_id": "1"})
+
+    assert store.find("unitData", {"uuid": "a"}) == []
+    assert store.journal_size() == 0
+
+
+def test_write_during_an_outage_is_journaled_and_read_locally(
+    wrapper: _BaseMongoDbWrapper, store: LocalStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    collection = wrapper._database["unitData"]
+    collection.error = ConnectionFailure("MongoDB is down")
+    wrapper.insert("unitData", {"uuid": "a", "internal_id": "1"})
+
+    assert wrapper.offline and store.journal_size() == 1
+    with monkeypatch.context() as m:
+        # the journal is not counted on the reads, the pending writes are tracked in memory
+        m.setattr(store, "journal_size", lambda: pytest.fail("the journal is counted on a read"))
+        assert wrapper.find_one("unitData", {"uuid": "a"}) == {"uuid": "a", "internal_id": "1"}
+
+    collection.error = None
+    assert wrapper.replay_journal() == 1
+    assert not wrapper.offline and not wrapper._journal_pending
+    assert collection.documents == [{"uuid": "a", "internal_id": "1"}]
+
+
+def test_find_serves_the_journaled_writes(wrapper: _BaseMongoDbWrapper, store: LocalStore) -> None:
+    collection = wrapper._database["unitData"]
+    collection.documents = [{"uuid": "a", "status": "production"}, {"uuid": "b", "status": "production"}]
+    collection.error = ConnectionFailure("MongoDB is down")
+    wrapper.update("unitData", {"$set": {"status": "built"}}, {"uuid": "a"})
+    wrapper.insert("unitData", {"uuid": "c", "status": "production"})
+    store.put("unitData", "a", {"uuid": "a", "status": "built"})  # the unit was read before the outage
+    collection.error, wrapper._offline = None, False  # reachable again, the journal is not replayed yet
+
+    found = wrapper.find("unitData", {"status": "production"})
+
+    assert sorted(d["uuid"] for d in found) == ["b", "c"]
+    assert store.find("unitData", {"uuid": "a"}) == [{"uuid": "a", "status": "built"}]
+
+
+def test_employees_are_read_from_the_mirror_only_offline(wrapper: _BaseMongoDbWrapper, store: LocalStore) -> None:
+    store.replace_collection("employeeData", {"1": {"rfid_card_id": "1", "name": "Revoked"}})
+
+    assert wrapper.find_one("employeeData", {"rfid_card_id": "1"}) is None
+
+    wrapper._database["employeeData"].error = ConnectionFailure("MongoDB is down")
+    assert wrapper.find_one("employeeData", {"rfid_card_id": "1"}) == {"rfid_card_id": "1", "name": "Revoked"}
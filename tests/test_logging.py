@@ -0,0 +1,70 @@
+import json
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from loguru import logger
+
+from src._logging import _LevelFilter, configure_logging
+from src.config import Logging
+from src.feecc_workbench.utils import LogValue
+
+
+@pytest.fixture
+def log_dir(tmp_path: Path) -> Iterator[Path]:
+    yield tmp_path
+    logger.configure(handlers=[{"sink": sys.stderr}], patcher=lambda record: None)
+
+
+def _record(name: str, level: str, **extra: object) -> dict:
+    return {"name": name, "level": logger.level(level), "extra": extra}
+
+
+def test_module_levels_override_the_default() -> None:
+    level_filter = _LevelFilter("INFO", {"src.database": "WARNING", "src.database.sync": "DEBUG"})
+
+    assert level_filter.min_level == logger.level("DEBUG").no
+    assert level_filter(_record("src.app", "INFO"))
+    assert not level_filter(_record("src.app", "DEBUG"))
+    assert not level_filter(_record("src.database.write_buffer", "INFO"))
+    assert level_filter(_record("src.database.sync", "DEBUG"))
+    assert not level_filter(_record("src.databases", "DEBUG"))
+    assert not level_filter(_record("src.app", "ERROR", production_event=True))
+
+
+def test_ecs_json_file_with_truncated_messages(log_dir: Path) -> None:
+    settings = Logging(
+        ecs_json=True,
+        enqueue=False,
+        max_message_length=50,
+        file_path=str(log_dir / "workbench.log"),
+        events_path=str(log_dir / "production-events.log"),
+    )
+    configure_logging(settings)
+
+    logger.bind(unit_id="42").info("x" * 100)
+    logger.bind(production_event=True).info(json.dumps({"event_type": "create_unit", "padding": "y" * 100}))
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+
+    lines = [json.loads(line) for line in (log_dir / "workbench.log").read_text().splitlines()]
+    assert [line["log.level"] for line in lines] == ["info", "error"]
+    assert lines[0]["message"] == "x" * 50 + "... [50 more characters]"
+    assert lines[0]["unit_id"] == "42"
+    assert "ecs.version" in lines[0]
+    assert lines[1]["error"]["type"] == "ValueError"
+    # production events are neither mixed into the log file nor truncated
+    event = json.loads((log_dir / "production-events.log").read_text())
+    assert event["padding"] == "y" * 100
+
+
+def test_log_value_is_bounded() -> None:
+    def biography(stages: int) -> list[dict]:
+        return [{"name": f"Stage {i}", "stage_data": {"notes": "z" * 10_000}} for i in range(stages)]
+
+    rendered = f"{LogValue(biography(10))}"
+    assert len(rendered) < 1000
+    assert len(f"{LogValue(biography(10_000))}") == len(rendered)
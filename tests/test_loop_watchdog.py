@@ -0,0 +1,38 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from loguru import logger
+
+from src.feecc_workbench.loop_watchdog import LoopWatchdog, loop_blocks
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch: pytest.MonkeyPatch) -> None:
+    config = SimpleNamespace(loop_watchdog=SimpleNamespace(interval_ms=10, block_threshold_ms=50))
+    monkeypatch.setattr("src.feecc_workbench.loop_watchdog.CONFIG", config)
+
+
+def test_blocking_call_is_reported_once_with_its_stack() -> None:
+    warnings: list[str] = []
+    handler_id = logger.add(warnings.append, level="WARNING", format="{message}")
+    blocks_before = loop_blocks.get({}) if loop_blocks.values else 0
+
+    async def main() -> None:
+        watchdog = LoopWatchdog()
+        watchdog.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.3)  # a synchronous call hiding in a coroutine
+        await asyncio.sleep(0.05)
+        await watchdog.shutdown()
+
+    try:
+        asyncio.run(main())
+    finally:
+        logger.remove(handler_id)
+
+    assert len(warnings) == 1
+    assert "Event loop blocked" in warnings[0]
+    assert "time.sleep(0.3)" in warnings[0]
+    assert loop_blocks.get({}) == blocks_before + 1
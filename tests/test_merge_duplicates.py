@@ -0,0 +1,84 @@
+from typing import Any
+
+import pytest
+from pymongo import DeleteMany, ReplaceOne, UpdateOne
+
+from src.database.indexes import INDEXES
+from src.database.local_store import matches
+from src.feecc_workbench._label_generation import Barcode
+from src.tools import merge_duplicates
+from src.tools.merge_duplicates import merge_group
+
+INTERNAL_ID = next(spec for spec in INDEXES if spec.collection == "unitData" and spec.keys[0][0] == "internal_id")
+
+
+class FakeDb:
+    """in-memory collections serving the queries of the duplicate merger"""
+
+    def __init__(self, units: list[dict[str, Any]]) -> None:
+        self.collections: dict[str, list[dict[str, Any]]] = {"unitData": units, "unitDataDuplicates": []}
+
+    def find(self, collection: str, filters: dict[str, Any], **kwargs: Any) -> list[dict[str, Any]]:
+        ids = filters["_id"]["$in"]
+        return sorted((d for d in self.collections[collection] if d["_id"] in ids), key=lambda d: d["_id"])
+
+    def find_one(self, collection: str, filters: dict[str, Any], **kwargs: Any) -> dict[str, Any] | None:
+        return next((d for d in self.collections[collection] if matches(d, filters)), None)
+
+    def update(self, collection: str, update: dict[str, Any], filters: dict[str, Any]) -> None:
+        self.bulk_write(collection, [UpdateOne(filters, update)])
+
+    def bulk_write(self, collection: str, tasks: list[Any]) -> None:
+        documents = self.collections[collection]
+        for task in tasks:
+            if isinstance(task, DeleteMany):
+                ids = task._filter["_id"]["$in"]
+                documents[:] = [d for d in documents if d["_id"] not in ids]
+            elif isinstance(task, ReplaceOne):
+                documents[:] = [d for d in documents if d["_id"] != task._filter["_id"]] + [task._doc]
+            else:
+                for document in documents:
+                    if matches(document, task._filter):
+                        document.update(task._doc["$set"])
+
+
+@pytest.fixture(autouse=True)
+def barcodes(monkeypatch: pytest.MonkeyPatch) -> None:
+    codes = iter(["400000000001", "400000000002"])
+    monkeypatch.setattr(merge_duplicates, "draw_barcode", lambda: Barcode(unit_code=next(codes)))
+
+
+def test_distinct_units_sharing_an_internal_id_are_kept(monkeypatch: pytest.MonkeyPatch) -> None:
+    units = [
+        {"_id": 1, "uuid": "a", "internal_id": "100", "components_ids": []},
+        {"_id": 2, "uuid": "b", "internal_id": "100", "components_ids": ["c"]},
+        {"_id": 3, "uuid": "c", "internal_id": "200", "featured_in_int_id": "100", "components_ids": []},
+    ]
+    db = FakeDb(units)
+    monkeypatch.setattr(merge_duplicates, "BaseMongoDbWrapper", db)
+
+    merge_group(INTERNAL_ID, [1, 2])
+
+    by_uuid = {unit["uuid"]: unit for unit in db.collections["unitData"]}
+    assert set(by_uuid) == {"a", "b", "c"}
+    assert by_uuid["a"]["internal_id"] == "100"
+    assert by_uuid["b"]["internal_id"] not in ("100", "200")
+    assert by_uuid["b"]["barcode"]["unit_code"] == "400000000001"
+    assert by_uuid["c"]["featured_in_int_id"] == by_uuid["b"]["internal_id"]
+    assert not db.collections["unitDataDuplicates"]
+
+
+def test_copies_of_a_unit_are_merged(monkeypatch: pytest.MonkeyPatch) -> None:
+    units = [
+        {"_id": 1, "uuid": "a", "internal_id": "100", "status": "production"},
+        {"_id": 2, "uuid": "a", "internal_id": "100", "status": "built"},
+    ]
+    older, newer = dict(units[0]), dict(units[1])
+    db = FakeDb(units)
+    monkeypatch.setattr(merge_duplicates, "BaseMongoDbWrapper", db)
+
+    merge_group(INTERNAL_ID, [1, 2])
+    merge_group(INTERNAL_ID, [1, 2])  # re-runs are no-ops
+
+    assert db.collections["unitData"] == [newer]
+    assert db.collections["unitDataDuplicates"] == [older]
@@ -0,0 +1,30 @@
+import pytest
+
+from src.feecc_workbench.merkle import build_proofs, leaf_hash, verify_proof
+
+
+@pytest.mark.parametrize("leaves_cnt", [1, 2, 3, 7, 8, 33])
+def test_every_proof_verifies_against_root(leaves_cnt: int) -> None:
+    cids = [f"Qm{i:044d}" for i in range(leaves_cnt)]
+    proofs = build_proofs(cids)
+    assert len({p.root for p in proofs}) == 1, "All the proofs must share the same root"
+
+    for proof in proofs:
+        assert verify_proof(proof.cid, proof.path, proof.root)
+
+
+def test_single_leaf_root_is_leaf_hash() -> None:
+    (proof,) = build_proofs(["QmSingle"])
+    assert proof.root == leaf_hash("QmSingle").hex()
+    assert proof.path == []
+
+
+def test_proof_rejects_foreign_cid() -> None:
+    proofs = build_proofs(["QmA", "QmB", "QmC"])
+    assert not verify_proof("QmD", proofs[0].path, proofs[0].root)
+    assert not verify_proof("QmB", proofs[0].path, proofs[0].root)
+
+
+def test_empty_batch_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        build_proofs([])
@@ -0,0 +1,88 @@
+import asyncio
+import datetime as dt
+from types import SimpleNamespace
+
+import pytest
+from aioprometheus.collectors import REGISTRY
+
+from src.employee.Employee import Employee
+from src.feecc_workbench import metrics as metrics_module
+from src.feecc_workbench.metrics import Metrics, timed, workflow_step_duration
+from src.feecc_workbench.utils import TIMESTAMP_FORMAT
+from src.prod_stage.ProductionStage import ProductionStage
+
+SCHEMAS = {f"schema-{i}": SimpleNamespace(schema_name=f"Unit type {i}") for i in range(3)}
+
+
+@pytest.fixture
+def events(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    logged: list[str] = []
+    def get_schema_by_id(schema_id: str) -> None:
+        raise AssertionError("metrics must not query the database")
+
+    monkeypatch.setattr("src.prod_schema.prod_schema_wrapper.ProdSchemaWrapper.get_schema_by_id", get_schema_by_id)
+    monkeypatch.setattr(metrics_module, "event_log", SimpleNamespace(info=logged.append))
+    return logged
+
+
+def _unit(i: int) -> SimpleNamespace:
+    start = dt.datetime(2022, 1, 1) + dt.timedelta(minutes=i)
+    stage = ProductionStage(name="Assembly", parent_unit_uuid=f"uuid-{i}", number=0, completed=True)
+    stage.session_start_time = start.strftime(TIMESTAMP_FORMAT)
+    stage.session_end_time = (start + dt.timedelta(seconds=90)).strftime(TIMESTAMP_FORMAT)
+    schema_id = f"schema-{i % len(SCHEMAS)}"
+    return SimpleNamespace(
+        schema_id=schema_id,
+        schema=SCHEMAS[schema_id],
+        internal_id=f"{i:012d}",
+        operation_stages=[stage],
+        total_assembly_time=dt.timedelta(seconds=90),
+    )
+
+
+def _series_cnt() -> int:
+    return sum(len(collector.values) for collector in REGISTRY.get_all())
+
+
+def _build(metrics: Metrics, employee: Employee, units: range) -> None:
+    for i in units:
+        unit = _unit(i)
+        metrics.register_create_unit(employee, unit)
+        metrics.register_complete_operation(employee, unit)
+        metrics.register_complete_unit(employee, unit)
+        metrics.register_generate_passport(employee, unit)
+
+
+def test_series_count_does_not_grow_with_units(events: list[str]) -> None:
+    metrics = Metrics()
+    employees = [Employee(name=f"Operator {i}", position="Assembler", rfid_card_id=f"{i:010d}") for i in range(5)]
+    for employee in employees:
+        _build(metrics, employee, range(10))
+    warmed_up = _series_cnt()
+
+    for n, employee in enumerate(employees):
+        _build(metrics, employee, range(10 + n * 2000, 10 + (n + 1) * 2000))
+
+    assert _series_cnt() == warmed_up
+    # per unit detail is not lost, it goes to the event log
+    assert len(events) == 4 * (50 + 10_000)
+    assert '"unit_id": "000000010009"' in events[-1]
+
+
+def test_timed_steps_are_observed_by_outcome() -> None:
+    @timed("test_step")
+    async def step(fail: bool) -> str:
+        if fail:
+            raise ValueError("failed")
+        return "done"
+
+    assert asyncio.run(step(False)) == "done"
+    with pytest.raises(ValueError):
+        asyncio.run(step(True))
+
+    observed = {
+        labels["outcome"]: histogram["count"]
+        for labels, histogram in workflow_step_duration.get_all()
+        if labels["step"] == "test_step"
+    }
+    assert observed == {"ok": 1, "error": 1}
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import time
+
+from src.feecc_workbench.profiler import (
+    EVENT_LOOP_THREAD_NAME,
+    SamplingProfiler,
+    collapsed,
+    describe_tasks,
+    install_task_age_tracking,
+)
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_samples_other_threads() -> None:
+    stop = threading.Event()
+    workers = [threading.Thread(target=_spin, args=(stop,), name=f"busy-worker-{i}") for i in range(2)]
+    for worker in workers:
+        worker.start()
+    try:
+        stacks = SamplingProfiler().sample(0.2, 0.005, loop_thread_id=workers[0].ident)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+    lines = collapsed(stacks).splitlines()
+    for root in (EVENT_LOOP_THREAD_NAME, "busy-worker-1"):
+        busy = [line for line in lines if line.startswith(f"{root};")]
+        assert busy and all("_spin (test_profiler.py:" in line for line in busy)
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+
+
+def test_tasks_are_described_with_their_age() -> None:
+    async def main() -> list[dict]:
+        install_task_age_tracking(asyncio.get_running_loop())
+        sleeper = asyncio.create_task(asyncio.sleep(10), name="sleeper")
+        await asyncio.sleep(0.05)
+        tasks = describe_tasks()
+        sleeper.cancel()
+        return tasks
+
+    tasks = {task["name"]: task for task in asyncio.run(main())}
+    assert tasks["sleeper"]["coroutine"] == "sleep"
+    assert tasks["sleeper"]["age_seconds"] >= 0.05
+    assert tasks["sleeper"]["stack"]
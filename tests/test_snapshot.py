@@ -0,0 +1,87 @@
+import asyncio
+from dataclasses import asdict
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from src.employee.Employee import Employee
+from src.feecc_workbench.snapshot import Snapshot, load_snapshot, save_snapshot
+from src.feecc_workbench.states import State
+from src.feecc_workbench.WorkBench import _WorkBench
+from src.prod_stage.ProductionStage import ProductionStage
+
+EMPLOYEE = Employee(name="Operator", position="Assembler", rfid_card_id="0008368511")
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch: pytest.MonkeyPatch) -> None:
+    workbench = SimpleNamespace(number=1, login=True, dummy_employee="")
+    monkeypatch.setattr("src.feecc_workbench.WorkBench.CONFIG", SimpleNamespace(workbench=workbench))
+    monkeypatch.setattr("src.feecc_workbench.translation.CONFIG", SimpleNamespace(language_message="en"))
+
+
+def _resume(path: Path) -> _WorkBench:
+    workbench = _WorkBench(1, snapshot_path=str(path))
+    asyncio.run(workbench.initialize())
+    return workbench
+
+
+def test_transitions_are_resumed_after_a_restart(tmp_path: Path) -> None:
+    path = tmp_path / "workbench-1.json"
+    workbench = _WorkBench(1, snapshot_path=str(path))
+    workbench.log_in(EMPLOYEE)
+
+    resumed = _resume(path)
+
+    assert resumed.state == State.AUTHORIZED_IDLING_STATE
+    assert resumed.employee == EMPLOYEE
+    assert resumed.state_switch_event.is_set()
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path: Path) -> None:
+    path = tmp_path / "workbench-1.json"
+    path.write_text('{"state": "Authorized')
+
+    assert load_snapshot(str(path)) is None
+    assert _resume(path).state == State.AWAIT_LOGIN_STATE
+
+
+@pytest.mark.parametrize(
+    ("saved_state", "stage_started", "unit_exists", "resumed_state"),
+    [
+        (State.PRODUCTION_STAGE_ONGOING_STATE, True, True, State.PRODUCTION_STAGE_ONGOING_STATE),
+        # the stage start has not reached the database before the crash
+        (State.PRODUCTION_STAGE_ONGOING_STATE, False, True, State.UNIT_ASSIGNED_IDLING_STATE),
+        # the crash came between the stage start and the transition
+        (State.UNIT_ASSIGNED_IDLING_STATE, True, True, State.PRODUCTION_STAGE_ONGOING_STATE),
+        (State.UNIT_ASSIGNED_IDLING_STATE, False, False, State.AUTHORIZED_IDLING_STATE),
+    ],
+)
+def test_snapshot_is_reconciled_with_the_unit(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    saved_state: State,
+    stage_started: bool,
+    unit_exists: bool,
+    resumed_state: State,
+) -> None:
+    stage = ProductionStage(name="Assembly", parent_unit_uuid="unit-uuid", number=0)
+    stage.session_start_time = "01-01-2024 10:00:00" if stage_started else None
+    unit = SimpleNamespace(operation_stages=[stage], _component_slots={})
+
+    def get_unit_by_uuid(uuid: str) -> SimpleNamespace:
+        if not unit_exists:
+            raise ValueError(f"No unit with {uuid=} was found.")
+        return unit
+
+    monkeypatch.setattr("src.unit.UnitManager.UnitWrapper.get_unit_by_uuid", get_unit_by_uuid)
+    path = tmp_path / "workbench-1.json"
+    save_snapshot(str(path), Snapshot(state=saved_state.value, employee=asdict(EMPLOYEE), unit_id="unit-uuid"))
+
+    resumed = _resume(path)
+
+    assert resumed.state == resumed_state
+    assert (resumed.unit is not None) == unit_exists
+    saved = load_snapshot(str(path))
+    assert saved is not None and saved.state == resumed_state.value
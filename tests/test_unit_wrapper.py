@@ -0,0 +1,111 @@
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from pymongo import UpdateOne
+from pymongo.errors import ConnectionFailure, DuplicateKeyError
+
+from src.database.database import _BaseMongoDbWrapper
+from src.database.local_store import LocalStore, matches
+from src.unit import unit_wrapper
+from src.unit.unit_wrapper import INTERNAL_ID_ATTEMPTS, UnitWrapper, _InternalIdRedrawer
+
+
+class FakeUnit:
+    def __init__(self) -> None:
+        self.uuid = "unit-uuid"
+        self.internal_id = "100000000000"
+        self.components_ids: list[str] = []
+        self.is_in_db = False
+        self.drawn = 0
+
+    def model_dump(self, exclude: set[str]) -> dict[str, Any]:
+        return {"uuid": self.uuid, "internal_id": self.internal_id, "is_in_db": self.is_in_db}
+
+    def regenerate_internal_id(self) -> None:
+        self.drawn += 1
+        self.internal_id = f"{100000000000 + self.drawn}"
+
+
+class FakeUnitCollection:
+    def __init__(self, taken: set[str]) -> None:
+        self.taken = taken
+        self.inserted: list[dict[str, Any]] = []
+
+    def insert(self, collection: str, document: dict[str, Any]) -> None:
+        if document["internal_id"] in self.taken:
+            raise DuplicateKeyError("E11000 duplicate key", details={"keyPattern": {"internal_id": 1}})
+        self.inserted.append(document)
+
+
+def test_colliding_internal_id_is_redrawn(monkeypatch: pytest.MonkeyPatch) -> None:
+    collection = FakeUnitCollection(taken={"100000000000", "100000000001"})
+    monkeypatch.setattr(unit_wrapper, "BaseMongoDbWrapper", collection)
+    unit = FakeUnit()
+
+    UnitWrapper.push_unit(unit)  # type: ignore[arg-type]
+
+    assert unit.internal_id == "100000000002"
+    assert collection.inserted == [{"uuid": "unit-uuid", "internal_id": "100000000002", "is_in_db": True}]
+
+
+def test_internal_id_is_redrawn_a_bounded_number_of_times(monkeypatch: pytest.MonkeyPatch) -> None:
+    taken = {f"{100000000000 + n}" for n in range(INTERNAL_ID_ATTEMPTS)}
+    monkeypatch.setattr(unit_wrapper, "BaseMongoDbWrapper", FakeUnitCollection(taken))
+    unit = FakeUnit()
+
+    with pytest.raises(DuplicateKeyError):
+        UnitWrapper.push_unit(unit)  # type: ignore[arg-type]
+    assert unit.drawn == INTERNAL_ID_ATTEMPTS - 1
+
+
+class FakeMongoUnits:
+    def __init__(self, taken: set[str]) -> None:
+        self.documents: list[dict[str, Any]] = [{"uuid": "other", "internal_id": internal_id} for internal_id in taken]
+        self.offline = True
+
+    def _check(self) -> None:
+        if self.offline:
+            raise ConnectionFailure("MongoDB is down")
+
+    def insert_one(self, document: dict[str, Any]) -> None:
+        self._check()
+        if any(d["internal_id"] == document["internal_id"] for d in self.documents):
+            raise DuplicateKeyError("E11000 duplicate key", details={"keyPattern": {"internal_id": 1}})
+        self.documents.append(dict(document))
+
+    def bulk_write(self, requests: list[Any]) -> None:
+        self._check()
+        for request in requests:
+            for document in self.documents:
+                if matches(document, request._filter):
+                    document.update(request._doc["$set"])
+
+
+def test_journaled_insert_with_a_taken_internal_id_is_redrawn_on_replay(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    settings = SimpleNamespace(mongodb=SimpleNamespace(slow_query_ms=1e6))
+    monkeypatch.setattr("src.database.instrumentation.CONFIG", settings)
+    monkeypatch.setattr("src.feecc_workbench.translation.CONFIG", SimpleNamespace(language_message="en"))
+    collection = FakeMongoUnits(taken={"100000000000"})
+    db = _BaseMongoDbWrapper()
+    db._client, db._db = object(), {"unitData": collection}  # type: ignore[assignment]
+    db._local_store = LocalStore(str(tmp_path / "local.sqlite3"))
+    db.register_conflict_resolver("unitData", _InternalIdRedrawer())
+
+    db.insert("unitData", {"uuid": "unit-uuid", "internal_id": "100000000000", "barcode": None})
+    db.bulk_write("unitData", [UpdateOne({"uuid": "component"}, {"$set": {"featured_in_int_id": "100000000000"}})])
+    collection.documents.append({"uuid": "component", "internal_id": "200000000000"})
+    collection.offline = False
+
+    assert db.replay_journal() == 2
+
+    unit = next(d for d in collection.documents if d["uuid"] == "unit-uuid")
+    component = next(d for d in collection.documents if d["uuid"] == "component")
+    assert unit["internal_id"] != "100000000000"
+    assert component["featured_in_int_id"] == unit["internal_id"]
+    assert db._local_store.find("unitData", {"uuid": "unit-uuid"})[0]["internal_id"] == unit["internal_id"]
+    (warning,) = db.pop_replay_warnings()
+    assert "100000000000" in warning and unit["internal_id"] in warning
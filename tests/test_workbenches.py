@@ -0,0 +1,133 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+
+from src.database.state_store import SQLiteStateStore
+from src.dependencies import workbench_number_path
+from src.employee.Employee import Employee
+from src.feecc_workbench.context import current_workbench
+from src.feecc_workbench.exceptions import StateConflictError, StateForbiddenError
+from src.feecc_workbench.Messenger import MessageLevels, Messenger
+from src.feecc_workbench.states import State
+from src.feecc_workbench.WorkBench import _WorkBench, _WorkbenchRegistry
+from src.routers import workbench_router
+
+
+@pytest.fixture(autouse=True)
+def config(monkeypatch: pytest.MonkeyPatch) -> None:
+    workbench = SimpleNamespace(number=1, hosted_numbers=[2, 3], login=True, dummy_employee="", snapshot_dir=None)
+    config = SimpleNamespace(workbench=workbench, state_store=SimpleNamespace(backend="memory"))
+    monkeypatch.setattr("src.feecc_workbench.WorkBench.CONFIG", config)
+    monkeypatch.setattr("src.feecc_workbench.translation.CONFIG", SimpleNamespace(language_message="en"))
+
+
+@pytest.fixture
+def workbenches(monkeypatch: pytest.MonkeyPatch) -> _WorkbenchRegistry:
+    registry = _WorkbenchRegistry()
+    monkeypatch.setattr("src.dependencies.Workbenches", registry)
+    return registry
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(workbench_router)
+    bench_path = Depends(workbench_number_path)
+    app.include_router(workbench_router, prefix="/benches/{workbench_number}", dependencies=[bench_path])
+    return app
+
+
+def test_requests_are_routed_to_their_workbench(workbenches: _WorkbenchRegistry) -> None:
+    async def main() -> dict[str, httpx.Response]:
+        await workbenches.initialize()
+        workbenches.get(2).log_in(Employee(name="Operator", position="Assembler", rfid_card_id="0008368511"))
+        transport = httpx.ASGITransport(app=_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return {
+                "default": await client.get("/workbench/status"),
+                "path": await client.get("/benches/2/workbench/status"),
+                "header": await client.get("/workbench/status", headers={"X-Workbench-Number": "3"}),
+                "unknown": await client.get("/benches/9/workbench/status"),
+            }
+
+    responses = asyncio.run(main())
+
+    assert workbenches.numbers == [1, 2, 3]
+    assert not responses["default"].json()["employee_logged_in"]
+    assert responses["path"].json()["employee_logged_in"]
+    assert responses["path"].json()["state"] == "AuthorizedIdling"
+    assert not responses["header"].json()["employee_logged_in"]
+    assert responses["unknown"].status_code == 404
+
+
+def test_notifications_reach_their_workbench_only() -> None:
+    async def main() -> list[int]:
+        messenger = Messenger()
+        brockers = {number: messenger.get_brocker(number) for number in (2, 3)}
+        current_workbench.set(2)
+        await messenger.emit_message(level=MessageLevels.INFO, message="unit assigned")
+        current_workbench.set(None)
+        await messenger.emit_message(level=MessageLevels.INFO, message="server shutting down")
+        return [brockers[number].feed.qsize() for number in (2, 3)]
+
+    assert asyncio.run(main()) == [2, 1]
+
+
+def test_state_is_shared_between_processes(tmp_path: Path) -> None:
+    async def main() -> None:
+        # two copies of the workbench over one store stand for two worker processes
+        store_path = str(tmp_path / "state.sqlite3")
+        first, second = (_WorkBench(1, SQLiteStateStore(store_path, claim_seconds=30)) for _ in range(2))
+        await first.initialize()
+        await second.initialize()
+        second.state_switch_event.clear()
+        watcher = asyncio.create_task(second.watch_store(interval=0.01))
+
+        first.log_in(Employee(name="Operator", position="Assembler", rfid_card_id="0008368511"))
+        await asyncio.wait_for(second.state_switch_event.wait(), timeout=5)
+        watcher.cancel()
+        assert second.state == State.AUTHORIZED_IDLING_STATE
+        assert second.employee is not None and second.employee.name == "Operator"
+
+        # the first copy has not seen the log out, its transition starts from the current state
+        second.log_out()
+        with pytest.raises(StateForbiddenError):
+            first.log_out()
+        assert first.state == State.AWAIT_LOGIN_STATE
+        assert first.employee is None
+
+    asyncio.run(main())
+
+
+def test_transition_claimed_by_another_process_is_rejected(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    store_path = str(tmp_path / "state.sqlite3")
+    first, second = (_WorkBench(1, SQLiteStateStore(store_path, claim_seconds=30)) for _ in range(2))
+    asyncio.run(first.initialize())
+    asyncio.run(second.initialize())
+    notifications: list[str] = []
+    monkeypatch.setattr("src.feecc_workbench.WorkBench.messenger", SimpleNamespace(success=notifications.append))
+
+    first._claim()  # a transition of the first process is in progress
+    monkeypatch.setattr("src.feecc_workbench.WorkBench.PROCESS_ID", "second process")
+    with pytest.raises(StateConflictError):
+        second.log_in(Employee(name="Operator", position="Assembler", rfid_card_id="0008368511"))
+
+    assert second.employee is None
+    assert not notifications
+
+
+def test_transition_in_a_worker_thread_wakes_up_the_state_stream() -> None:
+    async def main() -> None:
+        workbench = _WorkBench(1)
+        await workbench.initialize()
+        workbench.state_switch_event.clear()
+        # sync route handlers run the transitions in the threadpool
+        employee = Employee(name="Operator", position="Assembler", rfid_card_id="0008368511")
+        await asyncio.to_thread(workbench.log_in, employee)
+        await asyncio.wait_for(workbench.state_switch_event.wait(), timeout=5)
+        assert workbench.state == State.AUTHORIZED_IDLING_STATE
+
+    asyncio.run(main())
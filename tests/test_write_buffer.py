@@ -0,0 +1,80 @@
+from typing import Any
+
+import pytest
+from pymongo import UpdateOne
+
+from src.database.write_buffer import WriteBehindBuffer, apply_set
+
+
+class FakeWriter:
+    def __init__(self) -> None:
+        self.batches: list[list[UpdateOne]] = []
+        self.fail = False
+
+    def __call__(self, tasks: list[UpdateOne]) -> None:
+        if self.fail:
+            raise ConnectionError("DB is down")
+        self.batches.append(tasks)
+
+
+def make_buffer(writer: FakeWriter, window: float = 60, max_documents: int = 100) -> WriteBehindBuffer:
+    return WriteBehindBuffer("units", "uuid", writer, window, max_documents)
+
+
+def test_updates_of_a_document_are_coalesced() -> None:
+    writer = FakeWriter()
+    buffer = make_buffer(writer)
+    buffer.set("a", {"status": "production"})
+    buffer.set("a", {"operation_stages": []})
+    buffer.set("a", {"status": "built"})
+    buffer.set("b", {"status": "built"})
+    assert not writer.batches, "Nothing is written before the flush"
+
+    buffer.flush()
+    (batch,) = writer.batches
+    updates: dict[str, Any] = {task._filter["uuid"]: task._doc["$set"] for task in batch}
+    assert updates == {"a": {"status": "built", "operation_stages": []}, "b": {"status": "built"}}
+
+    buffer.flush()
+    assert len(writer.batches) == 1, "Empty flush must not write"
+
+
+def test_overlay_sees_pending_updates() -> None:
+    buffer = make_buffer(FakeWriter())
+    buffer.set("a", {"status": "built", "fragment.digest": "abc"})
+    assert buffer.overlay({"uuid": "a", "status": "production"}) == {
+        "uuid": "a",
+        "status": "built",
+        "fragment": {"digest": "abc"},
+    }
+    assert buffer.overlay({"uuid": "b", "status": "production"}) == {"uuid": "b", "status": "production"}
+    assert buffer.overlay(None) is None
+
+
+def test_failed_flush_keeps_updates() -> None:
+    writer = FakeWriter()
+    buffer = make_buffer(writer)
+    buffer.set("a", {"status": "production", "serial_number": "1"})
+    writer.fail = True
+    with pytest.raises(ConnectionError):
+        buffer.flush()
+
+    buffer.set("a", {"status": "built"})
+    writer.fail = False
+    buffer.flush()
+    (batch,) = writer.batches
+    assert batch[0]._doc["$set"] == {"status": "built", "serial_number": "1"}
+
+
+@pytest.mark.parametrize("window, max_documents", [(0, 100), (60, 2)])
+def test_write_through(window: float, max_documents: int) -> None:
+    writer = FakeWriter()
+    buffer = make_buffer(writer, window, max_documents)
+    buffer.set("a", {"status": "built"})
+    buffer.set("b", {"status": "built"})
+    assert sum(len(batch) for batch in writer.batches) == 2
+    assert buffer.pending_cnt == 0
+
+
+def test_apply_set_nested() -> None:
+    assert apply_set({"a": {"b": 1}}, {"a.c": 2, "d": 3}) == {"a": {"b": 1, "c": 2}, "d": 3}